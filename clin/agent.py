@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import socketserver
+from pathlib import Path
+
+import requests
+
+from clin.clients.http_client import ResponseCache
+
+
+class AgentServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Answers the GET requests of concurrent clin invocations from a shared
+    cache, and forwards the others over pooled connections. Responses are
+    cached per token, so invocations never see resources they could not
+    read themselves. Invocations changing a resource invalidate the cache,
+    as a change may show in the responses of any url and any token."""
+
+    daemon_threads = True
+
+    def __init__(self, path: Path, ttl: float):
+        self.path = path
+        self.cache = ResponseCache(ttl)
+        # the connection pool of a session is shared by the handler threads
+        self.session = requests.Session()
+        if path.is_socket():
+            path.unlink()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        umask = os.umask(0o177)
+        try:
+            super().__init__(str(path), _AgentHandler)
+        finally:
+            os.umask(umask)
+
+    def get(self, request: dict) -> dict:
+        token = request["headers"].get("Authorization", "")
+        key = " ".join(
+            [
+                hashlib.sha256(token.encode()).hexdigest(),
+                request["url"],
+                json.dumps(request.get("params"), sort_keys=True),
+            ]
+        )
+        cached = self.cache.get(key)
+        if cached is not None:
+            logging.debug("GET %s (cached)", request["url"])
+            return cached
+
+        logging.debug("GET %s", request["url"])
+        resp = self.session.get(
+            request["url"], headers=request["headers"], params=request.get("params")
+        )
+        answer = {"status": resp.status_code, "body": resp.text}
+        if resp.status_code == 200:
+            self.cache.put(key, json.dumps(answer).encode())
+        return answer
+
+    def invalidate(self, request: dict) -> dict:
+        logging.debug("Invalidating cache after change of %s", request["url"])
+        self.cache.clear()
+        return {"invalidated": True}
+
+    def server_close(self):
+        super().server_close()
+        if self.path.is_socket():
+            self.path.unlink()
+
+
+class _AgentHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if request.get("op") == "invalidate":
+                    answer = self.server.invalidate(request)
+                else:
+                    answer = self.server.get(request)
+            except Exception as ex:
+                logging.debug("Failed to answer request: %s", ex)
+                answer = {"error": str(ex)}
+            self.wfile.write(json.dumps(answer).encode() + b"\n")
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+from clin.clients.http_client import ResponseCache
+from clin.clients.nakadi import Nakadi, NakadiError
+from clin.clients.nakadi_sql import NakadiSql
+from clin.clinfile import Process, calculate_scope
+from clin.config import AppConfig
+from clin.decisions import (
+    Decision,
+    decide_event_type,
+    decide_sql_query,
+    decide_subscription,
+)
+from clin.models.shared import Envelope, Kind
+from clin.plan import (
+    Action,
+    Plan,
+    PlannedAction,
+    PlanError,
+    planned_action,
+)
+from clin.processor import (
+    Outcome,
+    ProcessingError,
+    diff_to_dict,
+    execute_action,
+    is_stale,
+)
+from clin.snapshot import SnapshotError
+from clin.yamlops import YamlLoader, load_yaml
+
+
+@dataclass
+class EnvironmentClients:
+    nakadi: Nakadi
+    nakadi_sql: Optional[NakadiSql] = None
+
+
+class Session:
+    """The clients and caches shared by all plans and executions. Clients are
+    created from the configuration on first use, unless given per environment,
+    and keep their connections alive. With a response cache, the state of
+    Nakadi read by a plan is reused by the following ones until it expires or
+    the session changes a resource."""
+
+    def __init__(
+        self,
+        config: Optional[AppConfig] = None,
+        token: Optional[str] = None,
+        cache: Optional[ResponseCache] = None,
+        clients: Optional[dict[str, EnvironmentClients]] = None,
+        fingerprint: bool = False,
+        verify: bool = False,
+    ):
+        self.config = config
+        self.token = token
+        self.cache = cache
+        self.fingerprint = fingerprint
+        self.verify = verify
+        self._clients: dict[str, EnvironmentClients] = dict(clients or {})
+        self._lock = threading.Lock()
+
+    def clients(self, env: str) -> EnvironmentClients:
+        with self._lock:
+            if env not in self._clients:
+                self._clients[env] = self._create_clients(env)
+            return self._clients[env]
+
+    def nakadi_sql(self, env: str) -> NakadiSql:
+        nakadi_sql = self.clients(env).nakadi_sql
+        if nakadi_sql is None:
+            raise ProcessingError("Nakadi SQL endpoint is not configured")
+        return nakadi_sql
+
+    def _create_clients(self, env: str) -> EnvironmentClients:
+        if self.config is None or env not in self.config.environments:
+            raise ProcessingError(f"Unknown environment: {env}")
+        environment = self.config.environments[env]
+        return EnvironmentClients(
+            Nakadi(environment.nakadi_url, self.token, self.cache),
+            NakadiSql(environment.nakadi_sql_url, self.token, self.cache)
+            if environment.nakadi_sql_url
+            else None,
+        )
+
+
+def load_scope(
+    clin_file: Path,
+    filter_id: tuple[str] = (),
+    filter_env: tuple[str] = (),
+    variables: Optional[dict] = None,
+    loader: Optional[YamlLoader] = None,
+) -> dict[Kind, list[Process]]:
+    """The resources declared by the clin file, with its template variables
+    taken from `variables`, or else from the environment of the process"""
+    loader = loader or YamlLoader()
+    master = load_yaml(
+        clin_file, loader, os.environ if variables is None else variables
+    )
+    return calculate_scope(master, clin_file.parent, loader, filter_id, filter_env)
+
+
+def plan(
+    scope: Union[dict[Kind, list[Process]], Iterable[Process]],
+    session: Session,
+    jobs: int = 1,
+) -> Plan:
+    """The creates and updates needed to apply the resources, with their
+    diffs. Nakadi is only read. The resources are decided concurrently with
+    more than one job, the plan keeps their order."""
+    if isinstance(scope, dict):
+        tasks = (
+            scope[Kind.EVENT_TYPE] + scope[Kind.SQL_QUERY] + scope[Kind.SUBSCRIPTION]
+        )
+    else:
+        tasks = list(scope)
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        decisions = list(executor.map(lambda task: _decide(task, session), tasks))
+
+    result = Plan()
+    for task, decision in zip(tasks, decisions):
+        diff = diff_to_dict(decision.diff) if decision.diff else None
+        if decision.forbidden:
+            result.forbidden.append(
+                planned_action(
+                    task.target, Action.UPDATE, decision.entity, decision.current, diff
+                )
+            )
+        elif decision.action is not None:
+            result.add(
+                task.target, decision.action, decision.entity, decision.current, diff
+            )
+    return result
+
+
+def execute(plan: Plan, session: Session, check_stale: bool = True) -> list[Outcome]:
+    """Executes the actions of the plan in order. Unless `check_stale` is
+    disabled, nothing is executed if any resource changed since planning,
+    which is checked bypassing the response cache of the session."""
+    if check_stale:
+        stale = [
+            action
+            for action in plan.actions
+            if is_stale(
+                action, session.clients(action.env).nakadi, _nakadi_sql(action, session)
+            )
+        ]
+        if stale:
+            raise PlanError(
+                "Changed since planned: "
+                + ", ".join(
+                    f"{Envelope(action.kind, action.spec).identity} in {action.env}"
+                    for action in stale
+                )
+            )
+    return [
+        execute_action(
+            action, session.clients(action.env).nakadi, _nakadi_sql(action, session)
+        )
+        for action in plan.actions
+    ]
+
+
+def _decide(task: Process, session: Session) -> Decision:
+    spec = task.envelope.spec
+    clients = session.clients(task.target)
+    try:
+        if task.envelope.kind == Kind.EVENT_TYPE:
+            return decide_event_type(
+                clients.nakadi, spec, session.fingerprint, session.verify
+            )
+        if task.envelope.kind == Kind.SQL_QUERY:
+            return decide_sql_query(
+                clients.nakadi,
+                session.nakadi_sql(task.target),
+                spec,
+                session.fingerprint,
+                session.verify,
+            )
+        if task.envelope.kind == Kind.SUBSCRIPTION:
+            return decide_subscription(clients.nakadi, spec)
+    except (NakadiError, SnapshotError) as err:
+        raise ProcessingError(
+            f"Can not process {task.envelope.identity}: {err}"
+        ) from err
+    raise ProcessingError(f"Unsupported kind: {task.envelope.kind}")
+
+
+def _nakadi_sql(action: PlannedAction, session: Session) -> Optional[NakadiSql]:
+    return session.nakadi_sql(action.env) if action.kind == Kind.SQL_QUERY else None
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+from clin.clients.nakadi import Nakadi, NakadiError
+
+# partitions beyond this multiple of the needed ones are reported as wasted
+OVER_PROVISIONING_FACTOR = 4
+UNDER_PROVISIONED = "under-provisioned"
+OVER_PROVISIONED = "over-provisioned"
+
+
+def parse_offset(offset: str) -> tuple[Optional[int], int]:
+    """The timeline and the position in it of a Nakadi offset, like
+    001-0001-000000000000000042. BEGIN is positioned before the first event of
+    any timeline."""
+    if offset.upper() == "BEGIN":
+        return None, -1
+    parts = offset.split("-")
+    return (int(parts[-2]) if len(parts) > 1 else 0), int(parts[-1])
+
+
+@dataclass
+class Capacity:
+    """Throughput and retention of an event type, from two samples of the
+    offsets of its partitions"""
+
+    name: str
+    partitions: int
+    retained_events: int
+    retention_ms: int
+    # events per second of every partition, None when it could not be measured
+    rates: list[Optional[float]]
+    declared_partitions: Optional[int] = None
+
+    @property
+    def publish_rate(self) -> float:
+        return sum(rate for rate in self.rates if rate is not None)
+
+    @property
+    def skew(self) -> float:
+        """The rate of the busiest partition relative to the average, 1 when
+        the events are evenly distributed"""
+        rates = [rate for rate in self.rates if rate is not None]
+        if not rates or not sum(rates):
+            return 1.0
+        return max(rates) / (sum(rates) / len(rates))
+
+    @property
+    def projected_retained_events(self) -> int:
+        """The events retained once the retention time is filled at the
+        current rate"""
+        return int(self.publish_rate * self.retention_ms / 1000)
+
+    def needed_partitions(self, target_rate: float) -> int:
+        return max(1, math.ceil(self.publish_rate / target_rate))
+
+    def provisioning(self, target_rate: float) -> Optional[str]:
+        """Whether the declared partitions, or else the existing ones, are too
+        few or far too many for the measured rate. Nothing is recommended
+        without traffic during the sampling, it may just have been idle."""
+        if not self.publish_rate:
+            return None
+        partitions = self.declared_partitions or self.partitions
+        needed = self.needed_partitions(target_rate)
+        if partitions < needed:
+            return UNDER_PROVISIONED
+        if partitions > needed * OVER_PROVISIONING_FACTOR:
+            return OVER_PROVISIONED
+        return None
+
+
+def analyze(
+    name: str,
+    first: list[dict],
+    second: list[dict],
+    interval: float,
+    retention_ms: int,
+) -> Capacity:
+    """Compares two samples of the partitions of the event type taken
+    `interval` seconds apart"""
+    before = {p["partition"]: p for p in first}
+    rates, retained = [], 0
+    for partition in second:
+        newest = parse_offset(partition["newest_available_offset"])
+        oldest = parse_offset(partition["oldest_available_offset"])
+        if newest[0] == oldest[0]:
+            retained += max(0, newest[1] - oldest[1] + 1)
+        else:
+            # older timelines are not counted, their size is unknown
+            retained += newest[1] + 1
+
+        previous = before.get(partition["partition"])
+        if previous is None or interval <= 0:
+            rates.append(None)
+            continue
+        previous_newest = parse_offset(previous["newest_available_offset"])
+        if previous_newest[0] not in (None, newest[0]):
+            # the timeline changed between the samples
+            rates.append(None)
+            continue
+        rates.append(max(0, newest[1] - previous_newest[1]) / interval)
+
+    return Capacity(
+        name=name,
+        partitions=len(second),
+        retained_events=retained,
+        retention_ms=retention_ms,
+        rates=rates,
+    )
+
+
+def measure_capacity(
+    nakadi: Nakadi, event_types: list[dict], interval: float, jobs: int
+) -> list[Capacity]:
+    """Samples the offsets of all partitions of the event types twice,
+    `interval` seconds apart. Event types deleted in between are skipped."""
+
+    def sample(name: str) -> Optional[tuple[float, list[dict]]]:
+        try:
+            return time.monotonic(), nakadi.get_partitions(name, fresh=True)
+        except NakadiError as ex:
+            logging.debug("Skipping event type %s: %s", name, ex)
+            return None
+
+    names = [payload["name"] for payload in event_types]
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        first = list(executor.map(sample, names))
+        time.sleep(interval)
+        second = list(executor.map(sample, names))
+
+    return [
+        analyze(
+            payload["name"],
+            before[1],
+            after[1],
+            after[0] - before[0],
+            payload.get("options", {}).get("retention_time", 0),
+        )
+        for payload, before, after in zip(event_types, first, second)
+        if before is not None and after is not None
+    ]
@@ -0,0 +1,66 @@
+import json
+import logging
+import os
+import socket
+from pathlib import Path
+from typing import Optional
+
+from requests import Response
+
+from clin.utils import cache_dir
+
+AGENT_SOCKET_VARIABLE = "CLIN_AGENT_SOCKET"
+AGENT_TIMEOUT_SECONDS = 60
+
+
+def agent_socket() -> Path:
+    """The socket of the agent, configurable with $CLIN_AGENT_SOCKET"""
+    return Path(os.environ.get(AGENT_SOCKET_VARIABLE) or cache_dir() / "agent.sock")
+
+
+class AgentClient:
+    """Sends GET requests through a running `clin agent`. Each request is a
+    JSON line answered by a JSON line with the status code and the body.
+    Changes are announced with invalidate requests."""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    @staticmethod
+    def find() -> Optional["AgentClient"]:
+        path = agent_socket()
+        return AgentClient(path) if path.is_socket() else None
+
+    def get(self, url: str, headers: dict, params: Optional[dict]) -> Response:
+        answer = self._send({"url": url, "headers": headers, "params": params})
+        logging.debug(f"-> response code {answer['status']} from agent")
+        resp = Response()
+        resp.url = url
+        resp.status_code = answer["status"]
+        resp._content = answer["body"].encode()
+        return resp
+
+    def invalidate(self, url: str):
+        """Drops the cached responses, which may not show the change of the
+        resource at the url"""
+        self._send({"op": "invalidate", "url": url})
+
+    def _send(self, request: dict) -> dict:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(AGENT_TIMEOUT_SECONDS)
+            conn.connect(str(self.path))
+            conn.sendall(json.dumps(request).encode() + b"\n")
+            with conn.makefile("rb") as f:
+                answer = json.loads(f.readline())
+
+        if "error" in answer:
+            raise AgentError(answer["error"])
+        return answer
+
+
+class AgentError(Exception):
+    def __init__(self, message: str):
+        self.message = message
+
+    def __str__(self):
+        return self.message
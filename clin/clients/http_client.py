@@ -1,46 +1,133 @@
+import json
 import logging
 import os
+import threading
+import time
 from typing import Optional, TypeVar
 
 import requests
 from requests import Response
 
 from clin import __version__
+from clin.clients.agent import AgentClient, AgentError
 from clin.models.auth import Auth, ReadOnlyAuth, ReadWriteAuth
 
 TAuth = TypeVar("TAuth", bound=Auth)
 
 
+class ResponseCache:
+    """Remembers successful GET responses for `ttl` seconds. Responses are
+    kept serialized, so callers can not modify the cached content."""
+
+    def __init__(self, ttl: float):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._responses: dict = {}
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            cached = self._responses.get(key)
+        if cached is None or cached[0] < time.monotonic():
+            return None
+        return json.loads(cached[1])
+
+    def put(self, key: str, content: bytes):
+        with self._lock:
+            self._responses[key] = (time.monotonic() + self._ttl, content)
+
+    def clear(self):
+        with self._lock:
+            self._responses.clear()
+
+
 class HttpClient:
-    def __init__(self, base_url: str, token: Optional[str]):
+    def __init__(
+        self,
+        base_url: str,
+        token: Optional[str],
+        cache: Optional[ResponseCache] = None,
+    ):
         self._base_url = base_url.rstrip("/")
+        self._cache = cache
         self._headers = {
             "Content-Type": "application/json",
             "User-Agent": f"clin+{__version__}",
         }
         if token:
             self._headers["Authorization"] = f"Bearer {token}"
+        # keeps the connections alive between the requests of bulk operations
+        self._session = requests.Session()
+        self._agent = AgentClient.find()
 
-    def _get(self, path: str, **kwargs) -> dict:
+    def _get(self, path: str, fresh: bool = False, **kwargs) -> dict:
+        """GET request answered from the cache or through the agent when
+        possible, unless `fresh` asks for the current state of Nakadi"""
         url = os.path.join(self._base_url, path)
+        key = f"{url} {json.dumps(kwargs.get('params'), sort_keys=True)}"
+        if self._cache and not fresh:
+            cached = self._cache.get(key)
+            if cached is not None:
+                logging.debug(f"GET {url} (cached)")
+                return cached
+
         logging.debug(f"GET {url}")
-        resp = requests.get(url, headers=self._headers, **kwargs)
-        logging.debug(f"-> response code {resp.status_code}")
+        resp = None if fresh else self._get_through_agent(url, kwargs.get("params"))
+        if resp is None:
+            resp = self._session.get(url, headers=self._headers, **kwargs)
+            logging.debug(f"-> response code {resp.status_code}")
         resp.raise_for_status()
+        if self._cache:
+            self._cache.put(key, resp.content)
         return resp.json()
 
+    def _get_through_agent(
+        self, url: str, params: Optional[dict]
+    ) -> Optional[Response]:
+        if self._agent is None:
+            return None
+        try:
+            return self._agent.get(url, self._headers, params)
+        except (OSError, ValueError, AgentError) as ex:
+            logging.debug(f"Not using agent at {self._agent.path}: {ex}")
+            self._agent = None
+            return None
+
+    def _invalidate(self, url: str):
+        """Drops the cached reads after a change. The following reads of this
+        client no longer go through the agent, which may still be answering
+        requests sent by others before the change."""
+        if self._cache:
+            self._cache.clear()
+        if self._agent is None:
+            return
+        try:
+            self._agent.invalidate(url)
+        except (OSError, ValueError, AgentError) as ex:
+            logging.debug(f"Failed to invalidate agent at {self._agent.path}: {ex}")
+        self._agent = None
+
     def _post(self, path: str, **kwargs) -> Response:
         url = os.path.join(self._base_url, path)
         logging.debug(f"POST {url}")
-        resp = requests.post(url, headers=self._headers, **kwargs)
+        resp = self._session.post(url, headers=self._headers, **kwargs)
         logging.debug(f"-> response code {resp.status_code}")
+        self._invalidate(url)
         return resp
 
     def _put(self, path: str, **kwargs) -> Response:
         url = os.path.join(self._base_url, path)
         logging.debug(f"PUT {url}")
-        resp = requests.put(url, headers=self._headers, **kwargs)
+        resp = self._session.put(url, headers=self._headers, **kwargs)
+        logging.debug(f"-> response code {resp.status_code}")
+        self._invalidate(url)
+        return resp
+
+    def _delete(self, path: str, **kwargs) -> Response:
+        url = os.path.join(self._base_url, path)
+        logging.debug(f"DELETE {url}")
+        resp = self._session.delete(url, headers=self._headers, **kwargs)
         logging.debug(f"-> response code {resp.status_code}")
+        self._invalidate(url)
         return resp
 
 
@@ -3,7 +3,6 @@ from __future__ import annotations
 import json
 from typing import List, Optional
 
-import requests
 from requests import HTTPError, Response
 
 from clin.clients.http_client import (
@@ -24,13 +23,26 @@ from clin.models.event_type import (
 from clin.models.subscription import Subscription
 from clin.utils import MS_IN_DAY
 
+SUBSCRIPTIONS_PAGE_SIZE = 1000
+
 
 class Nakadi(HttpClient):
-    def get_event_type(self, name: str) -> Optional[EventType]:
+    def list_event_types(self) -> list[dict]:
+        try:
+            return self._get("event-types")
+
+        except HTTPError as e:
+            raise NakadiError("Nakadi error during listing event types", e.response)
+
+    def get_event_type(self, name: str, fresh: bool = False) -> Optional[EventType]:
+        payload = self.get_event_type_payload(name, fresh)
+        if payload is None:
+            return None
+        return event_type_from_payload(payload, self.get_partition_count(name, fresh))
+
+    def get_event_type_payload(self, name: str, fresh: bool = False) -> Optional[dict]:
         try:
-            payload = self._get(f"event-types/{name}")
-            partition_count = self.get_partition_count(name)
-            return event_type_from_payload(payload, partition_count)
+            return self._get(f"event-types/{name}", fresh=fresh)
 
         except HTTPError as e:
             if e.response.status_code == 404:
@@ -39,15 +51,56 @@ class Nakadi(HttpClient):
                 f"Nakadi error during getting event type '{name}'", e.response
             )
 
-    def get_partition_count(self, name: str) -> int:
+    def get_partition_count(self, name: str, fresh: bool = False) -> int:
+        return len(self.get_partitions(name, fresh))
+
+    def get_partitions(self, name: str, fresh: bool = False) -> list[dict]:
+        """The partitions of the event type with their offsets, `fresh` ones
+        bypass the caches to sample the offsets"""
         try:
-            return len(self._get(f"event-types/{name}/partitions"))
+            return self._get(f"event-types/{name}/partitions", fresh=fresh)
 
         except HTTPError as e:
             raise NakadiError(
                 f"Can not get partitions for event type'{name}'", e.response
             )
 
+    def list_subscriptions(
+        self, owning_application: Optional[str] = None
+    ) -> list[dict]:
+        subscriptions = []
+        try:
+            while True:
+                params = {
+                    "limit": SUBSCRIPTIONS_PAGE_SIZE,
+                    "offset": len(subscriptions),
+                }
+                if owning_application:
+                    params["owning_application"] = owning_application
+                page = self._get("subscriptions", params=params)
+                subscriptions.extend(page["items"])
+                if not page["items"] or "next" not in page.get("_links", {}):
+                    return subscriptions
+
+        except HTTPError as e:
+            raise NakadiError("Nakadi error during listing subscriptions", e.response)
+
+    def get_subscription_stats(self, subscription_id: str) -> list[dict]:
+        """The partitions of every event type of the subscription, with their
+        unconsumed events and consumer lag"""
+        try:
+            return self._get(
+                f"subscriptions/{subscription_id}/stats",
+                fresh=True,
+                params={"show_time_lag": "true"},
+            )["items"]
+
+        except HTTPError as e:
+            raise NakadiError(
+                f"Nakadi error during getting stats of subscription '{subscription_id}'",
+                e.response,
+            )
+
     def create_event_type(self, event_type: EventType):
         resp = self._post(
             "event-types", data=json.dumps(event_type_to_payload(event_type))
@@ -69,29 +122,39 @@ class Nakadi(HttpClient):
                 f"Nakadi error during updating of event type '{event_type.name}'", resp
             )
 
+    def delete_event_type(self, name: str):
+        resp = self._delete(f"event-types/{name}")
+        if resp.status_code not in (200, 204):
+            raise NakadiError(
+                f"Nakadi error during deletion of event type '{name}'", resp
+            )
+
     def get_subscription(
-        self, event_types: List, owning_application: str, consumer_group: str
+        self,
+        event_types: List,
+        owning_application: str,
+        consumer_group: str,
+        fresh: bool = False,
     ) -> Optional[Subscription]:
         params_str = Subscription.components_string(
             event_types, owning_application, consumer_group
         )
 
-        url = f"{self._base_url}/subscriptions"
         params = {
             "event_type": ",".join(event_types),
             "owning_application": owning_application,
         }
-        resp = requests.get(url, headers=self._headers, params=params)
-        if resp.status_code != 200:
+        try:
+            items = self._get("subscriptions", fresh=fresh, params=params)["items"]
+        except HTTPError as e:
             raise NakadiError(
-                f"Nakadi error during getting subscription for {params_str}", resp
+                f"Nakadi error during getting subscription for {params_str}",
+                e.response,
             )
 
-        subscriptions = [
-            s for s in resp.json()["items"] if s["consumer_group"] == consumer_group
-        ]
+        subscriptions = [s for s in items if s["consumer_group"] == consumer_group]
         if len(subscriptions) > 1:
-            raise NakadiError(f"Got multiple subscriptions for {params_str}", resp)
+            raise NakadiError(f"Got multiple subscriptions for {params_str}")
         elif len(subscriptions) == 1:
             payload = subscriptions[0]
             sub = subscription_from_payload(payload)
@@ -101,9 +164,7 @@ class Nakadi(HttpClient):
 
     def create_subscription(self, subscription: Subscription) -> Subscription:
         payload = json.dumps(subscription_to_payload(subscription))
-        resp = requests.post(
-            f"{self._base_url}/subscriptions", headers=self._headers, data=payload
-        )
+        resp = self._post("subscriptions", data=payload)
         if resp.status_code != 201:
             raise NakadiError(f"Nakadi error during creating {subscription}", resp)
 
@@ -112,21 +173,28 @@ class Nakadi(HttpClient):
 
     def update_subscription(self, subscription: Subscription):
         payload = json.dumps(subscription_to_payload(subscription))
-        resp = requests.put(
-            f"{self._base_url}/subscriptions/{subscription.id}",
-            headers=self._headers,
-            data=payload,
-        )
+        resp = self._put(f"subscriptions/{subscription.id}", data=payload)
         if resp.status_code != 204:
             raise NakadiError(f"Nakadi error during updating {subscription}", resp)
 
+    def delete_subscription(self, subscription_id: str):
+        resp = self._delete(f"subscriptions/{subscription_id}")
+        if resp.status_code != 204:
+            raise NakadiError(
+                f"Nakadi error during deletion of subscription '{subscription_id}'",
+                resp,
+            )
+
 
 class NakadiError(Exception):
-    def __init__(self, message: str, response: Response):
+    def __init__(self, message: str, response: Optional[Response] = None):
         self.response = response
         self._message = message
 
     def __str__(self):
+        if self.response is None:
+            return self._message
+
         code = self.response.status_code
         msg = f"{self._message}: {code}"
 
@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 import json
 from typing import Optional
 
@@ -12,9 +14,11 @@ from clin.utils import MS_IN_DAY
 
 
 class NakadiSql(HttpClient):
-    def get_sql_query(self, event_type: EventType) -> Optional[SqlQuery]:
+    def get_sql_query(
+        self, event_type: EventType, fresh: bool = False
+    ) -> Optional[SqlQuery]:
         try:
-            payload = self._get(f"queries/{event_type.name}")
+            payload = self._get(f"queries/{event_type.name}", fresh=fresh)
             return sql_query_from_payload(event_type, payload)
 
         except HTTPError as e:
@@ -24,6 +28,14 @@ class NakadiSql(HttpClient):
                 f"Nakadi error trying to get sql query '{event_type}'", e.response
             )
 
+    def list_sql_queries(self) -> list[dict]:
+        try:
+            payload = self._get("queries")
+            return payload["items"] if isinstance(payload, dict) else payload
+
+        except HTTPError as e:
+            raise NakadiError("Nakadi error during listing sql queries", e.response)
+
     def create_sql_query(self, query: SqlQuery):
         resp = self._post("queries", data=json.dumps(sql_query_to_payload(query)))
         if resp.status_code != 201:
@@ -40,6 +52,13 @@ class NakadiSql(HttpClient):
                 f"Nakadi error during updating sql query '{query.name}'", resp
             )
 
+    def delete_sql_query(self, name: str):
+        resp = self._delete(f"queries/{name}")
+        if resp.status_code not in (200, 204):
+            raise NakadiError(
+                f"Nakadi error during deletion of sql query '{name}'", resp
+            )
+
 
 def output_event_type_from_payload(
     event_type: EventType, payload: dict
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from typing import List, Optional
+
+from clin.clients.nakadi import event_type_from_payload, subscription_from_payload
+from clin.clients.nakadi_sql import sql_query_from_payload
+from clin.models.event_type import EventType
+from clin.models.shared import Kind
+from clin.models.sql_query import SqlQuery
+from clin.models.subscription import Subscription
+from clin.snapshot import Snapshot, SnapshotError, subscription_key
+
+
+class SnapshotNakadi:
+    """Answers the read requests of Nakadi from a snapshot"""
+
+    def __init__(self, snapshot: Snapshot):
+        self._snapshot = snapshot
+
+    def get_event_type(self, name: str, fresh: bool = False) -> Optional[EventType]:
+        payload = self.get_event_type_payload(name)
+        if payload is None:
+            return None
+        return event_type_from_payload(payload, self.get_partition_count(name))
+
+    def get_event_type_payload(self, name: str, fresh: bool = False) -> Optional[dict]:
+        record = self._snapshot.get(Kind.EVENT_TYPE, name)
+        return record["payload"] if record else None
+
+    def get_partition_count(self, name: str, fresh: bool = False) -> int:
+        record = self._snapshot.get(Kind.EVENT_TYPE, name)
+        if record is None:
+            raise SnapshotError(f"Event type '{name}' not found in the snapshot")
+        return record["partitions"]
+
+    def get_subscription(
+        self,
+        event_types: List,
+        owning_application: str,
+        consumer_group: str,
+        fresh: bool = False,
+    ) -> Optional[Subscription]:
+        payload = self._snapshot.get(
+            Kind.SUBSCRIPTION,
+            subscription_key(event_types, owning_application, consumer_group),
+        )
+        return subscription_from_payload(payload) if payload else None
+
+    def list_event_types(self) -> list[dict]:
+        return [
+            self._snapshot.get(Kind.EVENT_TYPE, name)["payload"]
+            for name in self._snapshot.names(Kind.EVENT_TYPE)
+        ]
+
+    def list_subscriptions(
+        self, owning_application: Optional[str] = None
+    ) -> list[dict]:
+        subscriptions = [
+            self._snapshot.get(Kind.SUBSCRIPTION, name)
+            for name in self._snapshot.names(Kind.SUBSCRIPTION)
+        ]
+        if owning_application:
+            return [
+                s
+                for s in subscriptions
+                if s["owning_application"] == owning_application
+            ]
+        return subscriptions
+
+    def create_event_type(self, event_type: EventType):
+        raise SnapshotError(f"Can not create {event_type} in a snapshot")
+
+    def update_event_type(self, event_type: EventType):
+        raise SnapshotError(f"Can not update {event_type} in a snapshot")
+
+    def create_subscription(self, subscription: Subscription):
+        raise SnapshotError(f"Can not create {subscription} in a snapshot")
+
+    def update_subscription(self, subscription: Subscription):
+        raise SnapshotError(f"Can not update {subscription} in a snapshot")
+
+    def delete_event_type(self, name: str):
+        raise SnapshotError(f"Can not delete event type '{name}' in a snapshot")
+
+    def delete_subscription(self, subscription_id: str):
+        raise SnapshotError(
+            f"Can not delete subscription '{subscription_id}' in a snapshot"
+        )
+
+
+class SnapshotNakadiSql:
+    """Answers the read requests of Nakadi SQL from a snapshot"""
+
+    def __init__(self, snapshot: Snapshot):
+        self._snapshot = snapshot
+
+    def get_sql_query(
+        self, event_type: EventType, fresh: bool = False
+    ) -> Optional[SqlQuery]:
+        payload = self._snapshot.get(Kind.SQL_QUERY, event_type.name)
+        return sql_query_from_payload(event_type, payload) if payload else None
+
+    def list_sql_queries(self) -> list[dict]:
+        return [
+            self._snapshot.get(Kind.SQL_QUERY, name)
+            for name in self._snapshot.names(Kind.SQL_QUERY)
+        ]
+
+    def create_sql_query(self, query: SqlQuery):
+        raise SnapshotError(f"Can not create {query} in a snapshot")
+
+    def update_sql_query(self, query: SqlQuery):
+        raise SnapshotError(f"Can not update {query} in a snapshot")
+
+    def delete_sql_query(self, name: str):
+        raise SnapshotError(f"Can not delete sql query '{name}' in a snapshot")
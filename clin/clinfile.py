@@ -1,12 +1,23 @@
 from __future__ import annotations
 
 import logging
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
 from dataclasses import dataclass
-from itertools import chain
 from pathlib import Path
+from typing import Iterator, Optional
 
+from clin.discovery import ManifestDiscovery
+from clin.manifest_index import ManifestIndex, ResourceFilter
 from clin.models.shared import Envelope, Kind
-from clin.yamlops import YamlLoader
+from clin.yamlops import (
+    IncludeGraph,
+    YamlLoader,
+    YamlInvalidFormatError,
+    locate_document_error,
+)
+
+LOAD_WINDOW_PER_JOB = 4
 
 
 @dataclass
@@ -23,12 +34,125 @@ def calculate_scope(
     loader: YamlLoader,
     filter_id: tuple[str],
     filter_env: tuple[str],
+    jobs: int = 1,
+    resource_filter: Optional[ResourceFilter] = None,
+    index: Optional[ManifestIndex] = None,
+    since_changes: Optional[set[Path]] = None,
 ) -> dict[Kind, list[Process]]:
+    scope = {kind: [] for kind in Kind}
+    for task in iterate_scope(
+        master,
+        base_path,
+        loader,
+        filter_id,
+        filter_env,
+        jobs,
+        resource_filter,
+        index,
+        since_changes,
+    ):
+        scope[task.envelope.kind].append(task)
+
+    return scope
+
+
+def iterate_scope(
+    master: dict,
+    base_path: Path,
+    loader: YamlLoader,
+    filter_id: tuple[str],
+    filter_env: tuple[str],
+    jobs: int = 1,
+    resource_filter: Optional[ResourceFilter] = None,
+    index: Optional[ManifestIndex] = None,
+    since_changes: Optional[set[Path]] = None,
+) -> Iterator[Process]:
+    """Yields the processes in the order of the clin file as soon as their
+    manifests are loaded. At most `jobs * LOAD_WINDOW_PER_JOB` manifests are
+    loaded ahead of the consumer. With a resource filter, the manifest index
+    is used to skip loading the files which can not match it. With changed
+    files, only the manifests which are or include one of them are loaded."""
     processes = master.get("process")
     if not processes:
         raise Exception("'process' section is not found")
 
-    scope = {kind: [] for kind in Kind}
+    if resource_filter and index is None:
+        index = ManifestIndex(loader)
+
+    manifests = _iterate_manifest_files(
+        processes,
+        base_path,
+        filter_id,
+        filter_env,
+        ManifestDiscovery(),
+        resource_filter,
+        index,
+    )
+    if since_changes is not None:
+        manifests = _affected_manifests(manifests, loader, since_changes)
+
+    window = deque()
+    load = _load_envelopes if jobs > 1 else _iter_envelopes
+    with _executor(jobs) as executor:
+        while True:
+            while len(window) < jobs * LOAD_WINDOW_PER_JOB:
+                nxt = next(manifests, None)
+                if nxt is None:
+                    break
+                proc, manifest_file = nxt
+                window.append(
+                    (
+                        proc,
+                        manifest_file,
+                        executor.submit(
+                            load, loader, manifest_file, proc.get("env", {})
+                        ),
+                    )
+                )
+
+            if not window:
+                return
+
+            proc, manifest_file, future = window.popleft()
+            logging.debug("Processing manifest file '%s'", manifest_file)
+            for envelope in future.result():
+                if resource_filter and not resource_filter.matches(envelope):
+                    continue
+                yield Process(
+                    id=proc["id"],
+                    path=str(manifest_file),
+                    envelope=envelope,
+                    target=proc["target"],
+                )
+
+
+def list_manifest_files(
+    master: dict, base_path: Path, filter_id: tuple[str], filter_env: tuple[str]
+) -> list[Path]:
+    """The manifest files of the selected processes, without loading them"""
+    return [
+        manifest_file
+        for _, manifest_file in _iterate_manifest_files(
+            master.get("process") or [],
+            base_path,
+            filter_id,
+            filter_env,
+            ManifestDiscovery(),
+            None,
+            None,
+        )
+    ]
+
+
+def _iterate_manifest_files(
+    processes: list[dict],
+    base_path: Path,
+    filter_id: tuple[str],
+    filter_env: tuple[str],
+    discovery: ManifestDiscovery,
+    resource_filter: Optional[ResourceFilter],
+    index: Optional[ManifestIndex],
+) -> Iterator[tuple[dict, Path]]:
     for proc in processes:
         if len(filter_id) > 0 and proc["id"] not in filter_id:
             continue
@@ -44,9 +168,7 @@ def calculate_scope(
                     f"Specified path 'f{source.absolute()}' is not found for process '{proc_id}'"
                 )
 
-            manifests_files += sorted(
-                chain(source.glob("*.yml"), source.glob("*.yaml"))
-            )
+            manifests_files += discovery.find(source, proc.get("recursive", False))
             if not manifests_files:
                 logging.warning(
                     "No manifests found for process '%s' in '%s'",
@@ -55,22 +177,72 @@ def calculate_scope(
                 )
 
         for manifest_file in manifests_files:
-            logging.debug("Processing manifest file '%s'", manifest_file)
-            manifest = loader.load_yaml_from_file(manifest_file, proc.get("env", {}))
+            if resource_filter and not any(
+                resource_filter.may_match(resource, proc.get("env", {}), index.loader)
+                for resource in index.resources(manifest_file)
+            ):
+                logging.debug("Skipping manifest file '%s'", manifest_file)
+                continue
+            yield proc, manifest_file
 
-            try:
-                envelope = Envelope.from_manifest(manifest)
-            except ValueError:
-                logging.error("Could not process manifest file '%s'", manifest_file)
-                raise
-
-            scope[envelope.kind].append(
-                Process(
-                    id=proc_id,
-                    path=str(manifest_file),
-                    envelope=envelope,
-                    target=proc["target"],
-                )
-            )
 
-    return scope
+def _affected_manifests(
+    manifests: Iterator[tuple[dict, Path]], loader: YamlLoader, changes: set[Path]
+) -> Iterator[tuple[dict, Path]]:
+    manifests = list(manifests)
+    graph = IncludeGraph(loader)
+    for _, manifest_file in manifests:
+        graph.add(manifest_file)
+
+    affected = graph.affected_by(changes)
+    for proc, manifest_file in manifests:
+        if manifest_file.resolve() in affected:
+            yield proc, manifest_file
+        else:
+            logging.debug("Skipping unchanged manifest file '%s'", manifest_file)
+
+
+def _iter_envelopes(
+    loader: YamlLoader, manifest_file: Path, env: dict
+) -> Iterator[Envelope]:
+    for index, manifest in loader.iter_yaml_from_file(manifest_file, env):
+        try:
+            envelope = Envelope.from_manifest(manifest)
+        except ValueError as ex:
+            error = YamlInvalidFormatError(manifest_file, str(ex))
+            raise locate_document_error(error, manifest_file, index) from ex
+        yield envelope
+
+
+def _load_envelopes(
+    loader: YamlLoader, manifest_file: Path, env: dict
+) -> list[Envelope]:
+    return list(_iter_envelopes(loader, manifest_file, env))
+
+
+def _executor(jobs: int) -> Executor:
+    return ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else _InlineExecutor()
+
+
+class _InlineExecutor(Executor):
+    """Runs submitted calls lazily in the calling thread, keeping the sequential
+    behaviour when no parallelism is requested."""
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        return _LazyFuture(fn, args, kwargs)
+
+
+class _LazyFuture(Future):
+    def __init__(self, fn, args, kwargs):
+        super().__init__()
+        self._call = (fn, args, kwargs)
+
+    def result(self, timeout=None):
+        if self._call:
+            fn, args, kwargs = self._call
+            self._call = None
+            try:
+                self.set_result(fn(*args, **kwargs))
+            except Exception as ex:
+                self.set_exception(ex)
+        return super().result(timeout)
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+from deepdiff import DeepDiff
+
+from clin.clients.nakadi import (
+    Nakadi,
+    event_type_from_payload,
+    subscription_from_payload,
+)
+from clin.clients.nakadi_sql import NakadiSql, sql_query_from_payload
+from clin.decisions import FINGERPRINT_ANNOTATION
+from clin.manifest_index import IndexedResource, ResourceFilter
+from clin.models.shared import Entity, Kind
+
+
+def fetch_inventory(
+    nakadi: Nakadi,
+    nakadi_sql: Optional[NakadiSql],
+    resource_filter: ResourceFilter,
+    jobs: int,
+) -> dict[str, Entity]:
+    """All resources of an environment matching the filter, by identity. Only
+    the partitions of matching event types are fetched."""
+    queries = (
+        {query["id"]: query for query in nakadi_sql.list_sql_queries()}
+        if nakadi_sql
+        else {}
+    )
+
+    def kind_of(name: str) -> Kind:
+        return Kind.SQL_QUERY if name in queries else Kind.EVENT_TYPE
+
+    event_types = [
+        payload
+        for payload in nakadi.list_event_types()
+        if resource_filter.may_match(
+            IndexedResource(str(kind_of(payload["name"])), [payload["name"]]), {}
+        )
+    ]
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        partitions = executor.map(
+            nakadi.get_partition_count, [p["name"] for p in event_types]
+        )
+
+        entities: list[Entity] = []
+        for payload, partition_count in zip(event_types, partitions):
+            event_type = event_type_from_payload(payload, partition_count)
+            event_type.annotations.pop(FINGERPRINT_ANNOTATION, None)
+            query = queries.get(event_type.name)
+            if query:
+                query = sql_query_from_payload(event_type, query)
+                query.output_event_type.annotations.pop(FINGERPRINT_ANNOTATION, None)
+            entities.append(query or event_type)
+
+    for payload in nakadi.list_subscriptions():
+        subscription = subscription_from_payload(payload)
+        # ids are generated by every environment, they never match
+        subscription.id = None
+        entities.append(subscription)
+
+    return {
+        entity.to_envelope().identity: entity
+        for entity in entities
+        if resource_filter.matches(entity.to_envelope())
+    }
+
+
+@dataclass
+class Comparison:
+    only_left: list[str] = field(default_factory=list)
+    only_right: list[str] = field(default_factory=list)
+    different: dict[str, DeepDiff] = field(default_factory=dict)
+    identical: int = 0
+
+
+def compare_inventories(
+    left: dict[str, Entity], right: dict[str, Entity]
+) -> Comparison:
+    comparison = Comparison(
+        only_left=sorted(left.keys() - right.keys()),
+        only_right=sorted(right.keys() - left.keys()),
+    )
+    for identity in sorted(left.keys() & right.keys()):
+        diff = DeepDiff(
+            left[identity],
+            right[identity],
+            ignore_order=True,
+            report_repetition=True,
+        )
+        if diff:
+            comparison.different[identity] = diff
+        else:
+            comparison.identical += 1
+    return comparison
+
+
+def changed_paths(diff: DeepDiff) -> list[str]:
+    """The paths changed according to the diff, without the root prefix"""
+    paths = set()
+    for changes in diff.values():
+        keys = changes.keys() if isinstance(changes, dict) else changes
+        for key in keys:
+            paths.add(str(key).replace("root.", "", 1).replace("root[", "[", 1))
+    return sorted(paths)
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+import click
+
+from clin.config import load_config
+from clin.utils import atomic_write_text, cache_dir
+from clin.workspace import CLIN_FILE_SUFFIX
+from clin.yamlops import YamlLoader
+
+# names older than this are still completed, and refreshed in the background
+NAMES_TTL = 3600
+# at most one background refresh is started per environment in this period
+REFRESH_INTERVAL = 60
+# passes the token to the refresh, which would show in its command line
+TOKEN_VARIABLE = "CLIN_TOKEN"
+
+
+def names_path(env: str) -> Path:
+    return cache_dir() / "names" / f"{env}.json"
+
+
+def refresh_marker_path(env: str) -> Path:
+    return names_path(env).with_suffix(".refreshing")
+
+
+def save_names(env: str, names: list[str]):
+    """Remembers the names of the event types and sql queries of the
+    environment for the shell completion"""
+    atomic_write_text(
+        names_path(env),
+        json.dumps({"saved_at": time.time(), "names": sorted(set(names))}),
+    )
+    try:
+        refresh_marker_path(env).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def load_names(env: str) -> tuple[list[str], bool]:
+    """The remembered names of the environment, and whether they are fresh"""
+    try:
+        content = json.loads(names_path(env).read_text())
+    except (OSError, ValueError):
+        return [], False
+    return content["names"], time.time() - content["saved_at"] < NAMES_TTL
+
+
+def refresh_in_background(env: str, token: Optional[str] = None):
+    """Refreshes the names of the environment in a detached process, so the
+    completion never waits for Nakadi. The errors of the process are kept in
+    the refresh marker until names are saved, see `refresh_failure`."""
+    marker = refresh_marker_path(env)
+    try:
+        if time.time() - marker.stat().st_mtime < REFRESH_INTERVAL:
+            return
+    except OSError:
+        pass
+    environ = dict(os.environ)
+    if token:
+        environ[TOKEN_VARIABLE] = token
+    try:
+        marker.parent.mkdir(parents=True, exist_ok=True)
+        with marker.open("wb") as errors:
+            subprocess.Popen(
+                [sys.executable, "-m", "clin.run", "refresh-names", "-e", env],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=errors,
+                env=environ,
+                start_new_session=True,
+            )
+    except OSError:
+        pass
+
+
+def refresh_failure(env: str) -> Optional[str]:
+    """The errors of the last background refresh of the environment, when it
+    failed to save the names"""
+    try:
+        errors = refresh_marker_path(env).read_text().strip()
+    except OSError:
+        return None
+    return errors or None
+
+
+def complete_env(ctx: click.Context, param: click.Parameter, incomplete: str):
+    try:
+        environments = load_config().environments
+    except Exception:
+        return []
+    return sorted(env for env in environments if env.startswith(incomplete))
+
+
+def complete_process_id(ctx: click.Context, param: click.Parameter, incomplete: str):
+    clin_file = ctx.params.get("file")
+    clin_files = (
+        [Path(clin_file)]
+        if clin_file
+        else sorted(Path.cwd().glob(f"*{CLIN_FILE_SUFFIX}"))
+    )
+    ids = set()
+    for path in clin_files:
+        ids.update(_process_ids(path))
+    return sorted(i for i in ids if i.startswith(incomplete))
+
+
+def complete_event_type(ctx: click.Context, param: click.Parameter, incomplete: str):
+    envs = _selected_envs(ctx)
+    if envs is None:
+        try:
+            envs = list(load_config().environments)
+        except Exception:
+            return []
+
+    names = set()
+    for env in envs:
+        known, fresh = load_names(env)
+        if not fresh:
+            refresh_in_background(env, ctx.params.get("token"))
+        names.update(known)
+    return sorted(name for name in names if name.startswith(incomplete))
+
+
+def _selected_envs(ctx: click.Context) -> Optional[list[str]]:
+    env = ctx.params.get("env")
+    if not env:
+        return None
+    return [env] if isinstance(env, str) else list(env)
+
+
+def _process_ids(clin_file: Path) -> list[str]:
+    """The process ids of the clin file, read without resolving its includes
+    and variables"""
+    try:
+        documents = YamlLoader().parse_raw_documents(clin_file.read_text())
+    except Exception:
+        return []
+    if not documents or not isinstance(documents[0], dict):
+        return []
+    return [
+        str(process["id"])
+        for process in documents[0].get("process") or []
+        # ids made of template variables are only known once resolved
+        if isinstance(process, dict) and "{{" not in str(process.get("id", "{{"))
+    ]
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import itertools
+from dataclasses import dataclass
+from typing import Optional
+
+from deepdiff import DeepDiff
+
+from clin.clients.nakadi import Nakadi, event_type_from_payload
+from clin.clients.nakadi_sql import NakadiSql
+from clin.models.event_type import EventType
+from clin.models.shared import Entity, fingerprint
+from clin.models.sql_query import SqlQuery
+from clin.models.subscription import Subscription
+from clin.plan import Action
+
+ALLOWED_SQL_CHANGE_PATHS_PREFIXES = [
+    "root.auth",
+    "root.output_event_type.annotations",
+    "root.sql",
+]
+FINGERPRINT_ANNOTATION = "clin/last-applied-fingerprint"
+
+
+@dataclass
+class Decision:
+    """What applying a manifest takes, decided from the current state of
+    Nakadi without changing it. `entity` is the resource to create or update,
+    `action` is None when it is up to date or its change is forbidden."""
+
+    entity: Entity
+    current: Optional[Entity]
+    action: Optional[Action]
+    diff: Optional[DeepDiff] = None
+    forbidden: bool = False
+    fingerprint_matched: bool = False
+
+
+def decide_event_type(
+    nakadi: Nakadi, spec: dict, use_fingerprint: bool = False, verify: bool = False
+) -> Decision:
+    et = EventType.from_spec(spec)
+    applied = fingerprint(spec)
+
+    payload = nakadi.get_event_type_payload(et.name)
+    if payload and _has_fingerprint(payload, applied, use_fingerprint, verify):
+        return Decision(et, None, None, fingerprint_matched=True)
+    outdated = use_fingerprint and _stored_fingerprint(payload) != applied
+
+    current = None
+    if payload:
+        current = event_type_from_payload(payload, nakadi.get_partition_count(et.name))
+        current.annotations.pop(FINGERPRINT_ANNOTATION, None)
+        diff = DeepDiff(current, et, ignore_order=True, report_repetition=True)
+        if not diff and not outdated:
+            return Decision(et, current, None)
+    else:
+        diff = None
+
+    if use_fingerprint:
+        et.annotations = {**et.annotations, FINGERPRINT_ANNOTATION: applied}
+    return Decision(
+        et, current, Action.UPDATE if current else Action.CREATE, diff or None
+    )
+
+
+def decide_sql_query(
+    nakadi: Nakadi,
+    nakadi_sql: NakadiSql,
+    spec: dict,
+    use_fingerprint: bool = False,
+    verify: bool = False,
+) -> Decision:
+    query = SqlQuery.from_spec(spec)
+    applied = fingerprint(spec)
+
+    payload = nakadi.get_event_type_payload(query.name)
+    if payload and _has_fingerprint(payload, applied, use_fingerprint, verify):
+        return Decision(query, None, None, fingerprint_matched=True)
+    outdated = use_fingerprint and _stored_fingerprint(payload) != applied
+
+    current_et = (
+        event_type_from_payload(payload, nakadi.get_partition_count(query.name))
+        if payload
+        else None
+    )
+    current = nakadi_sql.get_sql_query(current_et) if current_et else None
+    diff = None
+    if current:
+        current.output_event_type.annotations.pop(FINGERPRINT_ANNOTATION, None)
+        diff = DeepDiff(current, query, ignore_order=True, report_repetition=True)
+        if not diff and not outdated:
+            return Decision(query, current, None)
+        if not is_allowed_sql_change(diff):
+            return Decision(query, current, None, diff, forbidden=True)
+
+    if use_fingerprint:
+        query.output_event_type.annotations = {
+            **query.output_event_type.annotations,
+            FINGERPRINT_ANNOTATION: applied,
+        }
+    return Decision(
+        query, current, Action.UPDATE if current else Action.CREATE, diff or None
+    )
+
+
+def decide_subscription(nakadi: Nakadi, spec: dict) -> Decision:
+    sub = Subscription.from_spec(spec)
+    current = nakadi.get_subscription(
+        sub.event_types, sub.owning_application, sub.consumer_group
+    )
+    if not current:
+        return Decision(sub, None, Action.CREATE)
+
+    sub.id = current.id
+    diff = DeepDiff(current, sub, ignore_order=True, report_repetition=True)
+    return Decision(sub, current, Action.UPDATE if diff else None, diff or None)
+
+
+def current_entity(
+    nakadi: Nakadi,
+    nakadi_sql: Optional[NakadiSql],
+    entity: Entity,
+    fresh: bool = False,
+) -> Optional[Entity]:
+    """The remote state of the resource, without the fingerprint recorded by
+    clin. `nakadi_sql` is only needed for sql queries. `fresh` reads bypass
+    the caches, e.g. to check whether a plan is stale."""
+    if isinstance(entity, EventType):
+        current = nakadi.get_event_type(entity.name, fresh)
+        if current:
+            current.annotations.pop(FINGERPRINT_ANNOTATION, None)
+        return current
+
+    if isinstance(entity, SqlQuery):
+        current_et = nakadi.get_event_type(entity.name, fresh)
+        if not current_et:
+            return None
+        current = nakadi_sql.get_sql_query(current_et, fresh)
+        if current:
+            current.output_event_type.annotations.pop(FINGERPRINT_ANNOTATION, None)
+        return current
+
+    return nakadi.get_subscription(
+        entity.event_types, entity.owning_application, entity.consumer_group, fresh
+    )
+
+
+def is_allowed_sql_change(diff: dict) -> bool:
+    """Whether a running sql query can be updated with the changes"""
+    changed_keys = itertools.chain(
+        diff.get("values_changed", {}).keys(),
+        diff.get("iterable_item_removed", {}).keys(),
+        diff.get("iterable_item_added", {}).keys(),
+        diff.get("dictionary_item_added", []),
+        diff.get("dictionary_item_removed", []),
+    )
+
+    for key in changed_keys:
+        if not any(
+            key.startswith(prefix) for prefix in ALLOWED_SQL_CHANGE_PATHS_PREFIXES
+        ):
+            return False
+
+    return True
+
+
+def _has_fingerprint(
+    payload: dict, applied: str, use_fingerprint: bool, verify: bool
+) -> bool:
+    if not use_fingerprint or verify:
+        return False
+    return _stored_fingerprint(payload) == applied
+
+
+def _stored_fingerprint(payload: Optional[dict]) -> Optional[str]:
+    annotations = (payload or {}).get("annotations") or {}
+    return annotations.get(FINGERPRINT_ANNOTATION)
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import fnmatch
+import logging
+import os
+from itertools import chain
+from pathlib import Path
+from typing import Callable
+
+MANIFEST_SUFFIXES = (".yml", ".yaml")
+IGNORE_FILE = ".clinignore"
+
+
+class ManifestDiscovery:
+    """Finds manifest files in the paths of the processes. Listings are cached,
+    so paths shared by several processes are only scanned once."""
+
+    def __init__(self):
+        self._listings: dict[tuple[Path, bool], list[Path]] = {}
+
+    def find(self, source: Path, recursive: bool = False) -> list[Path]:
+        key = (source, recursive)
+        if key not in self._listings:
+            self._listings[key] = (
+                scan_tree(source, lambda name: name.endswith(MANIFEST_SUFFIXES))
+                if recursive
+                else sorted(chain(source.glob("*.yml"), source.glob("*.yaml")))
+            )
+        return self._listings[key]
+
+
+def scan_tree(root: Path, accept: Callable[[str], bool]) -> list[Path]:
+    """Recursively lists the files accepted by their name with a single pass of
+    os.scandir per directory. Entries matching the patterns of `.clinignore`
+    files are skipped, symlinked directories are followed only once."""
+    found = []
+    visited = set()
+
+    def scan(directory: Path, ignores: list[_IgnoreRules]):
+        stat = directory.stat()
+        if (stat.st_dev, stat.st_ino) in visited:
+            logging.warning("Skipping already scanned directory '%s'", directory)
+            return
+        visited.add((stat.st_dev, stat.st_ino))
+
+        with os.scandir(directory) as it:
+            entries = sorted(it, key=lambda e: e.name)
+
+        ignore_file = directory / IGNORE_FILE
+        if any(e.name == IGNORE_FILE and e.is_file() for e in entries):
+            ignores = ignores + [_IgnoreRules.load(ignore_file)]
+
+        for entry in entries:
+            path = Path(entry.path)
+            is_dir = entry.is_dir()
+            if any(rules.ignores(path, is_dir) for rules in ignores):
+                logging.debug("Ignoring '%s'", path)
+                continue
+
+            if is_dir:
+                scan(path, ignores)
+            elif entry.is_file() and accept(entry.name):
+                found.append(path)
+
+    scan(root, [])
+    return found
+
+
+class _IgnoreRules:
+    """A subset of the gitignore syntax: a pattern without a slash matches names
+    at any depth, a pattern with a slash matches paths relative to the ignore
+    file and a trailing slash restricts a pattern to directories."""
+
+    def __init__(self, base: Path, patterns: list[str]):
+        self._base = base
+        self._patterns = patterns
+
+    @staticmethod
+    def load(path: Path) -> _IgnoreRules:
+        lines = (line.strip() for line in path.read_text().splitlines())
+        return _IgnoreRules(
+            path.parent, [line for line in lines if line and not line.startswith("#")]
+        )
+
+    def ignores(self, path: Path, is_dir: bool) -> bool:
+        relative = path.relative_to(self._base).as_posix()
+        for pattern in self._patterns:
+            if pattern.endswith("/"):
+                if not is_dir:
+                    continue
+                pattern = pattern.rstrip("/")
+
+            if "/" in pattern:
+                if fnmatch.fnmatchcase(relative, pattern.lstrip("/")):
+                    return True
+            elif fnmatch.fnmatchcase(path.name, pattern):
+                return True
+
+        return False
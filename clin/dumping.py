@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import fnmatch
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Optional
+
+import yaml
+
+from clin.clients.nakadi import Nakadi, event_type_from_payload
+from clin.clients.nakadi_sql import NakadiSql, sql_query_from_payload
+from clin.models.shared import Entity, Kind, fingerprint
+from clin.models.sql_query import SqlQuery
+from clin.utils import plain_yaml
+
+SCHEMAS_DIR = "schemas"
+SCHEMA_NAME_LENGTH = 16
+MANIFEST_DIRS = {Kind.EVENT_TYPE: "event-types", Kind.SQL_QUERY: "sql-queries"}
+
+
+def select_event_types(
+    payloads: list[dict],
+    patterns: tuple[str],
+    owning_application: Optional[str],
+    select_all: bool,
+) -> list[dict]:
+    """The listed event types matching any of the name globs, or all of them,
+    restricted to the owning application if given"""
+    return [
+        payload
+        for payload in payloads
+        if (
+            select_all
+            or not patterns
+            or any(fnmatch.fnmatchcase(payload["name"], p) for p in patterns)
+        )
+        and (
+            owning_application is None
+            or payload.get("owning_application") == owning_application
+        )
+    ]
+
+
+class BulkDump:
+    """Writes the manifests of event types and sql queries to a directory
+    tree, each as soon as it is fetched. Every distinct JSON schema is written
+    once to the schemas directory and included by the manifests using it."""
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = output_dir
+        self._lock = threading.Lock()
+        self._schemas: set[str] = set()
+
+    def dump(
+        self,
+        nakadi: Nakadi,
+        nakadi_sql: Optional[NakadiSql],
+        payloads: list[dict],
+        jobs: int,
+    ) -> dict[Kind, int]:
+        queries = (
+            {query["id"]: query for query in nakadi_sql.list_sql_queries()}
+            if nakadi_sql
+            else {}
+        )
+
+        def dump_one(payload: dict) -> Kind:
+            event_type = event_type_from_payload(
+                payload, nakadi.get_partition_count(payload["name"])
+            )
+            query = queries.get(event_type.name)
+            entity = sql_query_from_payload(event_type, query) if query else event_type
+            self.write(entity)
+            return entity.kind
+
+        counts = {kind: 0 for kind in MANIFEST_DIRS}
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            for future in as_completed(
+                [executor.submit(dump_one, p) for p in payloads]
+            ):
+                counts[future.result()] += 1
+        return counts
+
+    def write(self, entity: Entity):
+        manifest = entity.to_envelope().to_manifest()
+        if not isinstance(entity, SqlQuery):
+            schema = manifest["spec"]["schema"]
+            schema["jsonSchema"] = "@@@../" + self._write_schema(schema["jsonSchema"])
+
+        path = self.output_dir / MANIFEST_DIRS[entity.kind] / f"{entity.name}.yaml"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(plain_yaml(manifest))
+
+    def write_clin_file(self, env: str) -> Path:
+        paths = [
+            f"./{directory}"
+            for directory in MANIFEST_DIRS.values()
+            if (self.output_dir / directory).is_dir()
+        ]
+        path = self.output_dir / f"{env}.clin.yaml"
+        path.write_text(
+            plain_yaml({"process": [{"id": env, "target": env, "paths": paths}]})
+        )
+        return path
+
+    def _write_schema(self, json_schema: dict) -> str:
+        name = f"{SCHEMAS_DIR}/{fingerprint(json_schema)[:SCHEMA_NAME_LENGTH]}.yaml"
+        with self._lock:
+            if name in self._schemas:
+                return name
+            self._schemas.add(name)
+
+        path = self.output_dir / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # schemas are written as they are, keeping their null values
+        path.write_text(yaml.dump(json_schema, sort_keys=False))
+        return name
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from clin.clinfile import Process
+from clin.processor import Outcome, ProcessingError
+from clin.utils import log_prefix
+
+
+@dataclass
+class EnvironmentResult:
+    env: str
+    outcomes: Counter = field(default_factory=Counter)
+    error: Optional[Exception] = None
+
+
+def apply_per_environment(
+    tasks: list[Process], apply: Callable[[Process], Optional[Outcome]]
+) -> list[EnvironmentResult]:
+    """Applies the tasks of every target environment in a thread of its own,
+    keeping their order within the environment. An environment stops at its
+    first failure without stopping the others."""
+    by_env: dict[str, list[Process]] = {}
+    for task in tasks:
+        by_env.setdefault(task.target, []).append(task)
+
+    def run(env: str) -> EnvironmentResult:
+        result = EnvironmentResult(env)
+        with log_prefix(env):
+            for task in by_env[env]:
+                try:
+                    outcome = apply(task)
+                except ProcessingError as ex:
+                    logging.error(ex)
+                    result.error = ex
+                    break
+                except Exception as ex:
+                    logging.exception(ex)
+                    result.error = ex
+                    break
+                result.outcomes[str(outcome) if outcome else "skipped"] += 1
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(len(by_env), 1)) as executor:
+        return list(executor.map(run, by_env))
+
+
+def log_environment_results(results: list[EnvironmentResult]):
+    for result in results:
+        outcomes = ", ".join(
+            f"{count} {outcome}" for outcome, count in sorted(result.outcomes.items())
+        )
+        if result.error:
+            logging.info("%s: failed after %s", result.env, outcomes or "nothing")
+        else:
+            logging.info("%s: %s", result.env, outcomes or "nothing to process")
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import logging
+import subprocess
+from pathlib import Path
+
+
+def changed_files(since: str, cwd: Path) -> set[Path]:
+    """Files of the local checkout changed since the given ref was forked off:
+    committed, staged, unstaged and untracked changes. Only local git plumbing
+    is used, nothing is fetched."""
+    top = Path(_git(cwd, "rev-parse", "--show-toplevel").strip())
+    base = _git(cwd, "merge-base", since, "HEAD").strip()
+    logging.debug("Looking up files changed since %s (%s)", since, base)
+
+    changed = _git(cwd, "diff", "--name-only", "-z", base, "--").split("\0")
+    untracked = _git(
+        cwd, "ls-files", "--others", "--exclude-standard", "-z", "--full-name"
+    ).split("\0")
+    return {(top / name).resolve() for name in changed + untracked if name}
+
+
+def _git(cwd: Path, *args: str) -> str:
+    try:
+        result = subprocess.run(
+            ["git", *args],
+            cwd=str(cwd),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+    except OSError as ex:
+        raise GitError(f"Can not run git: {ex}")
+
+    if result.returncode != 0:
+        raise GitError(f"git {' '.join(args)} failed: {result.stderr.strip()}")
+    return result.stdout
+
+
+class GitError(Exception):
+    def __init__(self, message: str):
+        self.message = message
+
+    def __str__(self):
+        return self.message
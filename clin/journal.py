@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from clin.clinfile import Process
+from clin.processor import Outcome
+
+FAILED = "failed"
+APPLIED_RESULTS = {str(outcome) for outcome in Outcome if outcome.applied}
+
+
+class Journal:
+    """Append-only record of the outcome of every processed task. Each record
+    is a JSON line appended with a single write and synced to disk before the
+    next task is processed, so a crash can at most leave a torn last line,
+    which is ignored when the journal is read again and terminated before
+    appending to it."""
+
+    def __init__(self, path: Path, resume_from: Optional[Path] = None):
+        self._completed: dict[tuple[str, str, str, str], str] = {}
+        if resume_from:
+            self._completed = _read_completed(resume_from)
+
+        self._lock = threading.Lock()
+        self._fd = os.open(str(path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        if _ends_with_torn_line(path):
+            os.write(self._fd, b"\n")
+
+    def is_completed(self, task: Process) -> bool:
+        """Whether the task was completed with the same envelope before"""
+        return self._completed.get(_key(task)) == task.envelope.fingerprint()
+
+    def record(self, task: Process, result: str):
+        line = json.dumps(
+            {
+                "id": task.id,
+                "target": task.target,
+                "path": task.path,
+                "identity": task.envelope.identity,
+                "fingerprint": task.envelope.fingerprint(),
+                "result": result,
+            }
+        )
+        with self._lock:
+            os.write(self._fd, (line + "\n").encode())
+            os.fsync(self._fd)
+
+    def close(self):
+        with self._lock:
+            os.close(self._fd)
+
+
+def _key(task: Process) -> tuple[str, str, str, str]:
+    return task.id, task.target, task.path, task.envelope.identity
+
+
+def _ends_with_torn_line(path: Path) -> bool:
+    with path.open("rb") as f:
+        if f.seek(0, os.SEEK_END) == 0:
+            return False
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+def _read_completed(path: Path) -> dict[tuple[str, str, str, str], str]:
+    completed = {}
+    if not path.is_file():
+        return completed
+
+    with path.open() as f:
+        for number, line in enumerate(f, start=1):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logging.debug("Ignoring torn line %d of journal %s", number, path)
+                continue
+
+            key = (record["id"], record["target"], record["path"], record["identity"])
+            if record["result"] in APPLIED_RESULTS:
+                completed[key] = record["fingerprint"]
+            else:
+                completed.pop(key, None)
+    return completed
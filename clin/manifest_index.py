@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import fnmatch
+import hashlib
+import json
+import logging
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Optional
+
+from clin.models.shared import Envelope, Kind
+from clin.utils import atomic_write_text, cache_dir
+from clin.yamlops import YamlLoader
+
+INDEX_VERSION = 1
+
+
+@dataclass
+class IndexedResource:
+    kind: Optional[str]
+    names: list[str]
+
+
+@dataclass
+class IndexEntry:
+    mtime_ns: int
+    size: int
+    digest: str
+    resources: list[IndexedResource]
+
+    @staticmethod
+    def from_dict(content: dict) -> IndexEntry:
+        return IndexEntry(
+            mtime_ns=content["mtime_ns"],
+            size=content["size"],
+            digest=content["digest"],
+            resources=[IndexedResource(**r) for r in content["resources"]],
+        )
+
+
+@dataclass
+class ResourceFilter:
+    """Selects resources by kind and by name globs. Subscriptions are matched by
+    the names of their event types."""
+
+    kinds: tuple[str]
+    names: tuple[str]
+
+    def __bool__(self) -> bool:
+        return bool(self.kinds or self.names)
+
+    def matches(self, envelope: Envelope) -> bool:
+        return self._matches(str(envelope.kind), resource_names(envelope.spec))
+
+    def may_match(
+        self,
+        resource: IndexedResource,
+        env: dict,
+        loader: Optional[YamlLoader] = None,
+    ) -> bool:
+        """Like `matches` for a not yet loaded resource. Kinds and names that are
+        not known before loading the manifest may always match. Names are
+        resolved with the markers of the loader the manifests are loaded with."""
+        loader = loader or YamlLoader()
+        names = [loader.resolve_raw_name(name, env) for name in resource.names]
+        return self._matches(resource.kind, names)
+
+    def _matches(self, kind: Optional[str], names: list[Optional[str]]) -> bool:
+        if self.kinds and kind is not None and kind not in self.kinds:
+            return False
+        if not self.names or not names:
+            return True
+        return any(
+            name is None or fnmatch.fnmatchcase(name, pattern)
+            for name in names
+            for pattern in self.names
+        )
+
+
+class ManifestIndex:
+    """Maps manifest files to the kinds and names of their resources. Entries
+    are refreshed when the modification time or size of a file changes and its
+    content hash differs."""
+
+    def __init__(self, loader: YamlLoader, path: Optional[Path] = None):
+        self._loader = loader
+        self._path = path
+        self._entries: dict[str, IndexEntry] = {}
+        self._dirty = False
+
+        if path and path.is_file():
+            try:
+                content = json.loads(path.read_text())
+                if content.get("version") == INDEX_VERSION:
+                    self._entries = {
+                        name: IndexEntry.from_dict(entry)
+                        for name, entry in content["files"].items()
+                    }
+            except Exception as ex:
+                logging.debug("Ignoring unreadable manifest index %s: %s", path, ex)
+
+    @property
+    def loader(self) -> YamlLoader:
+        """The loader parsing the indexed manifests"""
+        return self._loader
+
+    @staticmethod
+    def for_clin_file(loader: YamlLoader, clin_file: Path) -> ManifestIndex:
+        key = hashlib.sha1(str(clin_file.resolve()).encode()).hexdigest()
+        return ManifestIndex(loader, cache_dir() / "manifests" / f"{key}.json")
+
+    def resources(self, manifest_file: Path) -> list[IndexedResource]:
+        key = str(manifest_file)
+        stat = manifest_file.stat()
+        entry = self._entries.get(key)
+        if entry and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+            return entry.resources
+
+        content = manifest_file.read_bytes()
+        digest = hashlib.sha256(content).hexdigest()
+        if not entry or entry.digest != digest:
+            logging.debug("Indexing manifest file '%s'", manifest_file)
+            entry = IndexEntry(0, 0, digest, self._extract(content.decode()))
+
+        entry.mtime_ns = stat.st_mtime_ns
+        entry.size = stat.st_size
+        self._entries[key] = entry
+        self._dirty = True
+        return entry.resources
+
+    def save(self):
+        if not self._path or not self._dirty:
+            return
+
+        content = {
+            "version": INDEX_VERSION,
+            "files": {name: asdict(entry) for name, entry in self._entries.items()},
+        }
+        atomic_write_text(self._path, json.dumps(content))
+        self._dirty = False
+
+    def _extract(self, content: str) -> list[IndexedResource]:
+        try:
+            documents = self._loader.parse_raw_documents(content)
+        except Exception:
+            return [IndexedResource(kind=None, names=[])]
+
+        resources = []
+        for manifest in documents:
+            kind = manifest.get("kind") if isinstance(manifest, dict) else None
+            spec = manifest.get("spec") if isinstance(manifest, dict) else None
+            resources.append(
+                IndexedResource(
+                    kind=kind if kind in set(str(k) for k in Kind) else None,
+                    names=resource_names(spec if isinstance(spec, dict) else {}),
+                )
+            )
+        return resources
+
+
+def resource_names(spec: dict) -> list[str]:
+    """Event types and sql queries are named by their name, subscriptions by
+    the names of their event types."""
+    names = spec.get("eventTypes", []) if "eventTypes" in spec else [spec.get("name")]
+    return (
+        [name for name in names if isinstance(name, str)]
+        if isinstance(names, list)
+        else []
+    )
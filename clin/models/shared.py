@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import hashlib
+import json
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from enum import unique, Enum
@@ -173,6 +175,21 @@ class Envelope:
             "spec": self.spec,
         }
 
+    @property
+    def identity(self) -> str:
+        """Identifies the Nakadi resource the envelope describes. Subscriptions
+        are identified by their application, consumer group and event types."""
+        if self.kind == Kind.SUBSCRIPTION:
+            event_types = ",".join(sorted(self.spec.get("eventTypes", [])))
+            return (
+                f"{self.kind}:{self.spec.get('owningApplication')}"
+                f":{self.spec.get('consumerGroup')}:{event_types}"
+            )
+        return f"{self.kind}:{self.spec.get('name')}"
+
+    def fingerprint(self) -> str:
+        return fingerprint(self.to_manifest())
+
 
 class Entity(ABC):
     @property
@@ -186,3 +203,9 @@ class Entity(ABC):
 
     def to_envelope(self) -> Envelope:
         return Envelope(kind=self.kind, spec=self.to_spec())
+
+
+def fingerprint(content: any) -> str:
+    """Stable hash of JSON-like content, independent of the order of keys"""
+    canonical = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
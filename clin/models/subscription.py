@@ -51,4 +51,9 @@ class Subscription(Entity):
         )
 
     def to_spec(self) -> dict[str, any]:
-        raise NotImplementedError()
+        return {
+            "owningApplication": self.owning_application,
+            "eventTypes": self.event_types,
+            "consumerGroup": self.consumer_group,
+            "auth": self.auth.to_spec() if self.auth else {},
+        }
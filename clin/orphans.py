@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from clin.clients.nakadi import subscription_from_payload
+from clin.clinfile import Process
+from clin.models.shared import Kind
+
+# subscriptions are deleted before the event types they read, sql queries
+# before the event types they write
+DELETION_ORDER = [Kind.SUBSCRIPTION, Kind.SQL_QUERY, Kind.EVENT_TYPE]
+
+
+@dataclass
+class Orphan:
+    """A resource owned by an application of the clin file, but not declared
+    by it"""
+
+    env: str
+    kind: Kind
+    identity: str
+    name: str
+    subscription_id: Optional[str] = None
+
+    def __str__(self) -> str:
+        if self.kind == Kind.SUBSCRIPTION:
+            return f"subscription {self.subscription_id} ({self.name})"
+        return f"{self.kind} {self.name}"
+
+
+def declared_applications(tasks: Iterable[Process]) -> dict[str, set[str]]:
+    """The applications owning the declared resources, per environment"""
+    applications = {}
+    for task in tasks:
+        spec = task.envelope.spec
+        application = (
+            spec.get("outputEventType", {}).get("owningApplication")
+            if task.envelope.kind == Kind.SQL_QUERY
+            else spec.get("owningApplication")
+        )
+        envs = applications.setdefault(task.target, set())
+        if application:
+            envs.add(application)
+    return applications
+
+
+def find_orphans(
+    env: str,
+    applications: set[str],
+    declared: set[str],
+    event_types: list[dict],
+    query_names: set[str],
+    subscriptions: list[dict],
+) -> list[Orphan]:
+    """Compares the listed resources of the applications with the declared
+    identities, in deletion order"""
+    orphans = []
+    for payload in subscriptions:
+        if payload["owning_application"] not in applications:
+            continue
+        subscription = subscription_from_payload(payload)
+        identity = subscription.to_envelope().identity
+        if identity not in declared:
+            orphans.append(
+                Orphan(
+                    env,
+                    Kind.SUBSCRIPTION,
+                    identity,
+                    ", ".join(sorted(subscription.event_types)),
+                    str(subscription.id),
+                )
+            )
+
+    owned = [p for p in event_types if p.get("owning_application") in applications]
+    for kind in (Kind.SQL_QUERY, Kind.EVENT_TYPE):
+        for payload in owned:
+            name = payload["name"]
+            if (name in query_names) != (kind == Kind.SQL_QUERY):
+                continue
+            identity = f"{kind}:{name}"
+            if identity not in declared:
+                orphans.append(Orphan(env, kind, identity, name))
+    return orphans
@@ -0,0 +1,83 @@
+import logging
+import threading
+from queue import Full, Queue
+from typing import Callable, Iterable
+
+from clin.clinfile import Process
+from clin.models.shared import Kind
+
+STREAM_QUEUE_SIZE = 64
+STREAM_POLL_INTERVAL = 0.1
+
+
+def run_pipelined(
+    tasks: Iterable[Process],
+    apply: Callable[[Process], None],
+    queue_size: int = STREAM_QUEUE_SIZE,
+):
+    """Applies the tasks while they are still being loaded in a background
+    thread. Event types are applied as soon as they arrive. SQL queries and
+    subscriptions may depend on any event type, so they are kept back and
+    applied in order once all the tasks are loaded."""
+    loaded = Queue(maxsize=queue_size)
+    stopped = threading.Event()
+
+    def produce():
+        try:
+            for task in tasks:
+                if not _put(loaded, task, stopped):
+                    return
+            _put(loaded, _Done(), stopped)
+        except BaseException as ex:
+            _put(loaded, _Failed(ex), stopped)
+        finally:
+            if hasattr(tasks, "close"):
+                tasks.close()
+
+    producer = threading.Thread(target=produce, name="clin-loader", daemon=True)
+    producer.start()
+
+    deferred = {Kind.SQL_QUERY: [], Kind.SUBSCRIPTION: []}
+    try:
+        while True:
+            item = loaded.get()
+            if isinstance(item, _Done):
+                break
+            if isinstance(item, _Failed):
+                raise item.error
+
+            if item.envelope.kind in deferred:
+                deferred[item.envelope.kind].append(item)
+            else:
+                apply(item)
+
+    finally:
+        stopped.set()
+        producer.join()
+
+    logging.debug(
+        "All manifests loaded, applying %d sql queries and %d subscriptions",
+        len(deferred[Kind.SQL_QUERY]),
+        len(deferred[Kind.SUBSCRIPTION]),
+    )
+    for task in deferred[Kind.SQL_QUERY] + deferred[Kind.SUBSCRIPTION]:
+        apply(task)
+
+
+def _put(queue: Queue, item, stopped: threading.Event) -> bool:
+    while not stopped.is_set():
+        try:
+            queue.put(item, timeout=STREAM_POLL_INTERVAL)
+            return True
+        except Full:
+            continue
+    return False
+
+
+class _Done:
+    pass
+
+
+class _Failed:
+    def __init__(self, error: BaseException):
+        self.error = error
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from enum import Enum, unique
+from pathlib import Path
+from typing import Optional
+
+from clin.models.event_type import EventType
+from clin.models.shared import Entity, Kind, fingerprint
+from clin.models.sql_query import SqlQuery
+from clin.models.subscription import Subscription
+from clin.sharding import spec_dependency_names
+from clin.utils import atomic_write_text
+
+PLAN_VERSION = 1
+
+
+@unique
+class Action(str, Enum):
+    CREATE = "create"
+    UPDATE = "update"
+
+    def __str__(self) -> str:
+        return str(self.value)
+
+
+@dataclass
+class PlannedAction:
+    """A create or update decided during a dry run. `observed` is the
+    fingerprint of the remote resource at that time, None if it was absent.
+    `diff` holds the changes of an update."""
+
+    env: str
+    kind: Kind
+    action: Action
+    spec: dict[str, any]
+    observed: Optional[str]
+    subscription_id: Optional[str] = None
+    diff: Optional[dict[str, any]] = None
+
+    def entity(self) -> Entity:
+        if self.kind == Kind.EVENT_TYPE:
+            return EventType.from_spec(self.spec)
+        if self.kind == Kind.SQL_QUERY:
+            return SqlQuery.from_spec(self.spec)
+        sub = Subscription.from_spec(self.spec)
+        sub.id = self.subscription_id
+        return sub
+
+    def to_dict(self) -> dict[str, any]:
+        return {
+            "env": self.env,
+            "kind": str(self.kind),
+            "action": str(self.action),
+            "spec": self.spec,
+            "observed": self.observed,
+            "subscription_id": self.subscription_id,
+            "diff": self.diff,
+        }
+
+    @staticmethod
+    def from_dict(content: dict[str, any]) -> PlannedAction:
+        return PlannedAction(
+            env=content["env"],
+            kind=Kind(content["kind"]),
+            action=Action(content["action"]),
+            spec=content["spec"],
+            observed=content.get("observed"),
+            subscription_id=content.get("subscription_id"),
+            diff=content.get("diff"),
+        )
+
+
+@dataclass
+class Plan:
+    """The actions of a dry run. Forbidden changes of sql queries are kept
+    apart, they can not be executed."""
+
+    actions: list[PlannedAction] = field(default_factory=list)
+    forbidden: list[PlannedAction] = field(default_factory=list)
+
+    def add(
+        self,
+        env: str,
+        action: Action,
+        entity: Entity,
+        current: Optional[Entity],
+        diff: Optional[dict[str, any]] = None,
+    ):
+        self.actions.append(planned_action(env, action, entity, current, diff))
+
+    def save(self, path: Path):
+        content = {
+            "version": PLAN_VERSION,
+            "actions": [action.to_dict() for action in self.actions],
+            "forbidden": [action.to_dict() for action in self.forbidden],
+        }
+        atomic_write_text(path, json.dumps(content, indent=2))
+
+    @staticmethod
+    def load(path: Path) -> Plan:
+        try:
+            content = json.loads(path.read_text())
+        except Exception as ex:
+            raise PlanError(f"Failed to read plan {path}: {ex}")
+
+        if content.get("version") != PLAN_VERSION:
+            raise PlanError(f"Unsupported plan version in {path}")
+        return Plan(
+            [PlannedAction.from_dict(a) for a in content["actions"]],
+            [PlannedAction.from_dict(a) for a in content.get("forbidden", [])],
+        )
+
+
+def planned_action(
+    env: str,
+    action: Action,
+    entity: Entity,
+    current: Optional[Entity],
+    diff: Optional[dict[str, any]] = None,
+) -> PlannedAction:
+    return PlannedAction(
+        env=env,
+        kind=entity.kind,
+        action=action,
+        spec=entity.to_spec(),
+        observed=observed_fingerprint(current),
+        subscription_id=str(current.id) if isinstance(current, Subscription) else None,
+        diff=diff,
+    )
+
+
+def observed_fingerprint(entity: Optional[Entity]) -> Optional[str]:
+    if entity is None:
+        return None
+    content = entity.to_envelope().to_manifest()
+    if isinstance(entity, Subscription):
+        content["id"] = str(entity.id)
+    return fingerprint(content)
+
+
+def refused_dependencies(
+    actions: list[PlannedAction], stale: list[bool]
+) -> list[Optional[str]]:
+    """For every action which is not stale itself, the name of the refused
+    resource it reads, directly or through other skipped sql queries, else
+    None. The actions are expected in plan order, dependencies first."""
+    refused: dict[tuple[str, str], str] = {}
+    dependencies = []
+    for action, is_stale in zip(actions, stale):
+        names = spec_dependency_names(action.kind, action.spec)
+        declared = names[0] if names and action.kind != Kind.SUBSCRIPTION else None
+        if is_stale:
+            dependencies.append(None)
+            if declared:
+                refused[(action.env, declared)] = declared
+            continue
+
+        dependency = next(
+            (refused[(action.env, n)] for n in names if (action.env, n) in refused),
+            None,
+        )
+        dependencies.append(dependency)
+        if dependency and declared:
+            refused[(action.env, declared)] = dependency
+    return dependencies
+
+
+class PlanError(Exception):
+    def __init__(self, message: str):
+        self.message = message
+
+    def __str__(self):
+        return self.message
@@ -1,11 +1,12 @@
-import itertools
 import json
 import logging
-from typing import Optional, Dict, Callable
+from enum import Enum, unique
+from typing import Optional, Dict, Callable, List, Set, Tuple
 
 from colorama import Fore
 from deepdiff import DeepDiff
 
+from clin.clients.http_client import HttpClient, ResponseCache
 from clin.clients.nakadi import (
     Nakadi,
     NakadiError,
@@ -13,23 +14,58 @@ from clin.clients.nakadi import (
     subscription_to_payload,
 )
 from clin.clients.nakadi_sql import NakadiSql, sql_query_to_payload
+from clin.clients.snapshot import SnapshotNakadi, SnapshotNakadiSql
 from clin.config import AppConfig
+from clin.decisions import (
+    Decision,
+    current_entity,
+    decide_event_type,
+    decide_sql_query,
+    decide_subscription,
+)
 from clin.models.auth import ReadWriteAuth, ReadOnlyAuth
 from clin.models.event_type import EventType
-from clin.models.shared import Kind, Envelope, Entity, EventOwnerSelector
+from clin.models.shared import (
+    Kind,
+    Envelope,
+    Entity,
+    EventOwnerSelector,
+)
 from clin.models.sql_query import SqlQuery
 from clin.models.subscription import Subscription
+from clin.orphans import Orphan, find_orphans
+from clin.plan import (
+    Action,
+    Plan,
+    PlannedAction,
+    observed_fingerprint,
+    planned_action,
+)
+from clin.snapshot import Snapshot, SnapshotError
 from clin.utils import pretty_yaml, pretty_json
 
 MODIFY_COLOR = Fore.MAGENTA
 ERROR_COLOR = Fore.RED
 UP_TO_DATE_COLOR = Fore.GREEN
 OUTPUT_INDENTATION = 4
-ALLOWED_SQL_CHANGE_PATHS_PREFIXES = [
-    "root.auth",
-    "root.output_event_type.annotations",
-    "root.sql",
-]
+
+
+@unique
+class Outcome(str, Enum):
+    CREATED = "created"
+    UPDATED = "updated"
+    UP_TO_DATE = "up-to-date"
+    WILL_CREATE = "will-create"
+    WILL_UPDATE = "will-update"
+    FORBIDDEN = "forbidden"
+
+    def __str__(self) -> str:
+        return str(self.value)
+
+    @property
+    def applied(self) -> bool:
+        """Whether the remote resource matches the manifest afterwards"""
+        return self in (Outcome.CREATED, Outcome.UPDATED, Outcome.UP_TO_DATE)
 
 
 class Processor:
@@ -40,8 +76,13 @@ class Processor:
         execute: bool = False,
         show_diff: bool = False,
         show_payload: bool = False,
+        fingerprint: bool = False,
+        verify: bool = False,
+        plan: Optional[Plan] = None,
+        snapshots: Optional[Dict[str, Snapshot]] = None,
+        cache: Optional[ResponseCache] = None,
     ):
-        self.apply_func_per_kind: Dict[Kind, Callable[[str, dict], None]] = {
+        self.apply_func_per_kind: Dict[Kind, Callable[[str, dict], Outcome]] = {
             Kind.EVENT_TYPE: self.apply_event_type,
             Kind.SQL_QUERY: self.apply_sql_query,
             Kind.SUBSCRIPTION: self.apply_subscription,
@@ -52,144 +93,154 @@ class Processor:
         self.execute = execute
         self.show_diff = show_diff
         self.show_payload = show_payload
-
-    def apply(self, env: str, envelope: Envelope):
+        self.fingerprint = fingerprint
+        self.verify = verify
+        self.plan = plan
+        self.snapshots = snapshots
+        self.cache = cache
+        # clients are kept to reuse their connections
+        self._clients: Dict[Tuple[type, str], HttpClient] = {}
+
+    def apply(self, env: str, envelope: Envelope) -> Outcome:
         apply = self.apply_func_per_kind.get(envelope.kind, None)
         if apply is None:
             raise ProcessingError(f"Unsupported kind: {envelope.kind}")
-        apply(env, envelope.spec)
+        return apply(env, envelope.spec)
 
-    def apply_event_type(self, env: str, spec: dict):
+    def apply_event_type(self, env: str, spec: dict) -> Outcome:
         nakadi = self._get_nakadi(env)
         et = EventType.from_spec(spec)
 
         try:
-            current = nakadi.get_event_type(et.name)
-            if current:
-                logging.debug("Found existing %s", et)
-                diff = DeepDiff(current, et, ignore_order=True, report_repetition=True)
-                if diff:
-                    self._maybe_print_diff(et, diff)
-                    self._maybe_print_payload(et)
-                    self._update_event_type(nakadi, et)
-
-                else:
-                    logging.info(f"{UP_TO_DATE_COLOR}✔ Up to date:{Fore.RESET} %s", et)
-
-            else:
-                logging.debug("Not found existing %s", et)
-                self._maybe_print_payload(et)
-                self._create_event_type(nakadi, et)
+            decision = decide_event_type(nakadi, spec, self.fingerprint, self.verify)
+            return self._apply_decision(
+                env,
+                decision,
+                lambda: self._create_event_type(nakadi, decision.entity),
+                lambda: self._update_event_type(nakadi, decision.entity),
+            )
 
-        except NakadiError as err:
+        except (NakadiError, SnapshotError) as err:
             raise ProcessingError(f"Can not process {et}: {err}") from err
 
-    def apply_sql_query(self, env: str, spec: dict):
+    def apply_sql_query(self, env: str, spec: dict) -> Outcome:
         nakadi = self._get_nakadi(env)
         nakadi_sql = self._get_nakadi_sql(env)
         query = SqlQuery.from_spec(spec)
 
-        def is_allowed_change(diff: dict):
-            changed_keys = itertools.chain(
-                diff.get("values_changed", {}).keys(),
-                diff.get("iterable_item_removed", {}).keys(),
-                diff.get("iterable_item_added", {}).keys(),
-                diff.get("dictionary_item_added", []),
-                diff.get("dictionary_item_removed", []),
-            )
-
-            for key in changed_keys:
-                if not any(
-                    key.startswith(prefix)
-                    for prefix in ALLOWED_SQL_CHANGE_PATHS_PREFIXES
-                ):
-                    return False
-
-            return True
-
         try:
-            current_et = nakadi.get_event_type(query.name)
-            current = nakadi_sql.get_sql_query(current_et) if current_et else None
-            if current:
-                logging.debug("Found existing %s", query)
-                diff = DeepDiff(
-                    current, query, ignore_order=True, report_repetition=True
-                )
-                if diff:
-                    self._maybe_print_diff(query, diff)
-                    if is_allowed_change(diff):
-                        self._maybe_print_payload(query)
-                        self._update_sql_query(nakadi_sql, query)
-                    else:
-                        logging.info(
-                            f"{ERROR_COLOR}× Modifying is forbidden:{Fore.RESET} %s",
-                            query,
-                        )
-                else:
-                    logging.info(
-                        f"{UP_TO_DATE_COLOR}✔ Up to date:{Fore.RESET} %s", query
-                    )
-
-            else:
-                logging.debug("Not found existing %s", query)
-                self._maybe_print_payload(query)
-                self._create_sql_query(nakadi_sql, query)
+            decision = decide_sql_query(
+                nakadi, nakadi_sql, spec, self.fingerprint, self.verify
+            )
+            return self._apply_decision(
+                env,
+                decision,
+                lambda: self._create_sql_query(nakadi_sql, decision.entity),
+                lambda: self._update_sql_query(nakadi_sql, decision.entity),
+            )
 
-        except NakadiError as err:
+        except (NakadiError, SnapshotError) as err:
             raise ProcessingError(f"Can not process {query}: {err}") from err
 
-    def apply_subscription(self, env: str, spec: dict):
+    def apply_subscription(self, env: str, spec: dict) -> Outcome:
         nakadi = self._get_nakadi(env)
         sub = Subscription.from_spec(spec)
 
         try:
-            current = nakadi.get_subscription(
-                sub.event_types, sub.owning_application, sub.consumer_group
+            decision = decide_subscription(nakadi, spec)
+            return self._apply_decision(
+                env,
+                decision,
+                lambda: self._create_subscription(nakadi, decision.entity),
+                lambda: self._update_subscription(nakadi, decision.entity),
             )
-            if current:
-                logging.debug("Found existing %s", current)
-                sub.id = current.id
-                diff = DeepDiff(current, sub, ignore_order=True, report_repetition=True)
-                if diff:
-                    self._maybe_print_diff(sub, diff)
-                    self._maybe_print_payload(sub)
-                    self._update_subscription(nakadi, sub)
-
-                else:
-                    logging.info(f"{UP_TO_DATE_COLOR}✔ Up to date:{Fore.RESET} %s", sub)
-
-            else:
-                logging.debug("Not found existing subscriptions matching: %s", sub)
-                self._maybe_print_payload(sub)
-                self._create_subscription(nakadi, sub)
 
-        except NakadiError as err:
+        except (NakadiError, SnapshotError) as err:
             raise ProcessingError(f"Can not process {sub}: {err}") from err
 
-    def _maybe_print_diff(self, entity: Entity, diff: DeepDiff):
-        def convert_to_spec(x):
-            return x.to_spec()
-
-        if self.show_diff:
-            safe_diff = json.loads(
-                diff.to_json(
-                    default_mapping={
-                        ReadOnlyAuth: convert_to_spec,
-                        ReadWriteAuth: convert_to_spec,
-                        EventType: convert_to_spec,
-                        EventOwnerSelector: convert_to_spec,
-                        SqlQuery: convert_to_spec,
-                        Subscription: convert_to_spec,
-                        Entity: convert_to_spec,
-                    }
+    def is_stale(self, action: PlannedAction) -> bool:
+        """Whether the remote resource changed since the action was planned"""
+        return is_stale(
+            action, self._get_nakadi(action.env), self._planned_nakadi_sql(action)
+        )
+
+    def execute_planned(self, action: PlannedAction) -> Outcome:
+        entity = action.entity()
+        create = action.action == Action.CREATE
+        if not self.execute:
+            verb = "Will create" if create else "Will update"
+            logging.info(f"{MODIFY_COLOR}⦿ {verb}:{Fore.RESET} %s", entity)
+            return Outcome.WILL_CREATE if create else Outcome.WILL_UPDATE
+
+        outcome = execute_action(
+            action, self._get_nakadi(action.env), self._planned_nakadi_sql(action)
+        )
+        verb = "Created" if create else "Updated"
+        logging.info(f"{MODIFY_COLOR}⦿ {verb}:{Fore.RESET} %s", entity)
+        return outcome
+
+    def _planned_nakadi_sql(self, action: PlannedAction) -> Optional[NakadiSql]:
+        if action.kind != Kind.SQL_QUERY:
+            return None
+        return self._get_nakadi_sql(action.env)
+
+    def _apply_decision(
+        self,
+        env: str,
+        decision: Decision,
+        create: Callable[[], Outcome],
+        update: Callable[[], Outcome],
+    ) -> Outcome:
+        entity = decision.entity
+        if decision.fingerprint_matched:
+            logging.debug("Found matching fingerprint of %s", entity)
+        elif decision.current:
+            logging.debug("Found existing %s", decision.current)
+        else:
+            logging.debug("Not found existing %s", entity)
+
+        if decision.diff:
+            self._maybe_print_diff(entity, decision.diff)
+        if decision.forbidden:
+            if self.plan is not None:
+                self.plan.forbidden.append(
+                    planned_action(
+                        env,
+                        Action.UPDATE,
+                        entity,
+                        decision.current,
+                        diff_to_dict(decision.diff),
+                    )
                 )
+            logging.info(
+                f"{ERROR_COLOR}× Modifying is forbidden:{Fore.RESET} %s", entity
+            )
+            return Outcome.FORBIDDEN
+        if decision.action is None:
+            logging.info(f"{UP_TO_DATE_COLOR}✔ Up to date:{Fore.RESET} %s", entity)
+            return Outcome.UP_TO_DATE
+
+        self._maybe_print_payload(entity)
+        self._maybe_plan(env, decision)
+        return create() if decision.action == Action.CREATE else update()
+
+    def _maybe_plan(self, env: str, decision: Decision):
+        if self.plan is not None and not self.execute:
+            self.plan.add(
+                env,
+                decision.action,
+                decision.entity,
+                decision.current,
+                diff_to_dict(decision.diff) if decision.diff else None,
             )
 
+    def _maybe_print_diff(self, entity: Entity, diff: DeepDiff):
+        if self.show_diff:
             logging.info(
                 f"{MODIFY_COLOR}⦿ Found %d changes:{Fore.RESET} %s\n%s",
                 len(diff),
                 entity,
-                pretty_yaml(safe_diff, indentation=OUTPUT_INDENTATION),
+                pretty_yaml(diff_to_dict(diff), indentation=OUTPUT_INDENTATION),
             )
 
     def _maybe_print_payload(self, entity: Entity):
@@ -210,59 +261,175 @@ class Processor:
                 pretty_json(payload, indentation=OUTPUT_INDENTATION),
             )
 
-    def _update_event_type(self, nakadi: Nakadi, et: EventType):
+    def _update_event_type(self, nakadi: Nakadi, et: EventType) -> Outcome:
         if self.execute:
             nakadi.update_event_type(et)
             logging.info(f"{MODIFY_COLOR}⦿ Updated:{Fore.RESET} %s", et)
+            return Outcome.UPDATED
         else:
             logging.info(f"{MODIFY_COLOR}⦿ Will update:{Fore.RESET} %s", et)
+            return Outcome.WILL_UPDATE
 
-    def _create_event_type(self, nakadi: Nakadi, et: EventType):
+    def _create_event_type(self, nakadi: Nakadi, et: EventType) -> Outcome:
         if self.execute:
             nakadi.create_event_type(et)
             logging.info(f"{MODIFY_COLOR}⦿ Created:{Fore.RESET} %s", et)
+            return Outcome.CREATED
         else:
             logging.info(f"{MODIFY_COLOR}⦿ Will create:{Fore.RESET} %s", et)
+            return Outcome.WILL_CREATE
 
-    def _update_subscription(self, nakadi: Nakadi, sub: Subscription):
+    def _update_subscription(self, nakadi: Nakadi, sub: Subscription) -> Outcome:
         if self.execute:
             nakadi.update_subscription(sub)
             logging.info(f"{MODIFY_COLOR}⦿ Updated:{Fore.RESET} %s", sub)
+            return Outcome.UPDATED
         else:
             logging.info(f"{MODIFY_COLOR}⦿ Will update:{Fore.RESET} %s", sub)
+            return Outcome.WILL_UPDATE
 
-    def _create_subscription(self, nakadi: Nakadi, sub: Subscription):
+    def _create_subscription(self, nakadi: Nakadi, sub: Subscription) -> Outcome:
         if self.execute:
             nakadi.create_subscription(sub)
             logging.info(f"{MODIFY_COLOR}⦿ Created:{Fore.RESET} %s", sub)
+            return Outcome.CREATED
         else:
             logging.info(f"{MODIFY_COLOR}⦿ Will create:{Fore.RESET} %s", sub)
+            return Outcome.WILL_CREATE
 
-    def _create_sql_query(self, nakadi_sql: NakadiSql, query: SqlQuery):
+    def _create_sql_query(self, nakadi_sql: NakadiSql, query: SqlQuery) -> Outcome:
         if self.execute:
             nakadi_sql.create_sql_query(query)
             logging.info(f"{MODIFY_COLOR}⦿ Created:{Fore.RESET} %s", query)
+            return Outcome.CREATED
         else:
             logging.info(f"{MODIFY_COLOR}⦿ Will create:{Fore.RESET} %s", query)
+            return Outcome.WILL_CREATE
 
-    def _update_sql_query(self, nakadi_sql: NakadiSql, query: SqlQuery):
+    def _update_sql_query(self, nakadi_sql: NakadiSql, query: SqlQuery) -> Outcome:
         if self.execute:
             nakadi_sql.update_sql_query(query)
             logging.info(f"{MODIFY_COLOR}⦿ Updated:{Fore.RESET} %s", query)
+            return Outcome.UPDATED
         else:
             logging.info(f"{MODIFY_COLOR}⦿ Will update:{Fore.RESET} %s", query)
+            return Outcome.WILL_UPDATE
+
+    def find_orphans(
+        self, env: str, applications: Set[str], declared: Set[str]
+    ) -> List[Orphan]:
+        """Resources of the applications in the environment which are not
+        declared, from bulk listings of the environment"""
+        nakadi = self._get_nakadi(env)
+        query_names = set()
+        if self.snapshots is not None or self.config.environments[env].nakadi_sql_url:
+            nakadi_sql = self._get_nakadi_sql(env)
+            query_names = {query["id"] for query in nakadi_sql.list_sql_queries()}
+        return find_orphans(
+            env,
+            applications,
+            declared,
+            nakadi.list_event_types(),
+            query_names,
+            nakadi.list_subscriptions(),
+        )
+
+    def delete_orphan(self, orphan: Orphan):
+        if not self.execute:
+            logging.info(f"{MODIFY_COLOR}⦿ Will delete:{Fore.RESET} %s", orphan)
+            return
+        if orphan.kind == Kind.SUBSCRIPTION:
+            self._get_nakadi(orphan.env).delete_subscription(orphan.subscription_id)
+        elif orphan.kind == Kind.SQL_QUERY:
+            self._get_nakadi_sql(orphan.env).delete_sql_query(orphan.name)
+        else:
+            self._get_nakadi(orphan.env).delete_event_type(orphan.name)
+        logging.info(f"{MODIFY_COLOR}⦿ Deleted:{Fore.RESET} %s", orphan)
 
     def _get_nakadi(self, env: str) -> Nakadi:
+        if self.snapshots is not None:
+            return SnapshotNakadi(self._get_snapshot(env))
         if env not in self.config.environments:
             raise ProcessingError(f"Unknown environment: {env}")
-        return Nakadi(self.config.environments[env].nakadi_url, self.token)
+        return self._client(Nakadi, env, self.config.environments[env].nakadi_url)
 
     def _get_nakadi_sql(self, env: str) -> NakadiSql:
+        if self.snapshots is not None:
+            return SnapshotNakadiSql(self._get_snapshot(env))
         if env not in self.config.environments:
             raise ProcessingError(f"Unknown environment: {env}")
         if not self.config.environments[env].nakadi_sql_url:
             raise ProcessingError("Nakadi SQL endpoint is not configured")
-        return NakadiSql(self.config.environments[env].nakadi_sql_url, self.token)
+        return self._client(
+            NakadiSql, env, self.config.environments[env].nakadi_sql_url
+        )
+
+    def _client(self, client_type: type, env: str, url: str) -> HttpClient:
+        key = (client_type, env)
+        if key not in self._clients:
+            self._clients[key] = client_type(url, self.token, self.cache)
+        return self._clients[key]
+
+    def _get_snapshot(self, env: str) -> Snapshot:
+        if env not in self.snapshots:
+            raise ProcessingError(f"No snapshot of environment: {env}")
+        return self.snapshots[env]
+
+
+def is_stale(
+    action: PlannedAction, nakadi: Nakadi, nakadi_sql: Optional[NakadiSql]
+) -> bool:
+    """Whether the remote resource changed since the action was planned, read
+    bypassing the caches. `nakadi_sql` is only needed for sql queries."""
+    entity = action.entity()
+    try:
+        current = current_entity(nakadi, nakadi_sql, entity, fresh=True)
+    except NakadiError as err:
+        raise ProcessingError(f"Can not check {entity}: {err}") from err
+    return observed_fingerprint(current) != action.observed
+
+
+def execute_action(
+    action: PlannedAction, nakadi: Nakadi, nakadi_sql: Optional[NakadiSql]
+) -> Outcome:
+    """Creates or updates the resource of the planned action"""
+    entity = action.entity()
+    create = action.action == Action.CREATE
+    try:
+        if isinstance(entity, EventType):
+            (nakadi.create_event_type if create else nakadi.update_event_type)(entity)
+        elif isinstance(entity, SqlQuery):
+            (nakadi_sql.create_sql_query if create else nakadi_sql.update_sql_query)(
+                entity
+            )
+        else:
+            (nakadi.create_subscription if create else nakadi.update_subscription)(
+                entity
+            )
+    except NakadiError as err:
+        raise ProcessingError(f"Can not process {entity}: {err}") from err
+    return Outcome.CREATED if create else Outcome.UPDATED
+
+
+def diff_to_dict(diff: DeepDiff) -> dict:
+    """The diff as plain JSON-like content, with models converted to specs"""
+
+    def convert_to_spec(x):
+        return x.to_spec()
+
+    return json.loads(
+        diff.to_json(
+            default_mapping={
+                ReadOnlyAuth: convert_to_spec,
+                ReadWriteAuth: convert_to_spec,
+                EventType: convert_to_spec,
+                EventOwnerSelector: convert_to_spec,
+                SqlQuery: convert_to_spec,
+                Subscription: convert_to_spec,
+                Entity: convert_to_spec,
+            }
+        )
+    )
 
 
 class ProcessingError(Exception):
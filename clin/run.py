@@ -1,20 +1,72 @@
 #!/usr/bin/env python3
 import logging
 import os
+import socket
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 import click
+from colorama import Fore
 
 from clin import __version__
+from clin.clients.agent import agent_socket
+from clin.clients.http_client import ResponseCache
 from clin.clients.nakadi_sql import NakadiSql
-from clin.clinfile import calculate_scope
+from clin.capacity import OVER_PROVISIONED, UNDER_PROVISIONED, measure_capacity
+from clin.clinfile import Process, calculate_scope, iterate_scope
+from clin.compare import changed_paths, compare_inventories, fetch_inventory
+from clin.completion import (
+    complete_env,
+    complete_event_type,
+    complete_process_id,
+    refresh_failure,
+    save_names,
+    TOKEN_VARIABLE,
+)
 from clin.config import ConfigurationError, load_config
+from clin.dumping import BulkDump, select_event_types
+from clin.fanout import apply_per_environment, log_environment_results
+from clin.git import GitError, changed_files
 from clin.clients.nakadi import Nakadi, NakadiError
+from clin.journal import FAILED, Journal
+from clin.manifest_index import ManifestIndex, ResourceFilter
 from clin.models.shared import Kind
-from clin.processor import Processor, ProcessingError
+from clin.orphans import DELETION_ORDER, Orphan, declared_applications
+from clin.pipeline import run_pipelined
+from clin.plan import Plan, PlanError, refused_dependencies
+from clin.processor import (
+    Outcome,
+    Processor,
+    ProcessingError,
+    ERROR_COLOR,
+    MODIFY_COLOR,
+    UP_TO_DATE_COLOR,
+    diff_to_dict,
+)
+from clin.search import SearchError, SearchIndex, default_index_path
+from clin.sharding import Shard, select_shard
+from clin.snapshot import (
+    Snapshot,
+    SnapshotError,
+    refresh_snapshot,
+    take_snapshot,
+)
+from clin.state import StateFile
+from clin.stats import SORT_KEYS, fetch_stats, managed_subscriptions
+from clin.watch import Watcher
+from clin.workspace import Workspace, WorkspaceError, find_clin_files
 from clin.utils import configure_logging, pretty_yaml, pretty_json
-from clin.yamlops import YamlLoader, load_manifest, load_yaml, YamlError
+from clin.yamlops import (
+    IncludeGraph,
+    YamlLoader,
+    load_manifest,
+    load_yaml,
+    YamlError,
+)
 
 DEFAULT_YAML_LOADER = YamlLoader()
 
@@ -44,9 +96,11 @@ def cli():
 @click.option(
     "-e",
     "--env",
+    shell_complete=complete_env,
     required=True,
     type=str,
-    help="The Nakadi environment to target",
+    multiple=True,
+    help="One or multiple Nakadi environments to target concurrently",
 )
 @click.option(
     "-X",
@@ -69,27 +123,75 @@ def cli():
     default=False,
     help="Show Nakadi payload (default - false)",
 )
+@click.option(
+    "--fingerprint",
+    is_flag=True,
+    default=False,
+    help="Record a fingerprint of the applied manifest on event types and sql queries, and skip comparing them when it matches (default - false)",
+)
+@click.option(
+    "--verify",
+    is_flag=True,
+    default=False,
+    help="Compare resources in full even when their fingerprint matches (default - false)",
+)
+@click.option(
+    "--from-snapshot",
+    "from_snapshot",
+    required=False,
+    type=click.Path(exists=True, dir_okay=False, readable=True),
+    multiple=True,
+    help="Plan against snapshots taken by the snapshot command instead of Nakadi, one per environment",
+)
 @click.argument("file", type=click.Path(exists=True, dir_okay=False, readable=True))
 def apply(
     token: Optional[str],
     verbose: bool,
-    env: str,
+    env: Tuple[str],
     execute: bool,
     show_diff: bool,
     show_payload: bool,
+    fingerprint: bool,
+    verify: bool,
+    from_snapshot: Tuple[str],
     file: str,
 ):
     """Create or update Nakadi resource from single yaml manifest file\n
     Values to fill {{VARIABLES}} are taken from system environment"""
     configure_logging(verbose)
 
+    if from_snapshot and execute:
+        logging.error("Snapshots can only be used in dry run mode")
+        exit(-1)
+
     try:
         config = load_config()
         envelope = load_manifest(Path(file), DEFAULT_YAML_LOADER, os.environ)
-        processor = Processor(config, token, execute, show_diff, show_payload)
-        processor.apply(env, envelope)
+        processor = Processor(
+            config,
+            token,
+            execute,
+            show_diff,
+            show_payload,
+            fingerprint,
+            verify,
+            snapshots=open_snapshots(from_snapshot) if from_snapshot else None,
+        )
+        apply_tasks(
+            [
+                Process(id=e, path=file, envelope=envelope, target=e)
+                for e in dict.fromkeys(env)
+            ],
+            lambda task: processor.apply(task.target, task.envelope),
+        )
 
-    except (ProcessingError, NakadiError, ConfigurationError, YamlError) as ex:
+    except (
+        ProcessingError,
+        NakadiError,
+        ConfigurationError,
+        YamlError,
+        SnapshotError,
+    ) as ex:
         logging.error(ex)
         exit(-1)
 
@@ -137,6 +239,7 @@ def apply(
 @click.option(
     "-i",
     "--id",
+    shell_complete=complete_process_id,
     required=False,
     type=str,
     multiple=True,
@@ -145,12 +248,145 @@ def apply(
 @click.option(
     "-e",
     "--env",
+    shell_complete=complete_env,
     required=False,
     type=str,
     multiple=True,
     help="Select one or multiple steps to process by matching the target environment",
 )
-@click.argument("file", type=click.Path(exists=True, dir_okay=False, readable=True))
+@click.option(
+    "-k",
+    "--kind",
+    required=False,
+    type=click.Choice([str(kind) for kind in Kind]),
+    multiple=True,
+    help="Select one or multiple kinds of resources to process",
+)
+@click.option(
+    "-n",
+    "--name",
+    shell_complete=complete_event_type,
+    required=False,
+    type=str,
+    multiple=True,
+    help="Select resources to process by name glob, subscriptions by the names of their event types",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    default=1,
+    type=click.IntRange(min=1),
+    help="Number of processes used to load the manifests (default - 1)",
+)
+@click.option(
+    "--stream",
+    is_flag=True,
+    default=False,
+    help="Start processing while the manifests are still being loaded (default - false)",
+)
+@click.option(
+    "--journal",
+    required=False,
+    type=click.Path(dir_okay=False, writable=True),
+    help="Append the outcome of every processed resource to a journal file",
+)
+@click.option(
+    "--resume",
+    required=False,
+    type=click.Path(dir_okay=False, writable=True),
+    help="Skip resources completed unchanged according to the journal file, and continue it",
+)
+@click.option(
+    "--plan-out",
+    required=False,
+    type=click.Path(dir_okay=False, writable=True),
+    help="Save the planned changes of a dry run to a file, to be executed by apply-plan",
+)
+@click.option(
+    "--since",
+    required=False,
+    type=str,
+    help="Process only manifests changed since the given git ref, directly or by their includes",
+)
+@click.option(
+    "--changed-only",
+    is_flag=True,
+    default=False,
+    help="Skip resources unchanged since they were last applied (default - false)",
+)
+@click.option(
+    "--full",
+    is_flag=True,
+    default=False,
+    help="Process all resources and refresh the state used by --changed-only (default - false)",
+)
+@click.option(
+    "--state-file",
+    required=False,
+    type=click.Path(dir_okay=False),
+    help="The state file used by --changed-only (default - in ~/.cache/clin)",
+)
+@click.option(
+    "--fingerprint",
+    is_flag=True,
+    default=False,
+    help="Record a fingerprint of the applied manifest on event types and sql queries, and skip comparing them when it matches (default - false)",
+)
+@click.option(
+    "--verify",
+    is_flag=True,
+    default=False,
+    help="Compare resources in full even when their fingerprint matches (default - false)",
+)
+@click.option(
+    "--from-snapshot",
+    "from_snapshot",
+    required=False,
+    type=click.Path(exists=True, dir_okay=False, readable=True),
+    multiple=True,
+    help="Plan against snapshots taken by the snapshot command instead of Nakadi, one per environment",
+)
+@click.option(
+    "--shard",
+    required=False,
+    type=str,
+    help="Process only the i-th of n deterministic parts of the resources, given as i/n",
+)
+@click.option(
+    "--workspace",
+    required=False,
+    type=click.Path(exists=True, file_okay=False, readable=True),
+    help="Process all clin files found in the directory as one batch, instead of a single clin file",
+)
+@click.option(
+    "--detect-orphans",
+    is_flag=True,
+    default=False,
+    help="Report resources owned by the applications of the clin file but not declared by it (default - false)",
+)
+@click.option(
+    "--prune",
+    is_flag=True,
+    default=False,
+    help="Delete the orphaned resources, implies --detect-orphans (default - false)",
+)
+@click.option(
+    "--yes",
+    is_flag=True,
+    default=False,
+    help="Prune without asking for confirmation (default - false)",
+)
+@click.option(
+    "--sequential",
+    is_flag=True,
+    default=False,
+    help="Process the environments one after the other, stopping at the first failure (default - false)",
+)
+@click.argument(
+    "file",
+    required=False,
+    type=click.Path(exists=True, dir_okay=False, readable=True),
+)
 def process(
     token: Optional[str],
     verbose: bool,
@@ -159,31 +395,400 @@ def process(
     show_payload: bool,
     id: Tuple[str],
     env: Tuple[str],
-    file: str,
+    kind: Tuple[str],
+    name: Tuple[str],
+    jobs: int,
+    stream: bool,
+    journal: Optional[str],
+    resume: Optional[str],
+    plan_out: Optional[str],
+    since: Optional[str],
+    changed_only: bool,
+    full: bool,
+    state_file: Optional[str],
+    fingerprint: bool,
+    verify: bool,
+    from_snapshot: Tuple[str],
+    shard: Optional[str],
+    workspace: Optional[str],
+    detect_orphans: bool,
+    prune: bool,
+    yes: bool,
+    sequential: bool,
+    file: Optional[str],
 ):
     """Create or update multiple Nakadi resources from a clin file"""
     configure_logging(verbose)
 
+    if bool(file) == bool(workspace):
+        logging.error("Either a clin file or a workspace has to be given")
+        exit(-1)
+
+    if stream and workspace:
+        logging.error("A workspace can not be processed in streaming mode")
+        exit(-1)
+
+    if stream and shard:
+        logging.error("A shard can not be processed in streaming mode")
+        exit(-1)
+
+    try:
+        selected_shard = Shard.parse(shard) if shard else None
+    except ValueError as ex:
+        logging.error(ex)
+        exit(-1)
+
+    if plan_out and execute:
+        logging.error("A plan can only be saved in dry run mode")
+        exit(-1)
+
+    detect_orphans = detect_orphans or prune
+    if detect_orphans and (id or kind or name or since or shard):
+        logging.error(
+            "Orphans can only be detected when all resources of the clin file "
+            "are processed, without --id, --kind, --name, --since or --shard"
+        )
+        exit(-1)
+
+    if from_snapshot and execute:
+        logging.error("Snapshots can only be used in dry run mode")
+        exit(-1)
+
     try:
         config = load_config()
-        processor = Processor(config, token, execute, show_diff, show_payload)
-        file_path: Path = Path(file)
-        master = load_yaml(file_path, DEFAULT_YAML_LOADER, os.environ)
+        plan = Plan() if plan_out else None
+        processor = Processor(
+            config,
+            token,
+            execute,
+            show_diff,
+            show_payload,
+            fingerprint,
+            verify,
+            plan,
+            open_snapshots(from_snapshot) if from_snapshot else None,
+        )
+        root = Path(workspace) if workspace else Path(file).parent
+        clin_files = find_clin_files(root) if workspace else [Path(file)]
+        resource_filter = ResourceFilter(kind, name)
+        changes = changed_files(since, root) if since else None
+        indexes: Dict[Path, ManifestIndex] = {}
+        state, unchanged = None, []
+        if changed_only or full:
+            state = (
+                StateFile(Path(state_file))
+                if state_file
+                else StateFile.for_clin_file(Path(workspace or file))
+            )
 
-        scope = calculate_scope(master, file_path.parent, DEFAULT_YAML_LOADER, id, env)
+        journal_file = (
+            Journal(Path(journal or resume), Path(resume) if resume else None)
+            if journal or resume
+            else None
+        )
+
+        def scope_arguments(clin_file: Path) -> tuple:
+            master = load_yaml(clin_file, DEFAULT_YAML_LOADER, os.environ)
+            indexes[clin_file] = ManifestIndex.for_clin_file(
+                DEFAULT_YAML_LOADER, clin_file
+            )
+            since_changes = (
+                changes_since(changes, since, clin_file, DEFAULT_YAML_LOADER)
+                if since
+                else None
+            )
+            return (
+                master,
+                clin_file.parent,
+                DEFAULT_YAML_LOADER,
+                id,
+                env,
+                jobs,
+                resource_filter,
+                indexes[clin_file],
+                since_changes,
+            )
+
+        declared: List[Process] = []
+        declared_lock = threading.Lock()
+
+        def apply_task(task: Process) -> Optional[Outcome]:
+            if detect_orphans:
+                with declared_lock:
+                    declared.append(task)
+
+            if state and not full and state.is_unchanged(task.target, task.envelope):
+                logging.debug("[%s] skipping unchanged file %s", task.id, task.path)
+                unchanged.append(task)
+                return None
+
+            if journal_file and execute and journal_file.is_completed(task):
+                logging.debug("[%s] skipping completed file %s", task.id, task.path)
+                unchanged.append(task)
+                return None
 
-        for task in (
-            scope[Kind.EVENT_TYPE] + scope[Kind.SQL_QUERY] + scope[Kind.SUBSCRIPTION]
-        ):
             logging.debug(
                 "[%s] applying file %s to %s environment",
                 task.id,
                 task.path,
                 task.target,
             )
-            processor.apply(task.target, task.envelope)
+            try:
+                outcome = processor.apply(task.target, task.envelope)
+            except Exception:
+                if journal_file:
+                    journal_file.record(task, FAILED)
+                raise
+
+            if journal_file:
+                journal_file.record(task, str(outcome))
+            if state and execute and outcome.applied:
+                state.record(task.target, task.envelope)
+            return outcome
+
+        try:
+            if stream:
+                tasks = iterate_scope(*scope_arguments(clin_files[0]))
+                run_pipelined(tasks, apply_task)
+
+            elif workspace:
+                merged = Workspace()
+                for clin_file in clin_files:
+                    merged.add(clin_file, calculate_scope(*scope_arguments(clin_file)))
+
+                scope = maybe_select_shard(merged.scope, selected_shard)
+                summary = {clin_file: Counter() for clin_file in clin_files}
+                summary_lock = threading.Lock()
+
+                def apply_attributed(task: Process) -> Optional[Outcome]:
+                    outcome = apply_task(task)
+                    with summary_lock:
+                        for origin in merged.origins(task):
+                            summary[origin][str(outcome) if outcome else "skipped"] += 1
+                    return outcome
+
+                try:
+                    apply_tasks(
+                        scope[Kind.EVENT_TYPE]
+                        + scope[Kind.SQL_QUERY]
+                        + scope[Kind.SUBSCRIPTION],
+                        apply_attributed,
+                        sequential,
+                    )
+                finally:
+                    log_workspace_summary(root, summary)
+
+            else:
+                scope = maybe_select_shard(
+                    calculate_scope(*scope_arguments(clin_files[0])), selected_shard
+                )
+                apply_tasks(
+                    scope[Kind.EVENT_TYPE]
+                    + scope[Kind.SQL_QUERY]
+                    + scope[Kind.SUBSCRIPTION],
+                    apply_task,
+                    sequential,
+                )
+
+        finally:
+            if state:
+                state.save()
+            if journal_file:
+                journal_file.close()
+
+        if unchanged:
+            logging.info(
+                f"{UP_TO_DATE_COLOR}✔ Skipped %d resources unchanged since last applied or completed{Fore.RESET}",
+                len(unchanged),
+            )
+
+        for index in indexes.values():
+            index.save()
+        if plan:
+            plan.save(Path(plan_out))
+            logging.info("Saved %d planned changes to %s", len(plan.actions), plan_out)
+
+        if detect_orphans:
+            orphans = report_orphans(processor, declared)
+            if prune and orphans:
+                if (
+                    execute
+                    and not yes
+                    and not click.confirm(f"Delete {len(orphans)} orphaned resources?")
+                ):
+                    logging.info("Pruning cancelled")
+                    exit(-1)
+                for orphan in orphans:
+                    processor.delete_orphan(orphan)
+
+    except (
+        ProcessingError,
+        ConfigurationError,
+        YamlError,
+        GitError,
+        SnapshotError,
+        WorkspaceError,
+        NakadiError,
+    ) as ex:
+        logging.error(ex)
+        exit(-1)
+
+    except Exception as ex:
+        logging.exception(ex)
+        exit(-1)
+
+
+def changes_since(
+    changes: Set[Path], since: str, clin_file: Path, loader: YamlLoader
+) -> Optional[Set[Path]]:
+    graph = IncludeGraph(loader)
+    graph.add(clin_file)
+    if clin_file.resolve() in graph.affected_by(changes):
+        logging.info(
+            "Clin file %s changed since %s, processing all its manifests",
+            clin_file,
+            since,
+        )
+        return None
+    return changes
+
+
+def report_orphans(processor: Processor, declared: List[Process]) -> List[Orphan]:
+    """Logs the orphaned resources of the applications owning the declared
+    ones, in every processed environment, and returns them in deletion order"""
+    orphans = []
+    for env, applications in sorted(declared_applications(declared).items()):
+        identities = {task.envelope.identity for task in declared if task.target == env}
+        found = processor.find_orphans(env, applications, identities)
+        for orphan in found:
+            logging.warning(
+                f"{ERROR_COLOR}✘ Orphan:{Fore.RESET} %s in %s environment", orphan, env
+            )
+        if not found:
+            logging.info(
+                f"{UP_TO_DATE_COLOR}✔ No orphans in %s environment{Fore.RESET}", env
+            )
+        orphans.extend(found)
+    return sorted(orphans, key=lambda orphan: DELETION_ORDER.index(orphan.kind))
+
+
+def apply_tasks(
+    tasks: List[Process],
+    apply: Callable[[Process], Optional[Outcome]],
+    sequential: bool = False,
+):
+    """Applies the tasks in order, concurrently per environment when they
+    target several of them unless sequential. Sequential processing stops at
+    the first failure."""
+    if sequential or len({task.target for task in tasks}) <= 1:
+        for task in tasks:
+            apply(task)
+        return
+
+    results = apply_per_environment(tasks, apply)
+    log_environment_results(results)
+    failed = [result.env for result in results if result.error]
+    if failed:
+        raise ProcessingError(f"Processing failed in: {', '.join(failed)}")
+
+
+def maybe_select_shard(
+    scope: Dict[Kind, List[Process]], shard: Optional[Shard]
+) -> Dict[Kind, List[Process]]:
+    if shard is None:
+        return scope
+    selected = select_shard(scope, shard)
+    logging.info(
+        "Processing %d of %d resources in shard %s",
+        sum(len(tasks) for tasks in selected.values()),
+        sum(len(tasks) for tasks in scope.values()),
+        shard,
+    )
+    return selected
+
+
+def log_workspace_summary(root: Path, summary: Dict[Path, Counter]):
+    for clin_file, outcomes in summary.items():
+        logging.info(
+            "%s: %s",
+            os.path.relpath(str(clin_file), str(root)),
+            ", ".join(
+                f"{count} {outcome}" for outcome, count in sorted(outcomes.items())
+            )
+            or "nothing to process",
+        )
+
+
+def open_snapshots(paths: Tuple[str]) -> Dict[str, Snapshot]:
+    snapshots = {}
+    for path in paths:
+        snapshot = Snapshot(Path(path))
+        if snapshot.env in snapshots:
+            raise SnapshotError(f"Multiple snapshots of environment: {snapshot.env}")
+        logging.debug(
+            "Using snapshot of %s environment taken at %s",
+            snapshot.env,
+            snapshot.taken_at,
+        )
+        snapshots[snapshot.env] = snapshot
+    return snapshots
+
+
+@cli.command("apply-plan")
+@click.option(
+    "-t",
+    "--token",
+    required=False,
+    type=str,
+    help="The bearer token to authenticate the Nakadi requests",
+)
+@click.option(
+    "-v",
+    "--verbose",
+    is_flag=True,
+    default=False,
+    help="Verbose output (default - false)",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    default=8,
+    type=click.IntRange(min=1),
+    help="Number of concurrent requests to check the plan for staleness (default - 8)",
+)
+@click.argument("file", type=click.Path(exists=True, dir_okay=False, readable=True))
+def apply_plan(token: Optional[str], verbose: bool, jobs: int, file: str):
+    """Execute the changes saved by process --plan-out\n
+    Changes to resources modified since planning are refused"""
+    configure_logging(verbose)
+
+    try:
+        config = load_config()
+        plan = Plan.load(Path(file))
+        processor = Processor(config, token, execute=True)
+
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            stale = list(executor.map(processor.is_stale, plan.actions))
+
+        dependencies = refused_dependencies(plan.actions, stale)
+        for action, is_stale, dependency in zip(plan.actions, stale, dependencies):
+            if is_stale:
+                logging.error(
+                    f"{ERROR_COLOR}× Changed since planned, refusing to {action.action}:{Fore.RESET} %s",
+                    action.entity(),
+                )
+            elif dependency:
+                logging.error(
+                    f"{ERROR_COLOR}× Reads refused {dependency}, skipping {action.action}:{Fore.RESET} %s",
+                    action.entity(),
+                )
+            else:
+                processor.execute_planned(action)
+
+        if any(stale):
+            exit(-1)
 
-    except (ProcessingError, ConfigurationError, YamlError) as ex:
+    except (ProcessingError, ConfigurationError, PlanError) as ex:
         logging.error(ex)
         exit(-1)
 
@@ -216,6 +821,7 @@ def process(
 @click.option(
     "-e",
     "--env",
+    shell_complete=complete_env,
     required=True,
     type=str,
     help="The Nakadi environment to target",
@@ -227,16 +833,48 @@ def process(
     type=click.Choice(["yaml", "json"]),
     help="The output format (default - yaml)",
 )
-@click.argument("event_type", type=str)
+@click.option(
+    "--owning-application",
+    required=False,
+    type=str,
+    help="Dump the event types owned by the application",
+)
+@click.option(
+    "--all",
+    "select_all",
+    is_flag=True,
+    default=False,
+    help="Dump all event types (default - false)",
+)
+@click.option(
+    "--output-dir",
+    required=False,
+    type=click.Path(file_okay=False, writable=True),
+    help="Write the manifests of multiple event types, their schemas and a clin file to a directory",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    default=8,
+    type=click.IntRange(min=1),
+    help="Number of concurrent requests when dumping multiple event types (default - 8)",
+)
+@click.argument("event_type", type=str, nargs=-1, shell_complete=complete_event_type)
 def dump(
     token: Optional[str],
     verbose: bool,
     env: str,
     output: str,
     include_envelope: bool,
-    event_type: str,
+    owning_application: Optional[str],
+    select_all: bool,
+    output_dir: Optional[str],
+    jobs: int,
+    event_type: Tuple[str],
 ):
-    """Print manifest of existing Nakadi event type"""
+    """Print manifest of existing Nakadi event type\n
+    With --output-dir, the manifests of all event types matching the name globs,
+    the owning application or --all are written to a directory"""
     configure_logging(verbose)
 
     try:
@@ -246,14 +884,56 @@ def dump(
             exit(-1)
 
         nakadi = Nakadi(config.environments[env].nakadi_url, token)
-        entity = nakadi.get_event_type(event_type)
+        nakadi_sql = (
+            NakadiSql(config.environments[env].nakadi_sql_url, token)
+            if config.environments[env].nakadi_sql_url
+            else None
+        )
+
+        if output_dir:
+            if not (event_type or owning_application or select_all):
+                logging.error("Select event types by name, owning application or --all")
+                exit(-1)
+
+            payloads = select_event_types(
+                nakadi.list_event_types(), event_type, owning_application, select_all
+            )
+            bulk = BulkDump(Path(output_dir))
+            counts = bulk.dump(nakadi, nakadi_sql, payloads, jobs)
+            clin_file = bulk.write_clin_file(env)
+            logging.info(
+                "Dumped %d event types and %d sql queries, process them with %s",
+                counts[Kind.EVENT_TYPE],
+                counts[Kind.SQL_QUERY],
+                clin_file,
+            )
+            return
+
+        if not (event_type or owning_application or select_all):
+            logging.error(
+                "Give the EVENT_TYPE to dump, --output-dir is required to dump multiple"
+                " event types selected by name globs, --owning-application or --all"
+            )
+            exit(-1)
+
+        if (
+            len(event_type) != 1
+            or any(c in event_type[0] for c in "*?[")
+            or owning_application
+            or select_all
+        ):
+            logging.error(
+                "--output-dir is required to dump multiple event types selected by"
+                " name globs, --owning-application or --all"
+            )
+            exit(-1)
 
-        if entity and config.environments[env].nakadi_sql_url:
-            nakadi_sql = NakadiSql(config.environments[env].nakadi_sql_url, token)
+        entity = nakadi.get_event_type(event_type[0])
+        if entity and nakadi_sql:
             entity = nakadi_sql.get_sql_query(entity) or entity
 
         if entity is None:
-            logging.error("Event type not found in Nakadi %s: %s", env, event_type)
+            logging.error("Event type not found in Nakadi %s: %s", env, event_type[0])
             exit(-1)
 
         payload = (
@@ -277,5 +957,944 @@ def dump(
         exit(-1)
 
 
+@cli.command("snapshot")
+@click.option(
+    "-t",
+    "--token",
+    required=False,
+    type=str,
+    help="The bearer token to authenticate the Nakadi requests",
+)
+@click.option(
+    "-v",
+    "--verbose",
+    is_flag=True,
+    default=False,
+    help="Verbose output (default - false)",
+)
+@click.option(
+    "-e",
+    "--env",
+    shell_complete=complete_env,
+    required=True,
+    type=str,
+    help="The Nakadi environment to target",
+)
+@click.option(
+    "-o",
+    "--output",
+    required=True,
+    type=click.Path(dir_okay=False, writable=True),
+    help="The snapshot file to write",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    default=8,
+    type=click.IntRange(min=1),
+    help="Number of concurrent requests to fetch the partitions (default - 8)",
+)
+@click.option(
+    "--refresh",
+    is_flag=True,
+    default=False,
+    help="Update an existing snapshot with the resources changed since it was taken (default - false)",
+)
+def snapshot(
+    token: Optional[str],
+    verbose: bool,
+    env: str,
+    output: str,
+    jobs: int,
+    refresh: bool,
+):
+    """Save all resources of a Nakadi environment to a snapshot file\n
+    Dry runs can plan against it offline with --from-snapshot"""
+    configure_logging(verbose)
+
+    try:
+        config = load_config()
+        if env not in config.environments:
+            logging.error(f"Environment not found in configuration: {env}")
+            exit(-1)
+
+        nakadi = Nakadi(config.environments[env].nakadi_url, token)
+        nakadi_sql = (
+            NakadiSql(config.environments[env].nakadi_sql_url, token)
+            if config.environments[env].nakadi_sql_url
+            else None
+        )
+        if refresh:
+            previous = Snapshot(Path(output))
+            previous.close()
+            if previous.env != env:
+                logging.error(
+                    "Can not refresh snapshot of %s environment from %s",
+                    previous.env,
+                    env,
+                )
+                exit(-1)
+
+            updated, deleted = refresh_snapshot(nakadi, nakadi_sql, Path(output), jobs)
+            logging.info(
+                "Refreshed %s: %d resources updated, %d deleted",
+                output,
+                updated,
+                deleted,
+            )
+            return
+
+        counts = take_snapshot(nakadi, nakadi_sql, env, Path(output), jobs)
+        logging.info(
+            "Saved %d event types, %d sql queries and %d subscriptions of %s to %s",
+            counts[Kind.EVENT_TYPE],
+            counts[Kind.SQL_QUERY],
+            counts[Kind.SUBSCRIPTION],
+            env,
+            output,
+        )
+
+    except (NakadiError, ConfigurationError, SnapshotError) as ex:
+        logging.error(ex)
+        exit(-1)
+
+    except Exception as ex:
+        logging.exception(ex)
+        exit(-1)
+
+
+@cli.group("index")
+def index():
+    """Manage the local search index of Nakadi resources"""
+    pass
+
+
+@index.command("build")
+@click.option(
+    "-t",
+    "--token",
+    required=False,
+    type=str,
+    help="The bearer token to authenticate the Nakadi requests",
+)
+@click.option(
+    "-v",
+    "--verbose",
+    is_flag=True,
+    default=False,
+    help="Verbose output (default - false)",
+)
+@click.option(
+    "-e",
+    "--env",
+    shell_complete=complete_env,
+    required=True,
+    type=str,
+    help="The Nakadi environment to index",
+)
+@click.option(
+    "-o",
+    "--output",
+    required=False,
+    type=click.Path(dir_okay=False, writable=True),
+    help="The index file to write (default - in ~/.cache/clin/index)",
+)
+def index_build(token: Optional[str], verbose: bool, env: str, output: Optional[str]):
+    """Index all resources of a Nakadi environment for the search command"""
+    configure_logging(verbose)
+
+    try:
+        config = load_config()
+        if env not in config.environments:
+            logging.error(f"Environment not found in configuration: {env}")
+            exit(-1)
+
+        nakadi = Nakadi(config.environments[env].nakadi_url, token)
+        nakadi_sql = (
+            NakadiSql(config.environments[env].nakadi_sql_url, token)
+            if config.environments[env].nakadi_sql_url
+            else None
+        )
+        search_index = SearchIndex.build(
+            env,
+            nakadi.list_event_types(),
+            nakadi_sql.list_sql_queries() if nakadi_sql else [],
+            nakadi.list_subscriptions(),
+        )
+        path = Path(output) if output else default_index_path(env)
+        search_index.save(path)
+        save_names(
+            env,
+            [
+                d["name"]
+                for d in search_index.documents
+                if d["kind"] != Kind.SUBSCRIPTION
+            ],
+        )
+        logging.info(
+            "Indexed %d resources of %s to %s",
+            len(search_index.documents),
+            env,
+            path,
+        )
+
+    except (NakadiError, ConfigurationError) as ex:
+        logging.error(ex)
+        exit(-1)
+
+    except Exception as ex:
+        logging.exception(ex)
+        exit(-1)
+
+
+@cli.command("refresh-names")
+@click.option(
+    "-t",
+    "--token",
+    required=False,
+    type=str,
+    envvar=TOKEN_VARIABLE,
+    help=f"The bearer token to authenticate the Nakadi requests (default - ${TOKEN_VARIABLE})",
+)
+@click.option(
+    "-v",
+    "--verbose",
+    is_flag=True,
+    default=False,
+    help="Verbose output (default - false)",
+)
+@click.option(
+    "-e",
+    "--env",
+    shell_complete=complete_env,
+    required=True,
+    type=str,
+    help="The Nakadi environment to target",
+)
+def refresh_names(token: Optional[str], verbose: bool, env: str):
+    """Refresh the event type names completed by the shell\n
+    Stale names are refreshed in the background on completion, this refreshes
+    them right away, with a token if the environment requires one"""
+    configure_logging(verbose)
+    failure = refresh_failure(env)
+    if failure:
+        logging.warning("Last background refresh of %s failed:\n%s", env, failure)
+
+    try:
+        config = load_config()
+        if env not in config.environments:
+            logging.error(f"Environment not found in configuration: {env}")
+            exit(-1)
+
+        nakadi = Nakadi(config.environments[env].nakadi_url, token)
+        names = [payload["name"] for payload in nakadi.list_event_types()]
+        save_names(env, names)
+        logging.info("Saved %d event type names of %s", len(names), env)
+
+    except (NakadiError, ConfigurationError) as ex:
+        logging.error(ex)
+        exit(-1)
+
+    except Exception as ex:
+        logging.exception(ex)
+        exit(-1)
+
+
+@cli.command("search")
+@click.option(
+    "-v",
+    "--verbose",
+    is_flag=True,
+    default=False,
+    help="Verbose output (default - false)",
+)
+@click.option(
+    "-e",
+    "--env",
+    shell_complete=complete_env,
+    required=False,
+    type=str,
+    help="The Nakadi environment whose index to search",
+)
+@click.option(
+    "--index-file",
+    "index_file",
+    required=False,
+    type=click.Path(dir_okay=False, readable=True),
+    help="The index file to search, instead of the one of the environment",
+)
+@click.argument("query", type=str, nargs=-1, required=True)
+def search(
+    verbose: bool, env: Optional[str], index_file: Optional[str], query: Tuple[str]
+):
+    """Find resources in the index built by index build
+
+    Every term of the query has to match, either as field:value with field one
+    of kind, name, app, annotation, principal, property or reads, or as a bare
+    value matching any field. Terms ending with * match by prefix."""
+    configure_logging(verbose)
+
+    if bool(env) == bool(index_file):
+        logging.error("Either an environment or an index file has to be given")
+        exit(-1)
+
+    try:
+        search_index = SearchIndex.load(
+            Path(index_file) if index_file else default_index_path(env)
+        )
+        matches = search_index.search(list(query))
+        for match in matches:
+            details = (
+                f"consumer group {match['consumer_group']}, "
+                if match.get("consumer_group")
+                else ""
+            )
+            logging.info(
+                "%s %s (%sapp %s)",
+                match["kind"],
+                match["name"],
+                details,
+                match["app"],
+            )
+
+        age = time.time() - search_index.built_at
+        logging.info(
+            "%d matches in the index of %s built %s ago",
+            len(matches),
+            search_index.env,
+            format_age(age),
+        )
+
+    except SearchError as ex:
+        logging.error(ex)
+        exit(-1)
+
+    except Exception as ex:
+        logging.exception(ex)
+        exit(-1)
+
+
+def format_age(seconds: float) -> str:
+    if seconds < 3600:
+        return f"{int(seconds // 60)} minutes"
+    if seconds < 86400:
+        return f"{int(seconds // 3600)} hours"
+    return f"{int(seconds // 86400)} days"
+
+
+@cli.command("watch")
+@click.option(
+    "-t",
+    "--token",
+    required=False,
+    type=str,
+    help="The bearer token to authenticate the Nakadi requests",
+)
+@click.option(
+    "-v",
+    "--verbose",
+    is_flag=True,
+    default=False,
+    help="Verbose output (default - false)",
+)
+@click.option(
+    "-d",
+    "--show-diff",
+    is_flag=True,
+    default=False,
+    help="Display the schema diff (default - false)",
+)
+@click.option(
+    "-p",
+    "--show-payload",
+    is_flag=True,
+    default=False,
+    help="Show Nakadi payload (default - false)",
+)
+@click.option(
+    "-i",
+    "--id",
+    shell_complete=complete_process_id,
+    required=False,
+    type=str,
+    multiple=True,
+    help="Select one or multiple steps to process by their id",
+)
+@click.option(
+    "-e",
+    "--env",
+    shell_complete=complete_env,
+    required=False,
+    type=str,
+    multiple=True,
+    help="Select one or multiple steps to process by matching the target environment",
+)
+@click.option(
+    "--interval",
+    default=1.0,
+    type=click.FloatRange(min=0.1),
+    help="Seconds between checks for changed files (default - 1)",
+)
+@click.option(
+    "--cache-ttl",
+    default=30.0,
+    type=click.FloatRange(min=0),
+    help="Seconds the state of Nakadi resources is reused between plans (default - 30)",
+)
+@click.argument("file", type=click.Path(exists=True, dir_okay=False, readable=True))
+def watch(
+    token: Optional[str],
+    verbose: bool,
+    show_diff: bool,
+    show_payload: bool,
+    id: Tuple[str],
+    env: Tuple[str],
+    interval: float,
+    cache_ttl: float,
+    file: str,
+):
+    """Plan the changes of a clin file again whenever its manifests change\n
+    Only the resources affected by the changed files are planned"""
+    configure_logging(verbose)
+
+    try:
+        config = load_config()
+    except ConfigurationError as ex:
+        logging.error(ex)
+        exit(-1)
+
+    processor = Processor(
+        config,
+        token,
+        show_diff=show_diff,
+        show_payload=show_payload,
+        cache=ResponseCache(cache_ttl),
+    )
+    file_path = Path(file)
+    watcher = Watcher(file_path, DEFAULT_YAML_LOADER)
+    logging.info("Watching %s, press Ctrl+C to stop", file)
+
+    try:
+        while True:
+            try:
+                master = load_yaml(file_path, DEFAULT_YAML_LOADER, os.environ)
+                changed = watcher.poll(master, id, env)
+                if changed:
+                    full = watcher.clin_file in watcher.affected_by(changed)
+                    logging.debug("Changed files: %s", sorted(map(str, changed)))
+                    scope = calculate_scope(
+                        master,
+                        file_path.parent,
+                        DEFAULT_YAML_LOADER,
+                        id,
+                        env,
+                        since_changes=None if full else changed,
+                    )
+                    tasks = (
+                        scope[Kind.EVENT_TYPE]
+                        + scope[Kind.SQL_QUERY]
+                        + scope[Kind.SUBSCRIPTION]
+                    )
+                    logging.info(
+                        "Planning %d resources at %s",
+                        len(tasks),
+                        time.strftime("%H:%M:%S"),
+                    )
+                    for task in tasks:
+                        processor.apply(task.target, task.envelope)
+
+            except (ProcessingError, YamlError, NakadiError) as ex:
+                logging.error(ex)
+
+            except Exception as ex:
+                logging.exception(ex)
+
+            time.sleep(interval)
+
+    except KeyboardInterrupt:
+        pass
+
+
+@cli.command("agent")
+@click.option(
+    "-v",
+    "--verbose",
+    is_flag=True,
+    default=False,
+    help="Verbose output (default - false)",
+)
+@click.option(
+    "--socket",
+    "socket_path",
+    required=False,
+    type=click.Path(dir_okay=False),
+    help="The unix socket to listen on (default - $CLIN_AGENT_SOCKET or in ~/.cache/clin)",
+)
+@click.option(
+    "--cache-ttl",
+    default=30.0,
+    type=click.FloatRange(min=0),
+    help="Seconds the responses of Nakadi are shared between invocations (default - 30)",
+)
+def agent(verbose: bool, socket_path: Optional[str], cache_ttl: float):
+    """Share the reads from Nakadi between concurrent clin invocations\n
+    Invocations on the same host send their reads through the agent while it runs"""
+    configure_logging(verbose)
+
+    if not hasattr(socket, "AF_UNIX"):
+        logging.error("The agent requires unix sockets, not available on this system")
+        exit(-1)
+    # defining the server requires unix sockets, only imported once available
+    from clin.agent import AgentServer
+
+    path = Path(socket_path) if socket_path else agent_socket()
+    try:
+        server = AgentServer(path, cache_ttl)
+    except OSError as ex:
+        logging.error("Can not listen on %s: %s", path, ex)
+        exit(-1)
+
+    logging.info("Listening on %s, press Ctrl+C to stop", path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+@cli.command("compare")
+@click.option(
+    "-t",
+    "--token",
+    required=False,
+    type=str,
+    help="The bearer token to authenticate the Nakadi requests",
+)
+@click.option(
+    "-v",
+    "--verbose",
+    is_flag=True,
+    default=False,
+    help="Verbose output (default - false)",
+)
+@click.option(
+    "-e",
+    "--env",
+    shell_complete=complete_env,
+    required=True,
+    type=str,
+    multiple=True,
+    help="The two Nakadi environments to compare",
+)
+@click.option(
+    "-k",
+    "--kind",
+    required=False,
+    type=click.Choice([str(kind) for kind in Kind]),
+    multiple=True,
+    help="Compare only one or multiple kinds of resources",
+)
+@click.option(
+    "-n",
+    "--name",
+    shell_complete=complete_event_type,
+    required=False,
+    type=str,
+    multiple=True,
+    help="Compare only resources matching name globs, subscriptions by the names of their event types",
+)
+@click.option(
+    "-d",
+    "--show-diff",
+    is_flag=True,
+    default=False,
+    help="Display the differences of every resource (default - false)",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    default=8,
+    type=click.IntRange(min=1),
+    help="Number of concurrent requests per environment (default - 8)",
+)
+def compare(
+    token: Optional[str],
+    verbose: bool,
+    env: Tuple[str],
+    kind: Tuple[str],
+    name: Tuple[str],
+    show_diff: bool,
+    jobs: int,
+):
+    """Report the differences of the resources of two Nakadi environments"""
+    configure_logging(verbose)
+
+    if len(env) != 2:
+        logging.error("Exactly two environments have to be compared")
+        exit(-1)
+
+    try:
+        config = load_config()
+        for e in env:
+            if e not in config.environments:
+                logging.error(f"Environment not found in configuration: {e}")
+                exit(-1)
+
+        resource_filter = ResourceFilter(kind, name)
+
+        def inventory(e: str) -> dict:
+            environment = config.environments[e]
+            nakadi_sql = (
+                NakadiSql(environment.nakadi_sql_url, token)
+                if environment.nakadi_sql_url
+                else None
+            )
+            return fetch_inventory(
+                Nakadi(environment.nakadi_url, token), nakadi_sql, resource_filter, jobs
+            )
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            left, right = executor.map(inventory, env)
+
+        comparison = compare_inventories(left, right)
+        for e, identities in (
+            (env[0], comparison.only_left),
+            (env[1], comparison.only_right),
+        ):
+            if identities:
+                logging.info(
+                    f"{MODIFY_COLOR}Only in %s (%d):{Fore.RESET}\n%s",
+                    e,
+                    len(identities),
+                    "\n".join(f"    {identity}" for identity in identities),
+                )
+
+        if comparison.different:
+            logging.info(
+                f"{MODIFY_COLOR}Different (%d):{Fore.RESET}", len(comparison.different)
+            )
+            for identity, diff in comparison.different.items():
+                logging.info("    %s: %s", identity, ", ".join(changed_paths(diff)))
+                if show_diff:
+                    logging.info(pretty_yaml(diff_to_dict(diff), indentation=8))
+
+        logging.info(
+            f"{UP_TO_DATE_COLOR}Identical: %d{Fore.RESET}", comparison.identical
+        )
+
+    except (NakadiError, ConfigurationError) as ex:
+        logging.error(ex)
+        exit(-1)
+
+    except Exception as ex:
+        logging.exception(ex)
+        exit(-1)
+
+
+@cli.command("stats")
+@click.option(
+    "-t",
+    "--token",
+    required=False,
+    type=str,
+    help="The bearer token to authenticate the Nakadi requests",
+)
+@click.option(
+    "-v",
+    "--verbose",
+    is_flag=True,
+    default=False,
+    help="Verbose output (default - false)",
+)
+@click.option(
+    "-e",
+    "--env",
+    shell_complete=complete_env,
+    required=True,
+    type=str,
+    help="The Nakadi environment to target",
+)
+@click.option(
+    "--owning-application",
+    "owning_application",
+    required=False,
+    type=str,
+    multiple=True,
+    help="Report all subscriptions owned by the applications, instead of the ones of a clin file",
+)
+@click.option(
+    "--sort",
+    default="lag",
+    type=click.Choice(list(SORT_KEYS)),
+    help="Sort the subscriptions by their largest consumer lag or their unconsumed events (default - lag)",
+)
+@click.option(
+    "--top",
+    required=False,
+    type=click.IntRange(min=1),
+    help="Report only the given number of subscriptions lagging the most",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    default=16,
+    type=click.IntRange(min=1),
+    help="Number of concurrent requests (default - 16)",
+)
+@click.argument(
+    "file",
+    required=False,
+    type=click.Path(exists=True, dir_okay=False, readable=True),
+)
+def stats(
+    token: Optional[str],
+    verbose: bool,
+    env: str,
+    owning_application: Tuple[str],
+    sort: str,
+    top: Optional[int],
+    jobs: int,
+    file: Optional[str],
+):
+    """Report the unconsumed events and consumer lag of subscriptions\n
+    The subscriptions are the ones declared by the clin file for the
+    environment, or all the ones owned by the given applications"""
+    configure_logging(verbose)
+
+    if bool(file) == bool(owning_application):
+        logging.error("Either a clin file or owning applications have to be given")
+        exit(-1)
+
+    try:
+        config = load_config()
+        if env not in config.environments:
+            logging.error(f"Environment not found in configuration: {env}")
+            exit(-1)
+
+        nakadi = Nakadi(config.environments[env].nakadi_url, token)
+        if file:
+            master = load_yaml(Path(file), DEFAULT_YAML_LOADER, os.environ)
+            scope = calculate_scope(
+                master,
+                Path(file).parent,
+                DEFAULT_YAML_LOADER,
+                (),
+                (env,),
+                resource_filter=ResourceFilter((str(Kind.SUBSCRIPTION),), ()),
+            )
+            subscriptions, missing = managed_subscriptions(
+                nakadi, scope[Kind.SUBSCRIPTION]
+            )
+            for envelope in missing:
+                logging.warning(
+                    f"{ERROR_COLOR}✘ Not found:{Fore.RESET} %s", envelope.identity
+                )
+        else:
+            subscriptions = [
+                payload
+                for application in owning_application
+                for payload in nakadi.list_subscriptions(application)
+            ]
+
+        summaries = sorted(
+            fetch_stats(nakadi, subscriptions, jobs), key=SORT_KEYS[sort], reverse=True
+        )
+        if summaries:
+            logging.info(
+                "%10s %14s %12s  %s", "LAG", "UNCONSUMED", "UNASSIGNED", "SUBSCRIPTION"
+            )
+        for summary in summaries[:top]:
+            lag = (
+                f"{summary.max_lag_seconds}s"
+                if summary.max_lag_seconds is not None
+                else "-"
+            )
+            color = ERROR_COLOR if summary.unassigned else ""
+            logging.info(
+                f"{color}%10s %14d %12s  %s{Fore.RESET if color else ''}",
+                lag,
+                summary.unconsumed,
+                f"{summary.unassigned}/{summary.partitions}",
+                summary,
+            )
+
+        lags = [s.max_lag_seconds for s in summaries if s.max_lag_seconds is not None]
+        logging.info(
+            "%d subscriptions of %s, %d unconsumed events, largest lag %s",
+            len(summaries),
+            env,
+            sum(s.unconsumed for s in summaries),
+            f"{max(lags)}s" if lags else "unknown",
+        )
+
+    except (NakadiError, ConfigurationError, YamlError) as ex:
+        logging.error(ex)
+        exit(-1)
+
+    except Exception as ex:
+        logging.exception(ex)
+        exit(-1)
+
+
+@cli.command("capacity")
+@click.option(
+    "-t",
+    "--token",
+    required=False,
+    type=str,
+    help="The bearer token to authenticate the Nakadi requests",
+)
+@click.option(
+    "-v",
+    "--verbose",
+    is_flag=True,
+    default=False,
+    help="Verbose output (default - false)",
+)
+@click.option(
+    "-e",
+    "--env",
+    shell_complete=complete_env,
+    required=True,
+    type=str,
+    help="The Nakadi environment to target",
+)
+@click.option(
+    "--interval",
+    default=60.0,
+    type=click.FloatRange(min=1),
+    help="Seconds between the two samples of the partition offsets (default - 60)",
+)
+@click.option(
+    "--target-rate",
+    "target_rate",
+    default=1000.0,
+    type=click.FloatRange(min=0, min_open=True),
+    help="Events per second a partition is sized for (default - 1000)",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    default=16,
+    type=click.IntRange(min=1),
+    help="Number of concurrent requests (default - 16)",
+)
+@click.argument(
+    "file",
+    required=False,
+    type=click.Path(exists=True, dir_okay=False, readable=True),
+)
+def capacity(
+    token: Optional[str],
+    verbose: bool,
+    env: str,
+    interval: float,
+    target_rate: float,
+    jobs: int,
+    file: Optional[str],
+):
+    """Measure the publish rates and retention of event types\n
+    The partition offsets of all event types of the environment, or of the
+    ones declared by the clin file, are sampled twice. Event types with too few
+    or far too many partitions for their rate are flagged, compared to the
+    partition count of their manifest when a clin file is given."""
+    configure_logging(verbose)
+
+    try:
+        config = load_config()
+        if env not in config.environments:
+            logging.error(f"Environment not found in configuration: {env}")
+            exit(-1)
+
+        nakadi = Nakadi(config.environments[env].nakadi_url, token)
+        event_types = nakadi.list_event_types()
+        declared: Dict[str, Optional[int]] = {}
+        if file:
+            master = load_yaml(Path(file), DEFAULT_YAML_LOADER, os.environ)
+            scope = calculate_scope(
+                master,
+                Path(file).parent,
+                DEFAULT_YAML_LOADER,
+                (),
+                (env,),
+                resource_filter=ResourceFilter((str(Kind.EVENT_TYPE),), ()),
+            )
+            for task in scope[Kind.EVENT_TYPE]:
+                spec = task.envelope.spec
+                declared[spec["name"]] = spec.get("partitioning", {}).get(
+                    "partitionCount"
+                )
+            existing = {payload["name"] for payload in event_types}
+            for name in sorted(declared.keys() - existing):
+                logging.warning(f"{ERROR_COLOR}✘ Not found:{Fore.RESET} %s", name)
+            event_types = [p for p in event_types if p["name"] in declared]
+
+        logging.info(
+            "Sampling the partitions of %d event types twice in %ds",
+            len(event_types),
+            interval,
+        )
+        capacities = measure_capacity(nakadi, event_types, interval, jobs)
+        for measured in capacities:
+            measured.declared_partitions = declared.get(measured.name)
+        capacities.sort(key=lambda c: c.publish_rate, reverse=True)
+
+        if capacities:
+            logging.info(
+                "%10s %6s %6s %14s %14s  %s",
+                "EVENTS/S",
+                "PARTS",
+                "SKEW",
+                "RETAINED",
+                "PROJECTED",
+                "EVENT TYPE",
+            )
+        flagged = Counter()
+        for measured in capacities:
+            provisioning = measured.provisioning(target_rate)
+            note = ""
+            if provisioning:
+                flagged[provisioning] += 1
+                color = (
+                    ERROR_COLOR if provisioning == UNDER_PROVISIONED else MODIFY_COLOR
+                )
+                note = (
+                    f"  {color}⚠ {provisioning}, "
+                    f"{measured.needed_partitions(target_rate)} partitions needed"
+                    f"{Fore.RESET}"
+                )
+            elif not measured.publish_rate:
+                note = "  no traffic sampled"
+            logging.info(
+                "%10.1f %6s %6.1f %14d %14d  %s%s",
+                measured.publish_rate,
+                measured.declared_partitions or measured.partitions,
+                measured.skew,
+                measured.retained_events,
+                measured.projected_retained_events,
+                measured.name,
+                note,
+            )
+
+        logging.info(
+            "%d event types of %s, %.1f events/s in total, "
+            "%d under-provisioned, %d over-provisioned",
+            len(capacities),
+            env,
+            sum(c.publish_rate for c in capacities),
+            flagged[UNDER_PROVISIONED],
+            flagged[OVER_PROVISIONED],
+        )
+
+    except (NakadiError, ConfigurationError, YamlError) as ex:
+        logging.error(ex)
+        exit(-1)
+
+    except Exception as ex:
+        logging.exception(ex)
+        exit(-1)
+
+
 if __name__ == "__main__":
     cli()
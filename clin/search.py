@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import bisect
+import json
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+from clin.models.shared import Kind
+from clin.sharding import SQL_SOURCE_RE
+from clin.utils import atomic_write_text, cache_dir
+
+INDEX_VERSION = 1
+FIELDS = ["kind", "name", "app", "annotation", "principal", "property", "reads"]
+
+
+def default_index_path(env: str) -> Path:
+    return cache_dir() / "index" / f"{env}.json"
+
+
+class SearchIndex:
+    """Inverted index over the resources of an environment. Every field maps
+    lowercase terms to the positions of the documents containing them."""
+
+    def __init__(self, env: str, built_at: float):
+        self.env = env
+        self.built_at = built_at
+        self.documents: list[dict] = []
+        self.fields: dict[str, dict[str, list[int]]] = {f: {} for f in FIELDS}
+        self._sorted_terms: dict[str, list[str]] = {}
+
+    @staticmethod
+    def build(
+        env: str,
+        event_types: list[dict],
+        sql_queries: list[dict],
+        subscriptions: list[dict],
+    ) -> SearchIndex:
+        """Indexes the payloads listed from Nakadi and Nakadi SQL"""
+        index = SearchIndex(env, time.time())
+        queries = {query["id"]: query for query in sql_queries}
+        for payload in event_types:
+            name = payload["name"]
+            query = queries.get(name)
+            kind = Kind.SQL_QUERY if query else Kind.EVENT_TYPE
+            position = index._add_document(kind, name, payload["owning_application"])
+            index._add(position, "name", [name])
+            index._add(position, "app", [payload["owning_application"]])
+            index._add(position, "annotation", _annotation_terms(payload))
+            index._add(position, "principal", _principal_terms(payload))
+            if query:
+                index._add(position, "principal", _principal_terms(query))
+                index._add(position, "reads", _sql_sources(query.get("sql") or ""))
+            schema = payload.get("schema", {}).get("schema")
+            if schema:
+                index._add(position, "property", schema_paths(json.loads(schema)))
+
+        for payload in subscriptions:
+            position = index._add_document(
+                Kind.SUBSCRIPTION,
+                str(payload["id"]),
+                payload["owning_application"],
+                consumer_group=payload["consumer_group"],
+            )
+            index._add(position, "name", [str(payload["id"])])
+            index._add(position, "app", [payload["owning_application"]])
+            index._add(position, "principal", _principal_terms(payload))
+            index._add(position, "reads", payload["event_types"])
+        return index
+
+    @staticmethod
+    def load(path: Path) -> SearchIndex:
+        try:
+            content = json.loads(path.read_text())
+        except FileNotFoundError:
+            raise SearchError(f"No index found at {path}, build it with index build")
+        except ValueError:
+            raise SearchError(f"Invalid index file: {path}")
+        if content.get("version") != INDEX_VERSION:
+            raise SearchError(f"Outdated index file {path}, rebuild it")
+        index = SearchIndex(content["env"], content["built_at"])
+        index.documents = content["documents"]
+        index.fields = content["fields"]
+        return index
+
+    def save(self, path: Path):
+        atomic_write_text(
+            path,
+            json.dumps(
+                {
+                    "version": INDEX_VERSION,
+                    "env": self.env,
+                    "built_at": self.built_at,
+                    "documents": self.documents,
+                    "fields": self.fields,
+                },
+                separators=(",", ":"),
+            ),
+        )
+
+    def search(self, query: list[str]) -> list[dict]:
+        """The documents matching all terms of the query. A term is either
+        `field:value` or a bare value matching any field, and matches by prefix
+        when it ends with *."""
+        matches: Optional[set[int]] = None
+        for term in query:
+            field, _, value = term.partition(":")
+            if field not in self.fields or not value:
+                field, value = None, term
+            positions = set(self._lookup(field, value.lower()))
+            matches = positions if matches is None else matches & positions
+            if not matches:
+                return []
+        return [self.documents[position] for position in sorted(matches or [])]
+
+    def _lookup(self, field: Optional[str], value: str) -> Iterator[int]:
+        for name in [field] if field else FIELDS:
+            terms = self.fields[name]
+            if not value.endswith("*"):
+                yield from terms.get(value, [])
+                continue
+            prefix = value[:-1]
+            if name not in self._sorted_terms:
+                self._sorted_terms[name] = sorted(terms)
+            sorted_terms = self._sorted_terms[name]
+            start = bisect.bisect_left(sorted_terms, prefix)
+            for candidate in sorted_terms[start:]:
+                if not candidate.startswith(prefix):
+                    break
+                yield from terms[candidate]
+
+    def _add_document(self, kind: Kind, name: str, app: str, **extra) -> int:
+        self.documents.append({"kind": str(kind), "name": name, "app": app, **extra})
+        position = len(self.documents) - 1
+        self._add(position, "kind", [str(kind)])
+        return position
+
+    def _add(self, position: int, field: str, terms: list[str]):
+        postings = self.fields[field]
+        for term in {str(term).lower() for term in terms}:
+            postings.setdefault(term, []).append(position)
+
+
+def schema_paths(schema: dict, prefix: str = "") -> list[str]:
+    """The dotted paths of the properties declared by a JSON schema, and their
+    names on their own so nested properties can be found without their path"""
+    paths = []
+    for name, child in (schema.get("properties") or {}).items():
+        path = f"{prefix}.{name}" if prefix else name
+        paths.append(path)
+        if prefix:
+            paths.append(name)
+        if isinstance(child, dict):
+            paths.extend(schema_paths(child, path))
+    items = schema.get("items")
+    if isinstance(items, dict):
+        paths.extend(schema_paths(items, prefix))
+    for combinator in ("allOf", "anyOf", "oneOf"):
+        for option in schema.get(combinator) or []:
+            if isinstance(option, dict):
+                paths.extend(schema_paths(option, prefix))
+    return paths
+
+
+def _annotation_terms(payload: dict) -> list[str]:
+    terms = []
+    for key, value in (payload.get("annotations") or {}).items():
+        terms.extend([key, f"{key}={value}"])
+    return terms
+
+
+def _principal_terms(payload: dict) -> list[str]:
+    terms = []
+    for entries in (payload.get("authorization") or {}).values():
+        for entry in entries:
+            terms.extend([entry["value"], f"{entry['data_type']}:{entry['value']}"])
+    return terms
+
+
+def _sql_sources(sql: str) -> list[str]:
+    return [quoted or plain for quoted, plain in SQL_SOURCE_RE.findall(sql)]
+
+
+class SearchError(Exception):
+    def __init__(self, message: str):
+        self.message = message
+
+    def __str__(self):
+        return self.message
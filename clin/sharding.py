@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from dataclasses import dataclass
+
+from clin.clinfile import Process
+from clin.models.shared import Kind
+
+SQL_SOURCE_RE = re.compile(r'\b(?:from|join)\s+(?:"([^"]+)"|([\w.\-]+))', re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class Shard:
+    """One of `count` parts of a scope, `index` starting with 1"""
+
+    index: int
+    count: int
+
+    @staticmethod
+    def parse(value: str) -> Shard:
+        try:
+            index, count = (int(part) for part in value.split("/"))
+        except ValueError:
+            raise ValueError(f"Invalid shard '{value}', expected i/n like 1/4")
+        if not 1 <= index <= count:
+            raise ValueError(f"Invalid shard '{value}', i must be between 1 and n")
+        return Shard(index, count)
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+
+def select_shard(
+    scope: dict[Kind, list[Process]], shard: Shard
+) -> dict[Kind, list[Process]]:
+    """The part of the scope processed by the shard. Resources depending on
+    each other through event type names stay together: an event type, the sql
+    queries reading or writing it, and the subscriptions to it. Every group is
+    assigned by a stable hash of its smallest name, so all shards of the same
+    scope together contain every resource exactly once."""
+    groups = _UnionFind()
+    for tasks in scope.values():
+        for task in tasks:
+            names = [(task.target, name) for name in dependency_names(task)]
+            for name in names[1:]:
+                groups.union(names[0], name)
+
+    def in_shard(task: Process) -> bool:
+        names = dependency_names(task)
+        if not names:
+            return _hashes_to(f"{task.target}:{task.envelope.identity}", shard)
+        target, name = groups.find((task.target, names[0]))
+        return _hashes_to(f"{target}:{name}", shard)
+
+    return {kind: [t for t in tasks if in_shard(t)] for kind, tasks in scope.items()}
+
+
+def dependency_names(task: Process) -> list[str]:
+    """The names of the event types the resource declares or depends on"""
+    return spec_dependency_names(task.envelope.kind, task.envelope.spec)
+
+
+def spec_dependency_names(kind: Kind, spec: dict) -> list[str]:
+    """Like `dependency_names` for the spec of a resource, the declared name
+    comes first"""
+    if kind == Kind.SUBSCRIPTION:
+        return sorted(spec.get("eventTypes") or [])
+    names = [spec["name"]] if spec.get("name") else []
+    if kind == Kind.SQL_QUERY:
+        for quoted, plain in SQL_SOURCE_RE.findall(spec.get("sql") or ""):
+            names.append(quoted or plain)
+    return names
+
+
+def _hashes_to(key: str, shard: Shard) -> bool:
+    digest = int(hashlib.sha1(key.encode()).hexdigest(), 16)
+    return digest % shard.count == shard.index - 1
+
+
+class _UnionFind:
+    def __init__(self):
+        self._parent: dict[tuple[str, str], tuple[str, str]] = {}
+
+    def find(self, item: tuple[str, str]) -> tuple[str, str]:
+        root = item
+        while self._parent.get(root, root) != root:
+            root = self._parent[root]
+        while item != root:
+            self._parent[item], item = root, self._parent.get(item, root)
+        return root
+
+    def union(self, a: tuple[str, str], b: tuple[str, str]):
+        root_a, root_b = self.find(a), self.find(b)
+        # the smallest name represents the group, independently of the order
+        if root_a < root_b:
+            self._parent[root_b] = root_a
+        elif root_b < root_a:
+            self._parent[root_a] = root_b
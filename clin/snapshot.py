@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Optional
+
+from clin.clients.nakadi import Nakadi
+from clin.clients.nakadi_sql import NakadiSql
+from clin.models.shared import Kind
+
+SNAPSHOT_MAGIC = b"CLINSNP1"
+# offset and length of the index, followed by the magic again
+FOOTER = struct.Struct("<QQ8s")
+
+
+def subscription_key(
+    event_types: Iterable[str], owning_application: str, consumer_group: str
+) -> str:
+    return json.dumps([sorted(event_types), owning_application, consumer_group])
+
+
+class Snapshot:
+    """Read-only view of a snapshot file. The file is memory-mapped and only
+    its index is parsed upfront, records are decoded when looked up.
+
+    Layout: magic, JSON records, JSON index of record offsets, fixed footer."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        try:
+            with path.open("rb") as f:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise SnapshotError(f"Empty snapshot file: {path}")
+        except OSError as ex:
+            raise SnapshotError(f"Can not read snapshot {path}: {ex}")
+
+        if (
+            len(self._data) < len(SNAPSHOT_MAGIC) + FOOTER.size
+            or self._data[: len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC
+        ):
+            self.close()
+            raise SnapshotError(f"Not a clin snapshot: {path}")
+
+        offset, length, magic = FOOTER.unpack_from(
+            self._data, len(self._data) - FOOTER.size
+        )
+        if magic != SNAPSHOT_MAGIC:
+            self.close()
+            raise SnapshotError(f"Truncated snapshot, please take it again: {path}")
+
+        try:
+            index = json.loads(self._data[offset : offset + length])
+            self.env: str = index["env"]
+            self.taken_at: str = index["taken_at"]
+            self.high_water_mark: Optional[str] = index.get("high_water_mark")
+            self._entries: dict[str, dict[str, list[int]]] = index["entries"]
+        except (ValueError, KeyError, TypeError):
+            self.close()
+            raise SnapshotError(f"Corrupt snapshot, please take it again: {path}")
+        self._index_offset = offset
+
+    def has(self, kind: Kind, name: str) -> bool:
+        return name in self._entries.get(str(kind), {})
+
+    def get(self, kind: Kind, name: str) -> Optional[dict]:
+        entry = self._entries.get(str(kind), {}).get(name)
+        if entry is None:
+            return None
+        offset, length = entry
+        return json.loads(self._data[offset : offset + length])
+
+    def names(self, kind: Kind) -> list[str]:
+        return sorted(self._entries.get(str(kind), {}))
+
+    def is_sparse(self) -> bool:
+        """Whether most of the records were replaced by a refresh"""
+        live = sum(
+            length
+            for entries in self._entries.values()
+            for _, length in entries.values()
+        )
+        return live * 2 < self._index_offset
+
+    def close(self):
+        self._data.close()
+
+
+class SnapshotWriter:
+    """Writes a snapshot through a temporary sibling file, which replaces the
+    target only once the index is written. The snapshot is either new, or a
+    copy of an existing one appended to with `SnapshotWriter.append`."""
+
+    def __init__(self, path: Path, env: str):
+        self.path = path
+        self.env = env
+        self._entries: dict[str, dict[str, list[int]]] = {}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, self._tmp = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.")
+        self._file = os.fdopen(fd, "wb")
+        self._file.write(SNAPSHOT_MAGIC)
+
+    @staticmethod
+    def append(snapshot: Snapshot) -> SnapshotWriter:
+        """Copies the records of the snapshot to append new ones in place of
+        its index. Replaced records are left behind. The snapshot file is not
+        changed, and stays valid until the copy replaces it on commit."""
+        writer = SnapshotWriter.__new__(SnapshotWriter)
+        writer.path = snapshot.path
+        writer.env = snapshot.env
+        writer._entries = {
+            kind: dict(entries) for kind, entries in snapshot._entries.items()
+        }
+        fd, writer._tmp = tempfile.mkstemp(
+            dir=str(snapshot.path.parent), prefix=f".{snapshot.path.name}."
+        )
+        os.close(fd)
+        try:
+            shutil.copyfile(str(snapshot.path), writer._tmp)
+            writer._file = open(writer._tmp, "r+b")
+        except BaseException:
+            os.unlink(writer._tmp)
+            raise
+        writer._file.truncate(snapshot._index_offset)
+        writer._file.seek(snapshot._index_offset)
+        return writer
+
+    def remove(self, kind: Kind, name: str):
+        self._entries.get(str(kind), {}).pop(name, None)
+
+    def add(self, kind: Kind, name: str, record: dict):
+        content = json.dumps(record, separators=(",", ":")).encode()
+        self._entries.setdefault(str(kind), {})[name] = [
+            self._file.tell(),
+            len(content),
+        ]
+        self._file.write(content)
+
+    def commit(self, high_water_mark: Optional[str]):
+        index = {
+            "env": self.env,
+            "taken_at": datetime.now(timezone.utc).isoformat(),
+            "high_water_mark": high_water_mark,
+            "entries": self._entries,
+        }
+        content = json.dumps(index, separators=(",", ":")).encode()
+        offset = self._file.tell()
+        self._file.write(content)
+        self._file.write(FOOTER.pack(offset, len(content), SNAPSHOT_MAGIC))
+        self._file.close()
+        os.replace(self._tmp, str(self.path))
+
+    def abort(self):
+        self._file.close()
+        os.unlink(self._tmp)
+
+
+def take_snapshot(
+    nakadi: Nakadi,
+    nakadi_sql: Optional[NakadiSql],
+    env: str,
+    path: Path,
+    jobs: int,
+) -> dict[Kind, int]:
+    """Downloads all resources of the environment into a snapshot file and
+    returns the number of resources per kind"""
+    writer = SnapshotWriter(path, env)
+    try:
+        event_types = nakadi.list_event_types()
+        names = [payload["name"] for payload in event_types]
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            partitions = list(executor.map(nakadi.get_partition_count, names))
+        for payload, partition_count in zip(event_types, partitions):
+            writer.add(
+                Kind.EVENT_TYPE,
+                payload["name"],
+                {"payload": payload, "partitions": partition_count},
+            )
+
+        queries = nakadi_sql.list_sql_queries() if nakadi_sql else []
+        for payload in queries:
+            writer.add(Kind.SQL_QUERY, payload["id"], payload)
+
+        subscriptions = nakadi.list_subscriptions()
+        for payload in subscriptions:
+            writer.add(Kind.SUBSCRIPTION, _subscription_name(payload), payload)
+
+        writer.commit(_high_water_mark(event_types))
+
+    except BaseException:
+        writer.abort()
+        raise
+
+    return {
+        Kind.EVENT_TYPE: len(event_types),
+        Kind.SQL_QUERY: len(queries),
+        Kind.SUBSCRIPTION: len(subscriptions),
+    }
+
+
+def refresh_snapshot(
+    nakadi: Nakadi, nakadi_sql: Optional[NakadiSql], path: Path, jobs: int
+) -> tuple[int, int]:
+    """Refreshes a snapshot and returns the number of updated and deleted
+    resources. Only the partitions of event types updated after the
+    high-water mark of the snapshot are downloaded again, deleted resources are
+    found by comparing the listed names with the snapshot."""
+    snapshot = Snapshot(path)
+    try:
+        event_types = nakadi.list_event_types()
+        stale = [
+            payload
+            for payload in event_types
+            if not snapshot.has(Kind.EVENT_TYPE, payload["name"])
+            or _updated_since(payload, snapshot.high_water_mark)
+        ]
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            partitions = list(
+                executor.map(nakadi.get_partition_count, [p["name"] for p in stale])
+            )
+        changes = {
+            (Kind.EVENT_TYPE, payload["name"]): {
+                "payload": payload,
+                "partitions": partition_count,
+            }
+            for payload, partition_count in zip(stale, partitions)
+        }
+        listed = {(Kind.EVENT_TYPE, payload["name"]) for payload in event_types}
+
+        # sql queries and subscriptions carry no update time, but are listed
+        # in full anyway and compared with the snapshot locally
+        others = [
+            (Kind.SQL_QUERY, payload["id"], payload)
+            for payload in (nakadi_sql.list_sql_queries() if nakadi_sql else [])
+        ] + [
+            (Kind.SUBSCRIPTION, _subscription_name(payload), payload)
+            for payload in nakadi.list_subscriptions()
+        ]
+        for kind, name, payload in others:
+            listed.add((kind, name))
+            if snapshot.get(kind, name) != payload:
+                changes[(kind, name)] = payload
+
+        deleted = [
+            (kind, name)
+            for kind in Kind
+            for name in snapshot.names(kind)
+            if (kind, name) not in listed
+        ]
+
+    except BaseException:
+        snapshot.close()
+        raise
+
+    try:
+        writer = SnapshotWriter.append(snapshot)
+    finally:
+        snapshot.close()
+    try:
+        for (kind, name), record in changes.items():
+            writer.add(kind, name, record)
+        for kind, name in deleted:
+            writer.remove(kind, name)
+        writer.commit(_high_water_mark(event_types) or snapshot.high_water_mark)
+
+    except BaseException:
+        writer.abort()
+        raise
+
+    refreshed = Snapshot(path)
+    if refreshed.is_sparse():
+        _compact(refreshed)
+    refreshed.close()
+    return len(changes), len(deleted)
+
+
+def _compact(snapshot: Snapshot):
+    writer = SnapshotWriter(snapshot.path, snapshot.env)
+    try:
+        for kind in Kind:
+            for name in snapshot.names(kind):
+                writer.add(kind, name, snapshot.get(kind, name))
+        writer.commit(snapshot.high_water_mark)
+
+    except BaseException:
+        writer.abort()
+        raise
+
+
+def _subscription_name(payload: dict) -> str:
+    return subscription_key(
+        payload["event_types"], payload["owning_application"], payload["consumer_group"]
+    )
+
+
+def _updated_since(payload: dict, high_water_mark: Optional[str]) -> bool:
+    # Nakadi formats all timestamps alike, so they compare as strings
+    updated_at = payload.get("updated_at")
+    return not updated_at or not high_water_mark or updated_at > high_water_mark
+
+
+def _high_water_mark(event_types: list[dict]) -> Optional[str]:
+    return max(
+        (p["updated_at"] for p in event_types if p.get("updated_at")), default=None
+    )
+
+
+class SnapshotError(Exception):
+    def __init__(self, message: str):
+        self.message = message
+
+    def __str__(self):
+        return self.message
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+from pathlib import Path
+
+from clin.models.shared import Envelope
+from clin.utils import atomic_write_text, cache_dir
+
+STATE_VERSION = 1
+
+
+class StateFile:
+    """Remembers per target environment the fingerprints of the envelopes which
+    were successfully applied, so unchanged envelopes can be skipped."""
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._environments: dict[str, dict[str, str]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+
+        if path.is_file():
+            try:
+                content = json.loads(path.read_text())
+                if content.get("version") == STATE_VERSION:
+                    self._environments = content["environments"]
+            except Exception as ex:
+                logging.warning("Ignoring unreadable state file %s: %s", path, ex)
+
+    @staticmethod
+    def for_clin_file(clin_file: Path) -> StateFile:
+        key = hashlib.sha1(str(clin_file.resolve()).encode()).hexdigest()
+        return StateFile(cache_dir() / "state" / f"{key}.json")
+
+    def is_unchanged(self, env: str, envelope: Envelope) -> bool:
+        with self._lock:
+            applied = self._environments.get(env, {}).get(envelope.identity)
+        return applied == envelope.fingerprint()
+
+    def record(self, env: str, envelope: Envelope):
+        with self._lock:
+            resources = self._environments.setdefault(env, {})
+            resources[envelope.identity] = envelope.fingerprint()
+            self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            content = {"version": STATE_VERSION, "environments": self._environments}
+            atomic_write_text(self._path, json.dumps(content, indent=1))
+            self._dirty = False
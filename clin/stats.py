@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+from clin.clients.nakadi import Nakadi
+from clin.clinfile import Process
+from clin.models.shared import Envelope, Kind
+
+SORT_KEYS = {
+    "lag": lambda s: (s.max_lag_seconds or 0, s.unconsumed),
+    "unconsumed": lambda s: (s.unconsumed, s.max_lag_seconds or 0),
+}
+
+
+@dataclass
+class SubscriptionStats:
+    """The consumption state of a subscription, aggregated over its
+    partitions"""
+
+    id: str
+    owning_application: str
+    consumer_group: str
+    event_types: list[str]
+    partitions: int = 0
+    unassigned: int = 0
+    unconsumed: int = 0
+    max_lag_seconds: Optional[int] = None
+    unconsumed_per_event_type: dict[str, int] = field(default_factory=dict)
+
+    def __str__(self) -> str:
+        return (
+            f"{self.owning_application}/{self.consumer_group} "
+            f"[{', '.join(self.event_types)}] {self.id}"
+        )
+
+
+def summarize(subscription: dict, items: list[dict]) -> SubscriptionStats:
+    """Aggregates the per partition stats returned by Nakadi"""
+    stats = SubscriptionStats(
+        id=subscription["id"],
+        owning_application=subscription["owning_application"],
+        consumer_group=subscription["consumer_group"],
+        event_types=sorted(subscription["event_types"]),
+    )
+    lags = []
+    for item in items:
+        partitions = item.get("partitions") or []
+        unconsumed = sum(p.get("unconsumed_events") or 0 for p in partitions)
+        stats.unconsumed_per_event_type[item["event_type"]] = unconsumed
+        stats.unconsumed += unconsumed
+        stats.partitions += len(partitions)
+        stats.unassigned += sum(1 for p in partitions if p.get("state") != "assigned")
+        lags.extend(
+            p["consumer_lag_seconds"]
+            for p in partitions
+            if p.get("consumer_lag_seconds") is not None
+        )
+    stats.max_lag_seconds = max(lags) if lags else None
+    return stats
+
+
+def fetch_stats(
+    nakadi: Nakadi, subscriptions: list[dict], jobs: int
+) -> list[SubscriptionStats]:
+    """The stats of the subscriptions, fetched concurrently"""
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        items = executor.map(
+            nakadi.get_subscription_stats, [s["id"] for s in subscriptions]
+        )
+        return [summarize(s, i) for s, i in zip(subscriptions, items)]
+
+
+def managed_subscriptions(
+    nakadi: Nakadi, tasks: Iterable[Process]
+) -> tuple[list[dict], list[Envelope]]:
+    """The subscriptions declared by the tasks, listed once per owning
+    application, and the declared ones missing in Nakadi"""
+    declared = {
+        task.envelope.identity: task.envelope
+        for task in tasks
+        if task.envelope.kind == Kind.SUBSCRIPTION
+    }
+    applications = {
+        envelope.spec["owningApplication"] for envelope in declared.values()
+    }
+
+    found = {}
+    for application in sorted(applications):
+        for payload in nakadi.list_subscriptions(application):
+            identity = subscription_identity(payload)
+            if identity in declared:
+                found[identity] = payload
+
+    missing = [
+        envelope for identity, envelope in declared.items() if identity not in found
+    ]
+    return list(found.values()), missing
+
+
+def subscription_identity(payload: dict) -> str:
+    return Envelope(
+        Kind.SUBSCRIPTION,
+        {
+            "owningApplication": payload["owning_application"],
+            "consumerGroup": payload["consumer_group"],
+            "eventTypes": payload["event_types"],
+        },
+    ).identity
@@ -1,6 +1,11 @@
 import json
 import logging
+import os
 import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
 
 import yaml
 from pygments import highlight
@@ -11,6 +16,8 @@ from pygments.lexers.data import JsonLexer, YamlLexer
 
 MS_IN_DAY = 24 * 60 * 60 * 1000
 
+_log_context = threading.local()
+
 
 def walk(src, f):
     if isinstance(src, dict):
@@ -34,18 +41,59 @@ def ensure_flat_list(val) -> list:
         return [val]
 
 
+def cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return Path(base) / "clin"
+
+
+def atomic_write_text(path: Path, content: str):
+    """Writes the file through a temporary sibling, so readers never see a
+    partially written file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        os.replace(tmp, str(path))
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+@contextmanager
+def log_prefix(prefix: str):
+    """Prefixes the messages logged by the current thread"""
+    _log_context.prefix = f"[{prefix}] "
+    try:
+        yield
+    finally:
+        _log_context.prefix = ""
+
+
+class _LogPrefixFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.prefix = getattr(_log_context, "prefix", "")
+        return True
+
+
 def configure_logging(verbose: bool):
-    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
+    logging.basicConfig(
+        level=logging.INFO, format="%(prefix)s%(message)s", stream=sys.stdout
+    )
+    for handler in logging.getLogger().handlers:
+        handler.addFilter(_LogPrefixFilter())
     if verbose:
         logging.getLogger().setLevel(logging.DEBUG)
     logging.getLogger("requests").setLevel(logging.WARNING)
     logging.getLogger("urllib3").setLevel(logging.WARNING)
 
 
+def plain_yaml(val: dict) -> str:
+    return yaml.dump(_remove_none(val), sort_keys=False)
+
+
 def pretty_yaml(val: dict, indentation: int = 0) -> str:
-    raw = highlight(
-        yaml.dump(_remove_none(val), sort_keys=False), YamlLexer(), _get_formatter()
-    ).strip()
+    raw = highlight(plain_yaml(val), YamlLexer(), _get_formatter()).strip()
     return _indent(raw, indentation)
 
 
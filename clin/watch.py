@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Optional
+
+from clin.clinfile import list_manifest_files
+from clin.yamlops import IncludeGraph, YamlLoader
+
+
+class Watcher:
+    """Polls the modification times of a clin file, its manifests and all
+    files they include. Only the includes of changed files are scanned again."""
+
+    def __init__(self, clin_file: Path, loader: YamlLoader):
+        self.clin_file = clin_file.resolve()
+        self._graph = IncludeGraph(loader)
+        self._mtimes: dict[Path, int] = {}
+
+    def poll(
+        self, master: dict, filter_id: tuple[str], filter_env: tuple[str]
+    ) -> set[Path]:
+        """Returns the files created, modified or deleted since the last poll,
+        all files on the first one"""
+        listed = {
+            path.resolve()
+            for path in list_manifest_files(
+                master, self.clin_file.parent, filter_id, filter_env
+            )
+        }
+        changed = self._update(self._graph.files | listed | {self.clin_file})
+        self._graph.refresh(changed)
+        # files newly included by the changed ones are tracked from now on
+        changed |= self._update(self._graph.files | listed | {self.clin_file})
+        return changed
+
+    def affected_by(self, changed: set[Path]) -> set[Path]:
+        return self._graph.affected_by(changed)
+
+    def _update(self, files: set[Path]) -> set[Path]:
+        mtimes = {}
+        for path in files:
+            mtime = _mtime(path)
+            if mtime is not None:
+                mtimes[path] = mtime
+
+        changed = {
+            path
+            for path in mtimes.keys() | self._mtimes.keys()
+            if mtimes.get(path) != self._mtimes.get(path)
+        }
+        self._mtimes = mtimes
+        return changed
+
+
+def _mtime(path: Path) -> Optional[int]:
+    try:
+        return os.stat(str(path)).st_mtime_ns
+    except OSError:
+        return None
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from clin.clinfile import Process
+from clin.discovery import scan_tree
+from clin.models.shared import Kind
+
+CLIN_FILE_SUFFIX = ".clin.yaml"
+
+
+def find_clin_files(root: Path) -> list[Path]:
+    """All clin files under the directory, except the ones in .clinignore"""
+    return scan_tree(root, lambda name: name.endswith(CLIN_FILE_SUFFIX))
+
+
+class Workspace:
+    """Merges the scopes of multiple clin files. A resource declared by several
+    clin files is processed once, and only if they declare it alike."""
+
+    def __init__(self):
+        self.scope: dict[Kind, list[Process]] = {kind: [] for kind in Kind}
+        self._origins: dict[tuple[str, str], list[Path]] = {}
+        self._tasks: dict[tuple[str, str], Process] = {}
+
+    def add(self, clin_file: Path, scope: dict[Kind, list[Process]]):
+        for kind in Kind:
+            for task in scope[kind]:
+                key = (task.target, task.envelope.identity)
+                known = self._tasks.get(key)
+                if known is None:
+                    self._tasks[key] = task
+                    self._origins[key] = [clin_file]
+                    self.scope[kind].append(task)
+                elif known.envelope.fingerprint() == task.envelope.fingerprint():
+                    self._origins[key].append(clin_file)
+                else:
+                    raise WorkspaceError(
+                        f"Conflicting declarations of {task.envelope.identity} "
+                        f"for {task.target} environment: "
+                        f"{known.path} in {self._origins[key][0]} "
+                        f"and {task.path} in {clin_file}"
+                    )
+
+    def origins(self, task: Process) -> list[Path]:
+        """The clin files declaring the resource of the task"""
+        return self._origins[(task.target, task.envelope.identity)]
+
+
+class WorkspaceError(Exception):
+    def __init__(self, message: str):
+        self.message = message
+
+    def __str__(self):
+        return self.message
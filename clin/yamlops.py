@@ -1,7 +1,9 @@
+from __future__ import annotations
+
 import logging
 import re
 from pathlib import Path
-from typing import List
+from typing import Iterator, List, Optional, Tuple
 
 import yaml
 
@@ -21,7 +23,74 @@ class YamlLoader:
         yml = self._resolve_variables(yml, env, path)
         return yml
 
+    def iter_yaml_from_file(self, path: Path, env: dict) -> Iterator[Tuple[int, dict]]:
+        """Lazily loads the `---` separated documents of the file one by one,
+        yielding each with its position in the file. Empty documents are
+        skipped but still counted. Errors in any but the first document are
+        reported as YamlDocumentError carrying the document number."""
+        documents = yaml.full_load_all(self._read(path, []))
+        index = 0
+        while True:
+            try:
+                yml = next(documents)
+            except StopIteration:
+                return
+            except yaml.YAMLError as ex:
+                error = YamlSyntaxError.from_yaml_error(path, ex)
+                raise locate_document_error(error, path, index) from ex
+            if yml is not None:
+                try:
+                    yml = walk(yml, self._include_resolver(path, env, []))
+                    yml = self._resolve_variables(yml, env, path)
+                except YamlError as ex:
+                    raise locate_document_error(ex, path, index) from ex
+                yield index, yml
+            index += 1
+
+    def parse_raw_documents(self, content: str) -> list:
+        """Parses all the documents of the content without resolving includes and
+        variables, their markers are kept as written."""
+        documents = yaml.full_load_all(self._substitute_markers(content))
+        return [
+            walk(yml, self._restore_markers) for yml in documents if yml is not None
+        ]
+
+    def resolve_raw_name(self, name: str, env: dict) -> Optional[str]:
+        """Resolves the variables of a name parsed by `parse_raw_documents`.
+        None when the name is included from another file or uses a variable
+        without value in the environment."""
+        if name.startswith(self._include_marker):
+            return None
+
+        unresolved = False
+
+        def substitute(match) -> str:
+            nonlocal unresolved
+            if match.group(1) not in env or env[match.group(1)] is None:
+                unresolved = True
+                return ""
+            return str(env[match.group(1)])
+
+        variables_re = re.compile(
+            rf"{re.escape(self._variable_markers[0])}(.*?)"
+            rf"{re.escape(self._variable_markers[1])}"
+        )
+        resolved = variables_re.sub(substitute, name)
+        return None if unresolved else resolved
+
+    def find_includes(self, path: Path) -> list[Path]:
+        """Lists the files directly included by the file, found by scanning its
+        text for include markers"""
+        includes = re.findall(
+            rf"{re.escape(self._include_marker)}([^\s'\",\]}}#]+)", path.read_text()
+        )
+        return [path.parent.joinpath(include).resolve() for include in includes]
+
     def _load_yaml_from_file(self, path: Path, env: dict, visited: List[Path]) -> dict:
+        yml = yaml.full_load(self._read(path, visited))
+        return walk(yml, self._include_resolver(path, env, visited))
+
+    def _include_resolver(self, path: Path, env: dict, visited: List[Path]):
         def resolve_include(src):
             if not isinstance(src, str) or not src.startswith(
                 self._include_substitution
@@ -35,6 +104,9 @@ class YamlLoader:
             )
             return self._load_yaml_from_file(include_path, env, visited + [path])
 
+        return resolve_include
+
+    def _read(self, path: Path, visited: List[Path]) -> str:
         if not path.exists():
             raise YamlFileNotFound(path)
 
@@ -44,15 +116,23 @@ class YamlLoader:
         if path in visited:
             raise YamlCycleReferenceError(path)
 
-        content = (
-            path.read_text()
-            .replace(self._include_marker, self._include_substitution)
+        return self._substitute_markers(path.read_text())
+
+    def _substitute_markers(self, content: str) -> str:
+        return (
+            content.replace(self._include_marker, self._include_substitution)
             .replace(self._variable_markers[0], self._variable_substitutions[0])
             .replace(self._variable_markers[1], self._variable_substitutions[1])
         )
 
-        yml = yaml.full_load(content)
-        return walk(yml, resolve_include)
+    def _restore_markers(self, src):
+        if not isinstance(src, str):
+            return src
+        return (
+            src.replace(self._include_substitution, self._include_marker)
+            .replace(self._variable_substitutions[0], self._variable_markers[0])
+            .replace(self._variable_substitutions[1], self._variable_markers[1])
+        )
 
     def _resolve_variables(self, process, env, path):
         vars_re = re.compile(
@@ -94,6 +174,55 @@ class YamlLoader:
         return walk(process, loop)
 
 
+class IncludeGraph:
+    """Reverse include graph of yaml files: for every file, the files which
+    include it directly."""
+
+    def __init__(self, loader: YamlLoader):
+        self._loader = loader
+        self._scanned: set[Path] = set()
+        self._included_by: dict[Path, set[Path]] = {}
+
+    def add(self, path: Path):
+        pending = [path.resolve()]
+        while pending:
+            current = pending.pop()
+            if current in self._scanned:
+                continue
+            self._scanned.add(current)
+            if not current.is_file():
+                continue
+            for include in self._loader.find_includes(current):
+                self._included_by.setdefault(include, set()).add(current)
+                pending.append(include)
+
+    def refresh(self, changed: set[Path]):
+        """Scans the includes of the changed files again"""
+        for path in changed:
+            path = path.resolve()
+            for included_by in self._included_by.values():
+                included_by.discard(path)
+            self._scanned.discard(path)
+            self.add(path)
+
+    @property
+    def files(self) -> set[Path]:
+        """All scanned files, including the ones which do not exist"""
+        return set(self._scanned)
+
+    def affected_by(self, changed: set[Path]) -> set[Path]:
+        """The changed files and all files including any of them transitively"""
+        affected = set()
+        pending = [path.resolve() for path in changed]
+        while pending:
+            current = pending.pop()
+            if current in affected:
+                continue
+            affected.add(current)
+            pending.extend(self._included_by.get(current, ()))
+        return affected
+
+
 class YamlError(Exception):
     def __init__(self, file: Path):
         self.file = file
@@ -154,6 +283,46 @@ class YamlInvalidFormatError(YamlError):
         return f"{self.message} in {self.file.absolute()}"
 
 
+class YamlSyntaxError(YamlError):
+    def __init__(
+        self,
+        file: Path,
+        problem: str,
+        line: Optional[int] = None,
+        column: Optional[int] = None,
+    ):
+        super(YamlSyntaxError, self).__init__(file)
+        self.problem = problem
+        self.line = line
+        self.column = column
+
+    @staticmethod
+    def from_yaml_error(file: Path, error: yaml.YAMLError) -> YamlSyntaxError:
+        mark = getattr(error, "problem_mark", None)
+        problem = getattr(error, "problem", None) or str(error)
+        if mark is None:
+            return YamlSyntaxError(file, problem)
+        return YamlSyntaxError(file, problem, mark.line + 1, mark.column + 1)
+
+    def __str__(self):
+        location = f" at line {self.line}, column {self.column}" if self.line else ""
+        return f"Invalid yaml: {self.problem}{location} in {self.file.absolute()}"
+
+
+class YamlDocumentError(YamlError):
+    def __init__(self, file: Path, document: int, cause: YamlError):
+        super(YamlDocumentError, self).__init__(file)
+        self.document = document
+        self.cause = cause
+
+    def __str__(self):
+        return f"{self.cause} (document #{self.document} of {self.file.absolute()})"
+
+
+def locate_document_error(error: YamlError, file: Path, index: int) -> YamlError:
+    return error if index == 0 else YamlDocumentError(file, index + 1, error)
+
+
 def load_yaml(file_path: Path, loader: YamlLoader, env: dict) -> dict:
     return loader.load_yaml_from_file(file_path, env)
 
@@ -0,0 +1,53 @@
+import json
+from pathlib import Path
+
+from clin.clients.nakadi import event_type_to_payload
+from clin.clinfile import Process
+from clin.models.event_type import EventType
+from clin.models.shared import Envelope, Kind
+
+EVENT_TYPE = {
+    "name": "clin.orders",
+    "category": "business",
+    "owningApplication": "clin",
+    "audience": "component-internal",
+    "partitioning": {"strategy": "hash", "keys": ["order_id"], "partitionCount": 2},
+    "cleanup": {"policy": "delete", "retentionTimeDays": 2},
+    "schema": {"compatibility": "forward", "jsonSchema": {"type": "object"}},
+    "auth": {"users": {"admins": ["hammond"]}},
+}
+
+SUBSCRIPTION = {
+    "owningApplication": "clin",
+    "eventTypes": ["clin.orders"],
+    "consumerGroup": "default",
+    "auth": {"users": {"admins": ["hammond"]}},
+}
+
+SUBSCRIPTION_ID = "5ab0a5a2-bc7e-4ff6-8d25-a1b2d3e4f5a6"
+
+
+def make_task(
+    kind: Kind,
+    spec: dict,
+    target: str = "staging",
+    path: str = "manifest.yaml",
+    process_id: str = "Staging",
+) -> Process:
+    return Process(process_id, path, Envelope(kind, spec), target)
+
+
+def json_payload(value) -> dict:
+    """The value as decoded from a response of Nakadi"""
+    return json.loads(json.dumps(value))
+
+
+def event_type_payload(spec: dict) -> dict:
+    return json_payload(event_type_to_payload(EventType.from_spec(spec)))
+
+
+def write_file(base: Path, name: str, content: str) -> Path:
+    path = base / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    return path
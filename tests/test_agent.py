@@ -0,0 +1,77 @@
+import threading
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from clin.agent import AgentServer
+from clin.clients.agent import AGENT_SOCKET_VARIABLE
+from clin.clients.nakadi import Nakadi
+
+
+@pytest.fixture
+def agent(tmp_path: Path, monkeypatch):
+    server = AgentServer(tmp_path / "agent.sock", ttl=60)
+    server.session = MagicMock()
+    server.session.get.return_value = MagicMock(
+        status_code=200, text='[{"partition": "0"}]'
+    )
+    monkeypatch.setenv(AGENT_SOCKET_VARIABLE, str(tmp_path / "agent.sock"))
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_shares_reads_between_clients(agent: AgentServer):
+    assert (
+        Nakadi("https://nakadi.staging", "secret").get_partition_count("clin.orders")
+        == 1
+    )
+    assert (
+        Nakadi("https://nakadi.staging", "secret").get_partition_count("clin.orders")
+        == 1
+    )
+
+    agent.session.get.assert_called_once()
+    assert (
+        agent.session.get.call_args.args[0]
+        == "https://nakadi.staging/event-types/clin.orders/partitions"
+    )
+
+
+def test_does_not_share_reads_between_tokens(agent: AgentServer):
+    Nakadi("https://nakadi.staging", "secret").get_partition_count("clin.orders")
+    Nakadi("https://nakadi.staging", "other").get_partition_count("clin.orders")
+
+    assert agent.session.get.call_count == 2
+
+
+def test_reads_directly_without_agent(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv(AGENT_SOCKET_VARIABLE, str(tmp_path / "missing.sock"))
+
+    assert Nakadi("https://nakadi.staging", None)._agent is None
+
+
+def test_invalidates_shared_reads_after_change(agent: AgentServer):
+    writer = Nakadi("https://nakadi.staging", "secret")
+    writer._session = MagicMock()
+    Nakadi("https://nakadi.staging", "other").get_partition_count("clin.orders")
+
+    writer._put("event-types/clin.orders", json={})
+    Nakadi("https://nakadi.staging", "other").get_partition_count("clin.orders")
+
+    assert agent.session.get.call_count == 2
+    assert writer._agent is None
+
+
+def test_checks_staleness_without_agent(agent: AgentServer):
+    nakadi = Nakadi("https://nakadi.staging", "secret")
+    nakadi._session = MagicMock()
+    nakadi._session.get.return_value = MagicMock(status_code=200, content=b"[]")
+    nakadi._session.get.return_value.json.return_value = []
+
+    assert nakadi.get_partition_count("clin.orders", fresh=True) == 0
+    agent.session.get.assert_not_called()
@@ -0,0 +1,112 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from clin.api import EnvironmentClients, Session, execute, plan
+from clin.clients.http_client import ResponseCache
+from clin.clients.nakadi import Nakadi
+from clin.clinfile import Process
+from clin.models.event_type import EventType
+from clin.models.shared import Kind
+from clin.plan import Action, PlanError
+from clin.processor import Outcome, ProcessingError
+from tests.helpers import EVENT_TYPE, event_type_payload, make_task
+
+
+def _task(spec: dict) -> Process:
+    return make_task(Kind.EVENT_TYPE, spec)
+
+
+def _session(nakadi: MagicMock) -> Session:
+    return Session(clients={"staging": EnvironmentClients(nakadi)})
+
+
+def test_plans_without_changing_nakadi():
+    nakadi = MagicMock()
+    nakadi.get_event_type_payload.side_effect = lambda name: (
+        event_type_payload(EVENT_TYPE)
+        if name == "clin.orders"
+        else event_type_payload({**EVENT_TYPE, "name": name})
+    )
+    nakadi.get_partition_count.return_value = 2
+    nakadi.get_subscription.return_value = None
+
+    scope = {
+        Kind.EVENT_TYPE: [
+            _task(EVENT_TYPE),
+            _task(
+                {**EVENT_TYPE, "name": "clin.refunds", "audience": "company-internal"}
+            ),
+        ],
+        Kind.SQL_QUERY: [],
+        Kind.SUBSCRIPTION: [],
+    }
+    planned = plan(scope, _session(nakadi), jobs=2)
+
+    assert [(a.action, a.spec["name"]) for a in planned.actions] == [
+        (Action.UPDATE, "clin.refunds")
+    ]
+    assert (
+        planned.actions[0].diff["values_changed"]["root.audience"]["new_value"]
+        == "company-internal"
+    )
+    nakadi.update_event_type.assert_not_called()
+    nakadi.create_event_type.assert_not_called()
+
+
+def test_executes_planned_actions():
+    nakadi = MagicMock()
+    nakadi.get_event_type_payload.return_value = None
+    nakadi.get_event_type.return_value = None
+
+    session = _session(nakadi)
+    outcomes = execute(plan([_task(EVENT_TYPE)], session), session)
+
+    assert outcomes == [Outcome.CREATED]
+    assert nakadi.create_event_type.call_args.args[0].name == "clin.orders"
+
+
+def test_refuses_stale_plans():
+    nakadi = MagicMock()
+    nakadi.get_event_type_payload.return_value = None
+    session = _session(nakadi)
+    planned = plan([_task(EVENT_TYPE)], session)
+
+    nakadi.get_event_type.return_value = EventType.from_spec(EVENT_TYPE)
+    with pytest.raises(PlanError) as ex:
+        execute(planned, session)
+    assert str(ex.value) == "Changed since planned: event-type:clin.orders in staging"
+    nakadi.create_event_type.assert_not_called()
+
+
+def test_checks_staleness_bypassing_the_response_cache():
+    remote = {
+        "event-types/clin.orders": event_type_payload(EVENT_TYPE),
+        "event-types/clin.orders/partitions": [{"partition": "0"}, {"partition": "1"}],
+    }
+
+    def get(url: str, **kwargs) -> MagicMock:
+        content = json.dumps(remote[url[len("https://nakadi.staging/") :]]).encode()
+        return MagicMock(
+            status_code=200, content=content, json=lambda: json.loads(content)
+        )
+
+    nakadi = Nakadi("https://nakadi.staging", None, ResponseCache(300))
+    nakadi._agent = None
+    nakadi._session = MagicMock()
+    nakadi._session.get.side_effect = get
+    session = Session(clients={"staging": EnvironmentClients(nakadi)})
+    planned = plan([_task({**EVENT_TYPE, "audience": "company-internal"})], session)
+
+    remote["event-types/clin.orders"] = event_type_payload(
+        {**EVENT_TYPE, "audience": "external-public"}
+    )
+    with pytest.raises(PlanError):
+        execute(planned, session)
+    nakadi._session.put.assert_not_called()
+
+
+def test_unknown_environments_are_errors():
+    with pytest.raises(ProcessingError):
+        plan([_task(EVENT_TYPE)], Session())
@@ -0,0 +1,132 @@
+from unittest.mock import MagicMock
+
+from clin.clients.nakadi import NakadiError
+
+from clin.capacity import (
+    OVER_PROVISIONED,
+    UNDER_PROVISIONED,
+    Capacity,
+    analyze,
+    measure_capacity,
+    parse_offset,
+)
+from clin.utils import MS_IN_DAY
+
+
+def _partition(partition: str, oldest: str, newest: str) -> dict:
+    return {
+        "partition": partition,
+        "oldest_available_offset": oldest,
+        "newest_available_offset": newest,
+    }
+
+
+def test_parses_offsets():
+    assert parse_offset("001-0002-000000000000000042") == (2, 42)
+    assert parse_offset("17") == (0, 17)
+    assert parse_offset("BEGIN") == (None, -1)
+
+
+def test_analyzes_two_samples():
+    capacity = analyze(
+        "shop.orders",
+        [
+            _partition(
+                "0", "001-0001-000000000000000000", "001-0001-000000000000000099"
+            ),
+            _partition("1", "001-0001-000000000000000000", "BEGIN"),
+        ],
+        [
+            _partition(
+                "0", "001-0001-000000000000000000", "001-0001-000000000000000399"
+            ),
+            _partition(
+                "1", "001-0001-000000000000000000", "001-0001-000000000000000099"
+            ),
+        ],
+        10,
+        2 * MS_IN_DAY,
+    )
+
+    assert capacity.rates == [30, 10]
+    assert capacity.publish_rate == 40
+    assert capacity.skew == 1.5
+    assert capacity.retained_events == 500
+    assert capacity.projected_retained_events == 40 * 2 * 86400
+
+
+def test_changed_timelines_are_not_measured():
+    capacity = analyze(
+        "shop.orders",
+        [_partition("0", "001-0001-000000000000000000", "001-0001-000000000000000099")],
+        [_partition("0", "001-0001-000000000000000050", "001-0002-000000000000000009")],
+        10,
+        MS_IN_DAY,
+    )
+
+    assert capacity.rates == [None]
+    assert capacity.retained_events == 10
+
+
+def test_projects_retention_shorter_than_a_day():
+    capacity = analyze(
+        "shop.orders",
+        [_partition("0", "001-0001-000000000000000000", "001-0001-000000000000000099")],
+        [_partition("0", "001-0001-000000000000000000", "001-0001-000000000000000199")],
+        10,
+        6 * 3600 * 1000,
+    )
+
+    assert capacity.projected_retained_events == 10 * 6 * 3600
+
+
+def test_flags_provisioning():
+    capacity = Capacity("shop.orders", 4, 0, MS_IN_DAY, [900, 900, 900, 900])
+
+    assert capacity.needed_partitions(1000) == 4
+    assert capacity.provisioning(1000) is None
+    assert capacity.provisioning(500) == UNDER_PROVISIONED
+    capacity.declared_partitions = 32
+    assert capacity.provisioning(1000) == OVER_PROVISIONED
+
+
+def test_does_not_flag_event_types_without_traffic():
+    idle = Capacity("shop.returns", 8, 0, MS_IN_DAY, [0, 0, None, 0, 0, 0, 0, 0])
+    unmeasured = Capacity("shop.refunds", 8, 0, MS_IN_DAY, [None] * 8)
+
+    assert idle.provisioning(1000) is None
+    assert unmeasured.provisioning(1000) is None
+
+
+def test_measures_and_skips_vanished_event_types():
+    samples = {
+        "shop.orders": [
+            [_partition("0", "0", "9")],
+            [_partition("0", "0", "19")],
+        ],
+        "shop.refunds": [[_partition("0", "0", "0")], NakadiError("gone")],
+    }
+
+    def get_partitions(name, fresh):
+        assert fresh
+        sample = samples[name].pop(0)
+        if isinstance(sample, Exception):
+            raise sample
+        return sample
+
+    nakadi = MagicMock()
+    nakadi.get_partitions.side_effect = get_partitions
+
+    measured = measure_capacity(
+        nakadi,
+        [
+            {"name": "shop.orders", "options": {"retention_time": MS_IN_DAY}},
+            {"name": "shop.refunds"},
+        ],
+        0.01,
+        2,
+    )
+
+    assert [m.name for m in measured] == ["shop.orders"]
+    assert measured[0].retained_events == 20
+    assert measured[0].rates[0] > 0
@@ -1,9 +1,16 @@
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 
+import pytest
+
 from clin.clinfile import calculate_scope, Process
 from clin.models.shared import Kind, Envelope
-from clin.yamlops import YamlLoader
+from clin.yamlops import (
+    YamlLoader,
+    YamlInvalidFormatError,
+    YamlDocumentError,
+    YamlSyntaxError,
+)
 
 CLINFILE = {
     "process": [
@@ -206,3 +213,129 @@ def test_filter_env(m_glob: MagicMock, m_path_exists: MagicMock, m_isfile: Magic
             target='live'
         )
     ]
+
+
+def _write_manifests(base_path: Path):
+    for key, content in MANIFESTS.items():
+        path = base_path / Path(key).relative_to("/path/to/clinfile")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+
+def test_parallel_loading_keeps_order(tmp_path: Path):
+    _write_manifests(tmp_path)
+
+    sequential = calculate_scope(
+        master=CLINFILE,
+        base_path=tmp_path,
+        loader=YamlLoader(),
+        filter_id=(),
+        filter_env=(),
+    )
+    parallel = calculate_scope(
+        master=CLINFILE,
+        base_path=tmp_path,
+        loader=YamlLoader(),
+        filter_id=(),
+        filter_env=(),
+        jobs=2,
+    )
+
+    assert parallel == sequential
+    assert [p.envelope.spec["name"] for p in parallel[Kind.SQL_QUERY]] == [
+        "clin.test_query",
+        "clin.test_subquery",
+        "clin.test_query2",
+    ]
+
+
+def test_parallel_loading_reports_failing_file(tmp_path: Path):
+    _write_manifests(tmp_path)
+    broken = tmp_path / "apply_live" / "2_broken.yaml"
+    broken.write_text("spec: {}")
+
+    with pytest.raises(YamlInvalidFormatError) as ex:
+        calculate_scope(
+            master=CLINFILE,
+            base_path=tmp_path,
+            loader=YamlLoader(),
+            filter_id=(),
+            filter_env=(),
+            jobs=2,
+        )
+
+    assert str(ex.value) == f"Required field `kind` not found in {broken}"
+
+
+def test_loads_multi_document_manifests(tmp_path: Path):
+    (tmp_path / "apply").mkdir()
+    (tmp_path / "apply" / "queries.yaml").write_text(
+        """
+kind: sql-query
+spec:
+  name: clin.test_query{{POSTFIX}}
+---
+---
+kind: sql-query
+spec:
+  name: clin.test_subquery{{POSTFIX}}
+"""
+    )
+    master = {
+        "process": [
+            {"id": "Staging", "target": "staging", "paths": ["./apply"], "env": {"POSTFIX": "_pr"}}
+        ]
+    }
+
+    scope = calculate_scope(master, tmp_path, YamlLoader(), (), ())
+
+    assert [p.envelope.spec["name"] for p in scope[Kind.SQL_QUERY]] == [
+        "clin.test_query_pr",
+        "clin.test_subquery_pr",
+    ]
+    assert {p.path for p in scope[Kind.SQL_QUERY]} == {str(tmp_path / "apply" / "queries.yaml")}
+
+
+def test_reports_document_of_failing_multi_document_manifest(tmp_path: Path):
+    (tmp_path / "apply").mkdir()
+    manifest = tmp_path / "apply" / "queries.yaml"
+    manifest.write_text("kind: sql-query\nspec: {name: q1}\n---\nkind: sql-query\nspec: {name: '{{UNKNOWN}}'}\n")
+    master = {"process": [{"id": "Staging", "target": "staging", "paths": ["./apply"]}]}
+
+    with pytest.raises(YamlDocumentError) as ex:
+        calculate_scope(master, tmp_path, YamlLoader(), (), ())
+
+    assert ex.value.document == 2
+    assert str(ex.value) == (
+        f"Variable UNKNOWN (in {manifest}) is not found in provided environment"
+        f" (document #2 of {manifest})"
+    )
+
+
+def test_counts_empty_documents_of_multi_document_manifest(tmp_path: Path):
+    (tmp_path / "apply").mkdir()
+    manifest = tmp_path / "apply" / "queries.yaml"
+    manifest.write_text(
+        "kind: sql-query\nspec: {name: q1}\n---\n---\n"
+        "kind: sql-query\nspec: {name: '{{UNKNOWN}}'}\n"
+    )
+    master = {"process": [{"id": "Staging", "target": "staging", "paths": ["./apply"]}]}
+
+    with pytest.raises(YamlDocumentError) as ex:
+        calculate_scope(master, tmp_path, YamlLoader(), (), ())
+
+    assert ex.value.document == 3
+
+
+def test_reports_location_of_invalid_yaml_in_multi_document_manifest(tmp_path: Path):
+    (tmp_path / "apply").mkdir()
+    manifest = tmp_path / "apply" / "queries.yaml"
+    manifest.write_text("kind: sql-query\nspec: {name: q1}\n---\nkind: [sql-query\n")
+    master = {"process": [{"id": "Staging", "target": "staging", "paths": ["./apply"]}]}
+
+    with pytest.raises(YamlDocumentError) as ex:
+        calculate_scope(master, tmp_path, YamlLoader(), (), ())
+
+    assert ex.value.document == 2
+    assert isinstance(ex.value.cause, YamlSyntaxError)
+    assert ex.value.cause.line == 5
@@ -0,0 +1,71 @@
+from unittest.mock import MagicMock
+
+from clin.clients.nakadi import subscription_to_payload
+from clin.compare import changed_paths, compare_inventories, fetch_inventory
+from clin.decisions import FINGERPRINT_ANNOTATION
+from clin.manifest_index import ResourceFilter
+from clin.models.subscription import Subscription
+from tests.helpers import EVENT_TYPE, SUBSCRIPTION, SUBSCRIPTION_ID, event_type_payload
+
+
+def _nakadi(event_types: list, subscription_id: str) -> MagicMock:
+    subscription = subscription_to_payload(Subscription.from_spec(SUBSCRIPTION))
+    subscription["id"] = subscription_id
+    nakadi = MagicMock()
+    nakadi.list_event_types.return_value = [
+        event_type_payload(spec) for spec in event_types
+    ]
+    nakadi.get_partition_count.return_value = 2
+    nakadi.list_subscriptions.return_value = [subscription]
+    return nakadi
+
+
+def test_reports_differences_between_environments():
+    staging = fetch_inventory(
+        _nakadi(
+            [
+                {**EVENT_TYPE, "annotations": {FINGERPRINT_ANNOTATION: "abc"}},
+                {**EVENT_TYPE, "name": "clin.payments"},
+                {**EVENT_TYPE, "name": "clin.refunds"},
+            ],
+            SUBSCRIPTION_ID,
+        ),
+        None,
+        ResourceFilter((), ()),
+        2,
+    )
+    production = fetch_inventory(
+        _nakadi(
+            [
+                EVENT_TYPE,
+                {**EVENT_TYPE, "name": "clin.payments", "audience": "company-internal"},
+            ],
+            "0f1e2d3c-bc7e-4ff6-8d25-a1b2d3e4f5a6",
+        ),
+        None,
+        ResourceFilter((), ()),
+        2,
+    )
+
+    comparison = compare_inventories(staging, production)
+
+    assert comparison.only_left == ["event-type:clin.refunds"]
+    assert comparison.only_right == []
+    assert list(comparison.different) == ["event-type:clin.payments"]
+    assert changed_paths(comparison.different["event-type:clin.payments"]) == [
+        "audience"
+    ]
+    assert comparison.identical == 2
+
+
+def test_fetches_partitions_of_matching_event_types_only():
+    nakadi = _nakadi(
+        [EVENT_TYPE, {**EVENT_TYPE, "name": "shop.carts"}], SUBSCRIPTION_ID
+    )
+
+    inventory = fetch_inventory(
+        nakadi, None, ResourceFilter(("event-type",), ("shop.*",)), 2
+    )
+
+    assert list(inventory) == ["event-type:shop.carts"]
+    nakadi.get_partition_count.assert_called_once_with("shop.carts")
@@ -0,0 +1,86 @@
+import time
+from unittest.mock import MagicMock
+
+import clin.completion
+from clin.completion import (
+    TOKEN_VARIABLE,
+    complete_event_type,
+    complete_process_id,
+    load_names,
+    refresh_failure,
+    refresh_in_background,
+    save_names,
+)
+
+CLIN_FILE = """
+process:
+  - id: orders
+    target: staging
+    path: orders.yaml
+  - id: order-totals
+    target: {{ TARGET }}
+    path: totals.yaml
+  - id: {{ NAME }}
+    target: staging
+    path: other.yaml
+"""
+
+
+def _ctx(**params) -> MagicMock:
+    ctx = MagicMock()
+    ctx.params = params
+    return ctx
+
+
+def test_completes_process_ids_of_the_clin_file(tmp_path):
+    clin_file = tmp_path / "shop.clin.yaml"
+    clin_file.write_text(CLIN_FILE)
+
+    assert complete_process_id(_ctx(file=str(clin_file)), None, "order") == [
+        "order-totals",
+        "orders",
+    ]
+
+
+def test_completes_cached_names_and_refreshes_stale_ones(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    refreshed = []
+    monkeypatch.setattr(
+        clin.completion,
+        "refresh_in_background",
+        lambda env, token: refreshed.append((env, token)),
+    )
+    save_names("staging", ["shop.orders", "shop.refunds", "billing.invoices"])
+
+    assert complete_event_type(_ctx(env="staging"), None, "shop.") == [
+        "shop.orders",
+        "shop.refunds",
+    ]
+    assert refreshed == []
+
+    later = time.time() + 2 * clin.completion.NAMES_TTL
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert not load_names("staging")[1]
+
+    assert complete_event_type(
+        _ctx(env=("staging", "live"), token="secret"), None, "bil"
+    ) == ["billing.invoices"]
+    assert refreshed == [("staging", "secret"), ("live", "secret")]
+
+
+def test_refreshes_with_token_in_environment_and_keeps_errors(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    popen = MagicMock()
+    monkeypatch.setattr(clin.completion.subprocess, "Popen", popen)
+
+    refresh_in_background("staging", "secret")
+
+    args, kwargs = popen.call_args
+    assert "secret" not in args[0]
+    assert kwargs["env"][TOKEN_VARIABLE] == "secret"
+    with open(kwargs["stderr"].name, "w") as errors:
+        errors.write("401 Unauthorized\n")
+    assert refresh_failure("staging") == "401 Unauthorized"
+
+    save_names("staging", ["shop.orders"])
+    assert refresh_failure("staging") is None
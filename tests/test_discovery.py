@@ -0,0 +1,87 @@
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+from clin.discovery import ManifestDiscovery
+
+
+def _touch(base: Path, *names: str):
+    for name in names:
+        path = base / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("kind: event-type")
+
+
+def _relative(base: Path, paths: list) -> list:
+    return [p.relative_to(base).as_posix() for p in paths]
+
+
+def test_finds_nested_manifests_in_path_order(tmp_path: Path):
+    _touch(
+        tmp_path,
+        "b.yaml",
+        "a.yml",
+        "team-b/x.yaml",
+        "team-a/nested/y.yaml",
+        "team-a/z.yaml",
+        "README.md",
+    )
+
+    found = ManifestDiscovery().find(tmp_path, recursive=True)
+
+    assert _relative(tmp_path, found) == [
+        "a.yml",
+        "b.yaml",
+        "team-a/nested/y.yaml",
+        "team-a/z.yaml",
+        "team-b/x.yaml",
+    ]
+
+
+def test_non_recursive_lists_only_top_level(tmp_path: Path):
+    _touch(tmp_path, "b.yaml", "a.yml", "team-a/z.yaml")
+
+    found = ManifestDiscovery().find(tmp_path)
+
+    assert _relative(tmp_path, found) == ["a.yml", "b.yaml"]
+
+
+def test_respects_clinignore(tmp_path: Path):
+    _touch(
+        tmp_path,
+        "keep.yaml",
+        "draft.yaml",
+        "templates/t.yaml",
+        "team-a/schemas/s.yaml",
+        "team-a/et.yaml",
+        "team-a/local.yaml",
+    )
+    (tmp_path / ".clinignore").write_text(
+        "# comments are skipped\ndraft.yaml\ntemplates/\n"
+    )
+    (tmp_path / "team-a" / ".clinignore").write_text("/schemas\nlocal.*\n")
+
+    found = ManifestDiscovery().find(tmp_path, recursive=True)
+
+    assert _relative(tmp_path, found) == ["keep.yaml", "team-a/et.yaml"]
+
+
+def test_follows_symlink_loops_once(tmp_path: Path):
+    _touch(tmp_path, "team-a/et.yaml")
+    os.symlink(tmp_path, tmp_path / "team-a" / "loop")
+
+    found = ManifestDiscovery().find(tmp_path, recursive=True)
+
+    assert _relative(tmp_path, found) == ["team-a/et.yaml"]
+
+
+def test_caches_listings(tmp_path: Path):
+    _touch(tmp_path, "team-a/et.yaml")
+    discovery = ManifestDiscovery()
+    first = discovery.find(tmp_path, recursive=True)
+
+    with patch("os.scandir") as m_scandir:
+        second = discovery.find(tmp_path, recursive=True)
+
+    assert first == second
+    m_scandir.assert_not_called()
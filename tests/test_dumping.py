@@ -0,0 +1,59 @@
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from clin.clinfile import calculate_scope
+from clin.dumping import BulkDump, select_event_types
+from clin.models.event_type import EventType
+from clin.models.shared import Kind
+from clin.yamlops import YamlLoader, load_yaml
+from tests.helpers import EVENT_TYPE, event_type_payload
+
+SPEC = {
+    **EVENT_TYPE,
+    "schema": {
+        "compatibility": "forward",
+        "jsonSchema": {"type": "object", "default": None},
+    },
+}
+
+
+def _payload(name: str, owning_application: str = "clin") -> dict:
+    return event_type_payload(
+        {**SPEC, "name": name, "owningApplication": owning_application}
+    )
+
+
+def test_selects_event_types():
+    payloads = [
+        _payload("clin.orders"),
+        _payload("clin.payments"),
+        _payload("shop.carts", "shop"),
+    ]
+
+    def names(*args) -> list:
+        return [p["name"] for p in select_event_types(payloads, *args)]
+
+    assert names(("clin.*",), None, False) == ["clin.orders", "clin.payments"]
+    assert names((), "shop", False) == ["shop.carts"]
+    assert names(("*.orders",), "shop", False) == []
+    assert names((), None, True) == ["clin.orders", "clin.payments", "shop.carts"]
+
+
+def test_dumps_loadable_manifests_with_shared_schemas(tmp_path: Path):
+    nakadi = MagicMock()
+    nakadi.get_partition_count.return_value = 2
+    bulk = BulkDump(tmp_path)
+
+    counts = bulk.dump(
+        nakadi, None, [_payload("clin.orders"), _payload("clin.payments")], 2
+    )
+    clin_file = bulk.write_clin_file("staging")
+
+    assert counts == {Kind.EVENT_TYPE: 2, Kind.SQL_QUERY: 0}
+    assert len(list((tmp_path / "schemas").iterdir())) == 1
+    loader = YamlLoader()
+    scope = calculate_scope(load_yaml(clin_file, loader, {}), tmp_path, loader, (), ())
+    assert [t.envelope.spec for t in scope[Kind.EVENT_TYPE]] == [
+        EventType.from_spec(SPEC).to_spec(),
+        EventType.from_spec({**SPEC, "name": "clin.payments"}).to_spec(),
+    ]
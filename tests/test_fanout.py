@@ -0,0 +1,53 @@
+import threading
+
+from clin.clinfile import Process
+from clin.fanout import apply_per_environment
+from clin.models.shared import Envelope, Kind
+from clin.processor import Outcome, ProcessingError
+
+
+def _task(name: str, target: str) -> Process:
+    envelope = Envelope(kind=Kind.EVENT_TYPE, spec={"name": name})
+    return Process(id=target, path="apply.yaml", envelope=envelope, target=target)
+
+
+def test_slow_environment_does_not_stall_others():
+    production_done = threading.Event()
+
+    def apply(task: Process) -> Outcome:
+        if task.target == "staging":
+            assert production_done.wait(timeout=5)
+        else:
+            production_done.set()
+        return Outcome.UP_TO_DATE
+
+    results = apply_per_environment(
+        [_task("clin.orders", "staging"), _task("clin.orders", "production")], apply
+    )
+
+    assert [(r.env, r.outcomes[str(Outcome.UP_TO_DATE)], r.error) for r in results] == [
+        ("staging", 1, None),
+        ("production", 1, None),
+    ]
+
+
+def test_failing_environment_stops_alone():
+    applied = []
+
+    def apply(task: Process) -> Outcome:
+        if task.target == "staging":
+            raise ProcessingError("unreachable")
+        applied.append(task.envelope.spec["name"])
+        return Outcome.WILL_CREATE
+
+    tasks = [
+        _task(name, env)
+        for env in ("staging", "production")
+        for name in ("clin.a", "clin.b")
+    ]
+    staging, production = apply_per_environment(tasks, apply)
+
+    assert isinstance(staging.error, ProcessingError)
+    assert sum(staging.outcomes.values()) == 0
+    assert production.outcomes == {str(Outcome.WILL_CREATE): 2}
+    assert applied == ["clin.a", "clin.b"]
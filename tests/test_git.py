@@ -0,0 +1,80 @@
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from clin.clinfile import calculate_scope
+from clin.git import GitError, changed_files
+from clin.models.shared import Kind
+from clin.yamlops import YamlLoader
+from tests.helpers import write_file
+
+CLINFILE = {"process": [{"id": "Staging", "target": "staging", "paths": ["./apply"]}]}
+
+
+def _git(repo: Path, *args: str):
+    subprocess.run(
+        ["git", "-c", "user.name=clin", "-c", "user.email=clin@example.com", *args],
+        cwd=str(repo),
+        check=True,
+        stdout=subprocess.PIPE,
+    )
+
+
+def _event_type(name: str, include: str) -> str:
+    return f"kind: event-type\nspec:\n  name: {name}\n  schema: @@@{include}\n"
+
+
+@pytest.fixture
+def repo(tmp_path: Path) -> Path:
+    write_file(tmp_path, "schemas/shared.yaml", "type: object")
+    write_file(tmp_path, "schemas/orders.yaml", "properties: @@@./shared.yaml")
+    write_file(tmp_path, "schemas/payments.yaml", "type: object")
+    write_file(
+        tmp_path, "apply/orders.yaml", _event_type("orders", "../schemas/orders.yaml")
+    )
+    write_file(
+        tmp_path,
+        "apply/payments.yaml",
+        _event_type("payments", "../schemas/payments.yaml"),
+    )
+    _git(tmp_path, "init", "-q", "-b", "main")
+    _git(tmp_path, "add", "-A")
+    _git(tmp_path, "commit", "-q", "-m", "init")
+    _git(tmp_path, "checkout", "-q", "-b", "feature")
+    return tmp_path
+
+
+def test_lists_committed_uncommitted_and_untracked_changes(repo: Path):
+    write_file(repo, "schemas/payments.yaml", "type: array")
+    _git(repo, "commit", "-q", "-am", "change")
+    write_file(repo, "schemas/orders.yaml", "type: array")
+    write_file(
+        repo, "apply/refunds.yaml", _event_type("refunds", "../schemas/shared.yaml")
+    )
+
+    assert changed_files("main", repo / "apply") == {
+        (repo / "schemas/payments.yaml").resolve(),
+        (repo / "schemas/orders.yaml").resolve(),
+        (repo / "apply/refunds.yaml").resolve(),
+    }
+
+
+def test_scope_contains_manifests_with_changed_transitive_includes(repo: Path):
+    write_file(repo, "schemas/shared.yaml", "type: array")
+
+    scope = calculate_scope(
+        CLINFILE,
+        repo,
+        YamlLoader(),
+        (),
+        (),
+        since_changes=changed_files("main", repo),
+    )
+
+    assert [p.envelope.spec["name"] for p in scope[Kind.EVENT_TYPE]] == ["orders"]
+
+
+def test_fails_for_unknown_ref(repo: Path):
+    with pytest.raises(GitError):
+        changed_files("unknown", repo)
@@ -0,0 +1,70 @@
+from pathlib import Path
+
+from clin.clinfile import Process
+from clin.journal import FAILED, Journal
+from clin.models.shared import Kind
+from clin.processor import Outcome
+from tests.helpers import make_task
+
+
+def _task(audience: str) -> Process:
+    spec = {"name": "clin.orders", "audience": audience}
+    return make_task(Kind.EVENT_TYPE, spec, path="apply/orders.yaml")
+
+
+def test_resumes_completed_tasks(tmp_path: Path):
+    journal = Journal(tmp_path / "run.journal")
+    journal.record(_task("company-internal"), str(Outcome.UPDATED))
+    journal.close()
+
+    resumed = Journal(tmp_path / "run.journal", tmp_path / "run.journal")
+    assert resumed.is_completed(_task("company-internal"))
+    assert not resumed.is_completed(_task("external-public"))
+    resumed.close()
+
+
+def test_does_not_resume_failed_or_planned_tasks(tmp_path: Path):
+    journal = Journal(tmp_path / "run.journal")
+    journal.record(_task("company-internal"), str(Outcome.CREATED))
+    journal.record(_task("company-internal"), FAILED)
+    journal.close()
+
+    assert not Journal(
+        tmp_path / "other.journal", tmp_path / "run.journal"
+    ).is_completed(_task("company-internal"))
+
+    journal = Journal(tmp_path / "planned.journal")
+    journal.record(_task("company-internal"), str(Outcome.WILL_CREATE))
+    journal.close()
+
+    assert not Journal(
+        tmp_path / "other.journal", tmp_path / "planned.journal"
+    ).is_completed(_task("company-internal"))
+
+
+def test_ignores_torn_last_line(tmp_path: Path):
+    journal = Journal(tmp_path / "run.journal")
+    journal.record(_task("company-internal"), str(Outcome.UP_TO_DATE))
+    journal.close()
+    with (tmp_path / "run.journal").open("a") as f:
+        f.write('{"id": "Staging", "tar')
+
+    assert Journal(tmp_path / "other.journal", tmp_path / "run.journal").is_completed(
+        _task("company-internal")
+    )
+
+
+def test_terminates_torn_last_line_before_appending(tmp_path: Path):
+    journal = Journal(tmp_path / "run.journal")
+    journal.record(_task("company-internal"), str(Outcome.UP_TO_DATE))
+    journal.close()
+    with (tmp_path / "run.journal").open("a") as f:
+        f.write('{"id": "Staging", "tar')
+
+    resumed = Journal(tmp_path / "run.journal", tmp_path / "run.journal")
+    resumed.record(_task("external-public"), str(Outcome.UPDATED))
+    resumed.close()
+
+    resumed = Journal(tmp_path / "run.journal", tmp_path / "run.journal")
+    assert resumed.is_completed(_task("external-public"))
+    resumed.close()
@@ -0,0 +1,137 @@
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+from clin.clinfile import calculate_scope
+from clin.manifest_index import ManifestIndex, ResourceFilter, IndexedResource
+from clin.models.shared import Kind
+from clin.yamlops import YamlLoader
+from tests.helpers import write_file
+
+EVENT_TYPE = """
+kind: event-type
+spec:
+  name: clin.{{TEAM}}.orders
+  schema: @@@../schemas/orders.yaml
+"""
+
+SUBSCRIPTION = """
+kind: subscription
+spec:
+  owningApplication: clin
+  consumerGroup: default
+  eventTypes: [clin.{{TEAM}}.orders, clin.{{TEAM}}.payments]
+"""
+
+SQL_QUERY = """
+kind: sql-query
+spec:
+  name: clin.{{TEAM}}.orders-view
+  sql: "SELECT * FROM orders"
+"""
+
+CLINFILE = {
+    "process": [
+        {
+            "id": "Staging",
+            "target": "staging",
+            "paths": ["./apply"],
+            "env": {"TEAM": "avengers"},
+        }
+    ]
+}
+
+
+def test_indexes_kinds_and_raw_names(tmp_path: Path):
+    et = write_file(tmp_path, "et.yaml", EVENT_TYPE)
+    sub = write_file(tmp_path, "sub.yaml", SUBSCRIPTION + "---" + SQL_QUERY)
+
+    index = ManifestIndex(YamlLoader())
+
+    assert index.resources(et) == [
+        IndexedResource(kind="event-type", names=["clin.{{TEAM}}.orders"])
+    ]
+    assert index.resources(sub) == [
+        IndexedResource(
+            kind="subscription",
+            names=["clin.{{TEAM}}.orders", "clin.{{TEAM}}.payments"],
+        ),
+        IndexedResource(kind="sql-query", names=["clin.{{TEAM}}.orders-view"]),
+    ]
+
+
+def test_filter_matches_resolved_names():
+    resource = IndexedResource(kind="event-type", names=["clin.{{TEAM}}.orders"])
+
+    assert ResourceFilter((), ("clin.avengers.*",)).may_match(
+        resource, {"TEAM": "avengers"}
+    )
+    assert not ResourceFilter((), ("clin.avengers.*",)).may_match(
+        resource, {"TEAM": "x-men"}
+    )
+    assert not ResourceFilter(("sql-query",), ()).may_match(resource, {})
+    assert ResourceFilter((), ("clin.avengers.*",)).may_match(resource, {})
+
+
+def test_only_loads_matching_manifests(tmp_path: Path):
+    write_file(tmp_path, "schemas/orders.yaml", "type: object")
+    write_file(tmp_path, "apply/et.yaml", EVENT_TYPE)
+    write_file(tmp_path, "apply/query.yaml", SQL_QUERY)
+    write_file(tmp_path, "apply/sub.yaml", SUBSCRIPTION)
+    loader = YamlLoader()
+
+    with patch.object(
+        loader, "iter_yaml_from_file", wraps=loader.iter_yaml_from_file
+    ) as m_load:
+        scope = calculate_scope(
+            master=CLINFILE,
+            base_path=tmp_path,
+            loader=loader,
+            filter_id=(),
+            filter_env=(),
+            resource_filter=ResourceFilter((), ("*.orders",)),
+        )
+
+    assert [p.envelope.spec["name"] for p in scope[Kind.EVENT_TYPE]] == [
+        "clin.avengers.orders"
+    ]
+    assert not scope[Kind.SQL_QUERY]
+    assert len(scope[Kind.SUBSCRIPTION]) == 1
+    assert sorted(Path(c.args[0]).name for c in m_load.call_args_list) == [
+        "et.yaml",
+        "sub.yaml",
+    ]
+
+
+def test_persists_and_refreshes_changed_files(tmp_path: Path):
+    index_file = tmp_path / "index.json"
+    et = write_file(tmp_path, "et.yaml", EVENT_TYPE)
+    index = ManifestIndex(YamlLoader(), index_file)
+    index.resources(et)
+    index.save()
+
+    reloaded = ManifestIndex(YamlLoader(), index_file)
+    with patch.object(YamlLoader, "parse_raw_documents") as m_parse:
+        assert reloaded.resources(et)[0].names == ["clin.{{TEAM}}.orders"]
+        m_parse.assert_not_called()
+
+    et.write_text(EVENT_TYPE.replace("orders", "payments"))
+    os.utime(et, ns=(0, 0))
+    assert reloaded.resources(et)[0].names == ["clin.{{TEAM}}.payments"]
+
+
+def test_filter_resolves_names_with_markers_of_loader():
+    loader = YamlLoader(include_marker="%%%", variable_markers=("<<", ">>"))
+    resource = IndexedResource(kind="event-type", names=["clin.<<TEAM>>.orders"])
+    included = IndexedResource(kind="event-type", names=["%%%names.yaml"])
+
+    assert ResourceFilter((), ("clin.avengers.*",)).may_match(
+        resource, {"TEAM": "avengers"}, loader
+    )
+    assert not ResourceFilter((), ("clin.avengers.*",)).may_match(
+        resource, {"TEAM": "x-men"}, loader
+    )
+    assert ResourceFilter((), ("clin.avengers.*",)).may_match(included, {}, loader)
+    assert not ResourceFilter((), ("clin.avengers.*",)).may_match(
+        included, {}, YamlLoader()
+    )
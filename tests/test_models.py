@@ -109,3 +109,23 @@ def test_parses_envelope_from_valid_manifest(kind_spec: str, expected_kind: Kind
     envelope = Envelope.from_manifest(manifest)
     assert envelope.kind == expected_kind
     assert envelope.spec == {}
+
+
+def test_envelope_identity():
+    et = Envelope(kind=Kind.EVENT_TYPE, spec={"name": "clin.orders"})
+    sub = Envelope(
+        kind=Kind.SUBSCRIPTION,
+        spec={"owningApplication": "clin", "consumerGroup": "default", "eventTypes": ["b", "a"]},
+    )
+
+    assert et.identity == "event-type:clin.orders"
+    assert sub.identity == "subscription:clin:default:a,b"
+
+
+def test_envelope_fingerprint_ignores_key_order():
+    first = Envelope(kind=Kind.EVENT_TYPE, spec={"name": "clin.orders", "category": "data"})
+    second = Envelope(kind=Kind.EVENT_TYPE, spec={"category": "data", "name": "clin.orders"})
+    changed = Envelope(kind=Kind.EVENT_TYPE, spec={"category": "business", "name": "clin.orders"})
+
+    assert first.fingerprint() == second.fingerprint()
+    assert first.fingerprint() != changed.fingerprint()
@@ -0,0 +1,78 @@
+from clin.models.shared import Kind
+from clin.orphans import declared_applications, find_orphans
+from tests.helpers import SUBSCRIPTION_ID, make_task
+
+
+def _subscription(application: str, event_types: list) -> dict:
+    return {
+        "id": SUBSCRIPTION_ID,
+        "owning_application": application,
+        "event_types": event_types,
+        "consumer_group": "default",
+        "authorization": {"admins": [], "readers": []},
+    }
+
+
+def test_declared_applications_per_environment():
+    applications = declared_applications(
+        [
+            make_task(
+                Kind.EVENT_TYPE, {"name": "clin.orders", "owningApplication": "clin"}
+            ),
+            make_task(
+                Kind.SQL_QUERY,
+                {
+                    "name": "clin.totals",
+                    "outputEventType": {"owningApplication": "reports"},
+                },
+            ),
+            make_task(
+                Kind.EVENT_TYPE,
+                {"name": "clin.orders", "owningApplication": "shop"},
+                "production",
+            ),
+        ]
+    )
+
+    assert applications == {"staging": {"clin", "reports"}, "production": {"shop"}}
+
+
+def test_finds_undeclared_resources_of_the_applications_in_deletion_order():
+    orphans = find_orphans(
+        "staging",
+        {"clin"},
+        {"event-type:clin.orders"},
+        [
+            {"name": "clin.orders", "owning_application": "clin"},
+            {"name": "clin.legacy", "owning_application": "clin"},
+            {"name": "clin.totals", "owning_application": "clin"},
+            {"name": "shop.orders", "owning_application": "shop"},
+        ],
+        {"clin.totals"},
+        [
+            _subscription("clin", ["clin.legacy"]),
+            _subscription("shop", ["clin.orders"]),
+        ],
+    )
+
+    assert [(o.kind, o.name) for o in orphans] == [
+        (Kind.SUBSCRIPTION, "clin.legacy"),
+        (Kind.SQL_QUERY, "clin.totals"),
+        (Kind.EVENT_TYPE, "clin.legacy"),
+    ]
+    assert orphans[0].subscription_id == SUBSCRIPTION_ID
+    assert orphans[0].identity == "subscription:clin:default:clin.legacy"
+    assert all(o.env == "staging" for o in orphans)
+
+
+def test_declared_subscriptions_are_not_orphans():
+    orphans = find_orphans(
+        "staging",
+        {"clin"},
+        {"subscription:clin:default:clin.orders,clin.refunds"},
+        [],
+        set(),
+        [_subscription("clin", ["clin.refunds", "clin.orders"])],
+    )
+
+    assert orphans == []
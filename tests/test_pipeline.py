@@ -0,0 +1,66 @@
+import pytest
+
+from clin.clinfile import Process
+from clin.models.shared import Kind, Envelope
+from clin.pipeline import run_pipelined
+
+
+def _task(kind: Kind, name: str) -> Process:
+    return Process(
+        id="Staging",
+        path=f"/path/to/{name}.yaml",
+        envelope=Envelope(kind=kind, spec={"name": name}),
+        target="staging",
+    )
+
+
+def test_applies_event_types_while_loading_and_defers_dependants():
+    events = []
+
+    def load():
+        for task in [
+            _task(Kind.SUBSCRIPTION, "sub"),
+            _task(Kind.EVENT_TYPE, "et1"),
+            _task(Kind.SQL_QUERY, "query"),
+            _task(Kind.EVENT_TYPE, "et2"),
+        ]:
+            events.append(("loaded", task.envelope.spec["name"]))
+            yield task
+
+    run_pipelined(
+        load(), lambda t: events.append(("applied", t.envelope.spec["name"])), 1
+    )
+
+    applied = [name for action, name in events if action == "applied"]
+    assert applied == ["et1", "et2", "query", "sub"]
+    assert events.index(("applied", "et1")) < events.index(("loaded", "et2"))
+
+
+def test_propagates_loading_errors():
+    applied = []
+
+    def load():
+        yield _task(Kind.EVENT_TYPE, "et1")
+        raise ValueError("Required field `kind` not found")
+
+    with pytest.raises(ValueError):
+        run_pipelined(load(), applied.append)
+
+    assert [t.envelope.spec["name"] for t in applied] == ["et1"]
+
+
+def test_stops_loading_when_apply_fails():
+    loaded = []
+
+    def load():
+        for i in range(100):
+            loaded.append(i)
+            yield _task(Kind.EVENT_TYPE, f"et{i}")
+
+    def apply(task: Process):
+        raise RuntimeError("Nakadi is down")
+
+    with pytest.raises(RuntimeError):
+        run_pipelined(load(), apply, 2)
+
+    assert len(loaded) < 100
@@ -0,0 +1,97 @@
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+
+from clin.config import AppConfig, EnvironmentConfig
+from clin.models.auth import ReadOnlyAuth
+from clin.models.subscription import Subscription
+from clin.models.shared import Kind
+from clin.plan import Plan, PlannedAction, Action, refused_dependencies
+from clin.processor import Processor, Outcome
+
+CONFIG = AppConfig({"staging": EnvironmentConfig("https://nakadi.staging", None)})
+
+SPEC = {
+    "owningApplication": "clin",
+    "eventTypes": ["clin.orders"],
+    "consumerGroup": "default",
+    "auth": {"users": {"admins": ["hammond"]}},
+}
+
+
+def _remote(readers: list) -> Subscription:
+    return Subscription(
+        id="5ab0a5a2-bc7e-4ff6-8d25-a1b2d3e4f5a6",
+        owning_application="clin",
+        event_types=["clin.orders"],
+        consumer_group="default",
+        auth=ReadOnlyAuth(
+            users={"admins": ["hammond"], "readers": readers},
+            teams={"admins": [], "readers": []},
+            services={"admins": [], "readers": []},
+            any_token={"read": False},
+        ),
+    )
+
+
+@patch.object(Processor, "_get_nakadi")
+def test_records_planned_changes_in_dry_run(m_get_nakadi: MagicMock, tmp_path: Path):
+    nakadi = m_get_nakadi.return_value
+    nakadi.get_subscription.return_value = _remote(["carter"])
+    plan = Plan()
+
+    outcome = Processor(CONFIG, None, plan=plan).apply_subscription("staging", SPEC)
+
+    assert outcome == Outcome.WILL_UPDATE
+    plan.save(tmp_path / "plan.json")
+    loaded = Plan.load(tmp_path / "plan.json")
+    assert loaded == plan
+    assert len(loaded.actions) == 1
+    assert loaded.actions[0].action == Action.UPDATE
+    assert loaded.actions[0].subscription_id == "5ab0a5a2-bc7e-4ff6-8d25-a1b2d3e4f5a6"
+    nakadi.update_subscription.assert_not_called()
+
+
+@patch.object(Processor, "_get_nakadi")
+def test_executes_fresh_and_detects_stale_actions(m_get_nakadi: MagicMock):
+    nakadi = m_get_nakadi.return_value
+    nakadi.get_subscription.return_value = _remote(["carter"])
+    plan = Plan()
+    Processor(CONFIG, None, plan=plan).apply_subscription("staging", SPEC)
+    action = plan.actions[0]
+    processor = Processor(CONFIG, None, execute=True)
+
+    assert not processor.is_stale(action)
+    assert processor.execute_planned(action) == Outcome.UPDATED
+    updated = nakadi.update_subscription.call_args.args[0]
+    assert updated.id == "5ab0a5a2-bc7e-4ff6-8d25-a1b2d3e4f5a6"
+    assert updated.auth.users["readers"] == []
+
+    nakadi.get_subscription.return_value = _remote(["carter", "jackson"])
+    assert processor.is_stale(action)
+
+
+def test_skips_dependants_of_refused_actions():
+    def planned(env: str, kind: Kind, spec: dict) -> PlannedAction:
+        return PlannedAction(env, kind, Action.UPDATE, spec, None)
+
+    actions = [
+        planned("staging", Kind.EVENT_TYPE, {"name": "clin.orders"}),
+        planned("staging", Kind.EVENT_TYPE, {"name": "clin.payments"}),
+        planned(
+            "staging",
+            Kind.SQL_QUERY,
+            {"name": "clin.order-totals", "sql": "SELECT * FROM clin.orders"},
+        ),
+        planned("staging", Kind.SUBSCRIPTION, {"eventTypes": ["clin.order-totals"]}),
+        planned("staging", Kind.SUBSCRIPTION, {"eventTypes": ["clin.payments"]}),
+        planned("production", Kind.SUBSCRIPTION, {"eventTypes": ["clin.orders"]}),
+    ]
+
+    assert refused_dependencies(actions, [True, False, False, False, False, False]) == [
+        None,
+        None,
+        "clin.orders",
+        "clin.orders",
+        None,
+        None,
+    ]
@@ -0,0 +1,109 @@
+from unittest.mock import patch, MagicMock
+
+from clin.clients.nakadi import event_type_to_payload
+from clin.config import AppConfig, EnvironmentConfig
+from clin.decisions import FINGERPRINT_ANNOTATION
+from clin.models.event_type import EventType
+from clin.models.shared import fingerprint
+from clin.processor import Processor, Outcome
+from tests.helpers import EVENT_TYPE, json_payload
+
+CONFIG = AppConfig({"staging": EnvironmentConfig("https://nakadi.staging", None)})
+
+
+def _remote_payload(annotations: dict) -> dict:
+    et = EventType.from_spec(EVENT_TYPE)
+    et.annotations = annotations
+    return json_payload(event_type_to_payload(et))
+
+
+@patch.object(Processor, "_get_nakadi")
+def test_skips_comparison_when_fingerprint_matches(m_get_nakadi: MagicMock):
+    nakadi = m_get_nakadi.return_value
+    nakadi.get_event_type_payload.return_value = _remote_payload(
+        {FINGERPRINT_ANNOTATION: fingerprint(EVENT_TYPE)}
+    )
+
+    outcome = Processor(CONFIG, None, fingerprint=True).apply_event_type(
+        "staging", EVENT_TYPE
+    )
+
+    assert outcome == Outcome.UP_TO_DATE
+    nakadi.get_partition_count.assert_not_called()
+
+
+@patch.object(Processor, "_get_nakadi")
+def test_compares_in_full_when_verifying(m_get_nakadi: MagicMock):
+    nakadi = m_get_nakadi.return_value
+    nakadi.get_event_type_payload.return_value = _remote_payload(
+        {FINGERPRINT_ANNOTATION: fingerprint(EVENT_TYPE)}
+    )
+    nakadi.get_partition_count.return_value = 2
+
+    outcome = Processor(CONFIG, None, fingerprint=True, verify=True).apply_event_type(
+        "staging", EVENT_TYPE
+    )
+
+    assert outcome == Outcome.UP_TO_DATE
+    nakadi.get_partition_count.assert_called_once_with("clin.orders")
+
+
+@patch.object(Processor, "_get_nakadi")
+def test_records_fingerprint_on_update(m_get_nakadi: MagicMock):
+    nakadi = m_get_nakadi.return_value
+    nakadi.get_event_type_payload.return_value = _remote_payload(
+        {FINGERPRINT_ANNOTATION: "outdated"}
+    )
+    nakadi.get_partition_count.return_value = 1
+
+    outcome = Processor(CONFIG, None, execute=True, fingerprint=True).apply_event_type(
+        "staging", EVENT_TYPE
+    )
+
+    assert outcome == Outcome.UPDATED
+    updated = nakadi.update_event_type.call_args.args[0]
+    assert updated.annotations == {FINGERPRINT_ANNOTATION: fingerprint(EVENT_TYPE)}
+    assert "annotations" not in EVENT_TYPE
+
+
+@patch.object(Processor, "_get_nakadi")
+def test_records_fingerprint_on_create(m_get_nakadi: MagicMock):
+    nakadi = m_get_nakadi.return_value
+    nakadi.get_event_type_payload.return_value = None
+
+    outcome = Processor(CONFIG, None, execute=True, fingerprint=True).apply_event_type(
+        "staging", EVENT_TYPE
+    )
+
+    assert outcome == Outcome.CREATED
+    created = nakadi.create_event_type.call_args.args[0]
+    assert created.annotations == {FINGERPRINT_ANNOTATION: fingerprint(EVENT_TYPE)}
+
+
+@patch.object(Processor, "_get_nakadi")
+def test_records_fingerprint_of_up_to_date_event_type(m_get_nakadi: MagicMock):
+    nakadi = m_get_nakadi.return_value
+    nakadi.get_event_type_payload.return_value = _remote_payload({})
+    nakadi.get_partition_count.return_value = 2
+
+    outcome = Processor(CONFIG, None, execute=True, fingerprint=True).apply_event_type(
+        "staging", EVENT_TYPE
+    )
+
+    assert outcome == Outcome.UPDATED
+    updated = nakadi.update_event_type.call_args.args[0]
+    assert updated.annotations == {FINGERPRINT_ANNOTATION: fingerprint(EVENT_TYPE)}
+
+
+@patch.object(Processor, "_get_nakadi")
+def test_leaves_up_to_date_event_type_without_fingerprint(m_get_nakadi: MagicMock):
+    nakadi = m_get_nakadi.return_value
+    nakadi.get_event_type_payload.return_value = _remote_payload({})
+    nakadi.get_partition_count.return_value = 2
+
+    outcome = Processor(CONFIG, None, execute=True).apply_event_type(
+        "staging", EVENT_TYPE
+    )
+
+    assert outcome == Outcome.UP_TO_DATE
+    nakadi.update_event_type.assert_not_called()
@@ -0,0 +1,109 @@
+import json
+
+from clin.search import SearchIndex, schema_paths
+
+ORDERS = {
+    "name": "clin.orders",
+    "owning_application": "shop",
+    "annotations": {"team": "checkout"},
+    "authorization": {
+        "admins": [{"data_type": "user", "value": "hammond"}],
+        "readers": [{"data_type": "service", "value": "stups_reports"}],
+    },
+    "schema": {
+        "schema": json.dumps(
+            {
+                "type": "object",
+                "properties": {
+                    "customer_id": {"type": "string"},
+                    "items": {
+                        "type": "array",
+                        "items": {"properties": {"sku": {"type": "string"}}},
+                    },
+                },
+            }
+        )
+    },
+}
+
+TOTALS = {
+    "name": "clin.totals",
+    "owning_application": "reports",
+    "schema": {"schema": json.dumps({"properties": {"total": {}}})},
+}
+
+QUERY = {
+    "id": "clin.totals",
+    "sql": 'SELECT sum(o.amount) AS total FROM "clin.orders" AS o',
+    "authorization": {"admins": [{"data_type": "team", "value": "reporting"}]},
+}
+
+SUBSCRIPTION = {
+    "id": "5ab0a5a2-bc7e-4ff6-8d25-a1b2d3e4f5a6",
+    "owning_application": "billing",
+    "consumer_group": "invoices",
+    "event_types": ["clin.orders", "clin.refunds"],
+    "authorization": {"admins": [{"data_type": "user", "value": "hammond"}]},
+}
+
+
+def _index() -> SearchIndex:
+    return SearchIndex.build("staging", [ORDERS, TOTALS], [QUERY], [SUBSCRIPTION])
+
+
+def _names(matches: list) -> list:
+    return [(match["kind"], match["name"]) for match in matches]
+
+
+def test_schema_paths_include_nested_properties():
+    assert set(schema_paths(json.loads(ORDERS["schema"]["schema"]))) == {
+        "customer_id",
+        "items",
+        "items.sku",
+        "sku",
+    }
+
+
+def test_searches_fields():
+    index = _index()
+
+    assert _names(index.search(["property:customer_id"])) == [
+        ("event-type", "clin.orders")
+    ]
+    assert _names(index.search(["reads:clin.orders"])) == [
+        ("sql-query", "clin.totals"),
+        ("subscription", SUBSCRIPTION["id"]),
+    ]
+    assert _names(index.search(["principal:user:hammond", "kind:subscription"])) == [
+        ("subscription", SUBSCRIPTION["id"])
+    ]
+    assert _names(index.search(["annotation:team=checkout"])) == [
+        ("event-type", "clin.orders")
+    ]
+    assert _names(index.search(["principal:reporting"])) == [
+        ("sql-query", "clin.totals")
+    ]
+
+
+def test_bare_and_prefix_terms():
+    index = _index()
+
+    assert _names(index.search(["Hammond"])) == [
+        ("event-type", "clin.orders"),
+        ("subscription", SUBSCRIPTION["id"]),
+    ]
+    assert _names(index.search(["name:clin.*"])) == [
+        ("event-type", "clin.orders"),
+        ("sql-query", "clin.totals"),
+    ]
+    assert index.search(["app:shop", "app:billing"]) == []
+
+
+def test_saved_index_answers_the_same(tmp_path):
+    path = tmp_path / "staging.json"
+    _index().save(path)
+
+    loaded = SearchIndex.load(path)
+
+    assert loaded.env == "staging"
+    assert _names(loaded.search(["property:sku"])) == [("event-type", "clin.orders")]
@@ -0,0 +1,91 @@
+import pytest
+
+from clin.clinfile import Process
+from clin.models.shared import Envelope, Kind
+from clin.sharding import Shard, dependency_names, select_shard
+
+
+def _task(kind: Kind, spec: dict, target: str = "staging") -> Process:
+    return Process(
+        id="Staging",
+        path="apply.yaml",
+        envelope=Envelope(kind=kind, spec=spec),
+        target=target,
+    )
+
+
+def _scope() -> dict:
+    event_types = [_task(Kind.EVENT_TYPE, {"name": f"clin.et-{i}"}) for i in range(20)]
+    queries = [
+        _task(
+            Kind.SQL_QUERY,
+            {
+                "name": "clin.joined",
+                "sql": 'SELECT * FROM "clin.et-1" JOIN clin.et-2 ON true',
+            },
+        ),
+    ]
+    subscriptions = [
+        _task(
+            Kind.SUBSCRIPTION,
+            {
+                "owningApplication": "clin",
+                "consumerGroup": "a",
+                "eventTypes": ["clin.joined"],
+            },
+        ),
+        _task(
+            Kind.SUBSCRIPTION,
+            {
+                "owningApplication": "clin",
+                "consumerGroup": "b",
+                "eventTypes": ["clin.et-3", "clin.et-4"],
+            },
+        ),
+    ]
+    return {
+        Kind.EVENT_TYPE: event_types,
+        Kind.SQL_QUERY: queries,
+        Kind.SUBSCRIPTION: subscriptions,
+    }
+
+
+def _names(scope: dict) -> set:
+    return {t.envelope.identity for tasks in scope.values() for t in tasks}
+
+
+def test_shards_cover_scope_exactly_once():
+    scope = _scope()
+    shards = [_names(select_shard(scope, Shard(i, 3))) for i in range(1, 4)]
+
+    assert set.union(*shards) == _names(scope)
+    assert sum(len(shard) for shard in shards) == len(_names(scope))
+    assert all(shards)
+
+
+def test_keeps_dependent_resources_together():
+    scope = _scope()
+    for i in range(1, 4):
+        names = _names(select_shard(scope, Shard(i, 3)))
+        together = {
+            "event-type:clin.et-1",
+            "event-type:clin.et-2",
+            "sql-query:clin.joined",
+        }
+        assert together <= names or not together & names
+        pair = {"event-type:clin.et-3", "event-type:clin.et-4"}
+        assert pair <= names or not pair & names
+
+
+def test_extracts_sql_sources():
+    query = _scope()[Kind.SQL_QUERY][0]
+
+    assert dependency_names(query) == ["clin.joined", "clin.et-1", "clin.et-2"]
+
+
+def test_parses_shard():
+    assert Shard.parse("2/4") == Shard(2, 4)
+    with pytest.raises(ValueError):
+        Shard.parse("0/4")
+    with pytest.raises(ValueError):
+        Shard.parse("two")
@@ -0,0 +1,135 @@
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from clin.clients.nakadi import subscription_to_payload
+from clin.config import AppConfig
+from clin.models.shared import Kind
+from clin.models.subscription import Subscription
+from clin.processor import Processor, Outcome, ProcessingError
+from clin.snapshot import Snapshot, SnapshotError, refresh_snapshot, take_snapshot
+from tests.helpers import (
+    EVENT_TYPE,
+    SUBSCRIPTION,
+    SUBSCRIPTION_ID,
+    event_type_payload,
+    json_payload,
+)
+
+
+@pytest.fixture
+def snapshot_file(tmp_path: Path) -> Path:
+    subscription = subscription_to_payload(Subscription.from_spec(SUBSCRIPTION))
+    subscription["id"] = SUBSCRIPTION_ID
+    nakadi = MagicMock()
+    nakadi.list_event_types.return_value = [event_type_payload(EVENT_TYPE)]
+    nakadi.get_partition_count.return_value = 2
+    nakadi.list_subscriptions.return_value = [json_payload(subscription)]
+
+    counts = take_snapshot(nakadi, None, "staging", tmp_path / "staging.snap", 2)
+
+    assert counts == {Kind.EVENT_TYPE: 1, Kind.SQL_QUERY: 0, Kind.SUBSCRIPTION: 1}
+    return tmp_path / "staging.snap"
+
+
+def test_looks_up_resources_by_name(snapshot_file: Path):
+    snapshot = Snapshot(snapshot_file)
+
+    assert snapshot.env == "staging"
+    assert snapshot.names(Kind.EVENT_TYPE) == ["clin.orders"]
+    assert snapshot.get(Kind.EVENT_TYPE, "clin.orders")["partitions"] == 2
+    assert snapshot.get(Kind.EVENT_TYPE, "clin.payments") is None
+    snapshot.close()
+
+
+def test_plans_against_snapshot(snapshot_file: Path):
+    processor = Processor(
+        AppConfig({}), None, snapshots={"staging": Snapshot(snapshot_file)}
+    )
+
+    assert processor.apply_event_type("staging", EVENT_TYPE) == Outcome.UP_TO_DATE
+    assert processor.apply_subscription("staging", SUBSCRIPTION) == Outcome.UP_TO_DATE
+    changed = {**EVENT_TYPE, "audience": "company-internal"}
+    assert processor.apply_event_type("staging", changed) == Outcome.WILL_UPDATE
+    missing = {**EVENT_TYPE, "name": "clin.payments"}
+    assert processor.apply_event_type("staging", missing) == Outcome.WILL_CREATE
+
+    with pytest.raises(ProcessingError):
+        processor.apply_event_type("production", EVENT_TYPE)
+
+
+def test_rejects_truncated_snapshot(snapshot_file: Path):
+    snapshot_file.write_bytes(snapshot_file.read_bytes()[:-4])
+
+    with pytest.raises(SnapshotError):
+        Snapshot(snapshot_file)
+
+
+def test_refreshes_updated_and_deleted_resources(snapshot_file: Path):
+    current = event_type_payload(EVENT_TYPE)
+    current["updated_at"] = "2026-01-01T00:00:00.000Z"
+    added = {
+        **current,
+        "name": "clin.payments",
+        "updated_at": "2026-02-01T00:00:00.000Z",
+    }
+    nakadi = MagicMock()
+    nakadi.list_event_types.return_value = [current, added]
+    nakadi.get_partition_count.return_value = 4
+    nakadi.list_subscriptions.return_value = []
+
+    assert refresh_snapshot(nakadi, None, snapshot_file, 2) == (2, 1)
+    snapshot = Snapshot(snapshot_file)
+    assert snapshot.high_water_mark == "2026-02-01T00:00:00.000Z"
+    assert snapshot.names(Kind.EVENT_TYPE) == ["clin.orders", "clin.payments"]
+    assert snapshot.names(Kind.SUBSCRIPTION) == []
+    snapshot.close()
+
+    nakadi.get_partition_count.reset_mock()
+    current["audience"] = "company-internal"
+    assert refresh_snapshot(nakadi, None, snapshot_file, 2) == (0, 0)
+    nakadi.get_partition_count.assert_not_called()
+
+    current["updated_at"] = "2026-03-01T00:00:00.000Z"
+    assert refresh_snapshot(nakadi, None, snapshot_file, 2) == (1, 0)
+    nakadi.get_partition_count.assert_called_once_with("clin.orders")
+    snapshot = Snapshot(snapshot_file)
+    assert (
+        snapshot.get(Kind.EVENT_TYPE, "clin.orders")["payload"]["audience"]
+        == "company-internal"
+    )
+    assert snapshot.get(Kind.EVENT_TYPE, "clin.payments")["partitions"] == 4
+    snapshot.close()
+
+
+def test_rejects_snapshot_with_corrupt_index(snapshot_file: Path):
+    content = bytearray(snapshot_file.read_bytes())
+    snapshot = Snapshot(snapshot_file)
+    content[snapshot._index_offset] = ord("x")
+    snapshot.close()
+    snapshot_file.write_bytes(bytes(content))
+
+    with pytest.raises(SnapshotError):
+        Snapshot(snapshot_file)
+
+
+def test_keeps_snapshot_when_refresh_fails(snapshot_file: Path):
+    reader = Snapshot(snapshot_file)
+    subscription = json_payload(
+        reader.get(Kind.SUBSCRIPTION, reader.names(Kind.SUBSCRIPTION)[0])
+    )
+    subscription["unserializable"] = object()
+    nakadi = MagicMock()
+    nakadi.list_event_types.return_value = []
+    nakadi.list_subscriptions.return_value = [subscription]
+
+    with pytest.raises(TypeError):
+        refresh_snapshot(nakadi, None, snapshot_file, 2)
+
+    assert reader.get(Kind.EVENT_TYPE, "clin.orders")["partitions"] == 2
+    reader.close()
+    snapshot = Snapshot(snapshot_file)
+    assert snapshot.names(Kind.EVENT_TYPE) == ["clin.orders"]
+    snapshot.close()
+    assert [p.name for p in snapshot_file.parent.iterdir()] == ["staging.snap"]
@@ -0,0 +1,37 @@
+from pathlib import Path
+
+from clin.models.shared import Envelope, Kind
+from clin.state import StateFile
+
+ENVELOPE = Envelope(
+    kind=Kind.EVENT_TYPE, spec={"name": "clin.orders", "audience": "company-internal"}
+)
+
+
+def test_remembers_applied_envelopes_per_environment(tmp_path: Path):
+    state = StateFile(tmp_path / "state.json")
+    assert not state.is_unchanged("staging", ENVELOPE)
+
+    state.record("staging", ENVELOPE)
+    state.save()
+
+    reloaded = StateFile(tmp_path / "state.json")
+    assert reloaded.is_unchanged("staging", ENVELOPE)
+    assert not reloaded.is_unchanged("production", ENVELOPE)
+
+
+def test_detects_changed_envelopes(tmp_path: Path):
+    state = StateFile(tmp_path / "state.json")
+    state.record("staging", ENVELOPE)
+
+    changed = Envelope(
+        kind=Kind.EVENT_TYPE,
+        spec={"name": "clin.orders", "audience": "external-public"},
+    )
+    assert not state.is_unchanged("staging", changed)
+
+
+def test_ignores_unreadable_state(tmp_path: Path):
+    (tmp_path / "state.json").write_text("{")
+
+    assert not StateFile(tmp_path / "state.json").is_unchanged("staging", ENVELOPE)
@@ -0,0 +1,96 @@
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from clin.clinfile import Process
+from clin.models.shared import Envelope, Kind
+from clin.stats import SORT_KEYS, fetch_stats, managed_subscriptions, summarize
+
+
+def _subscription(id: str, consumer_group: str = "default") -> dict:
+    return {
+        "id": id,
+        "owning_application": "billing",
+        "consumer_group": consumer_group,
+        "event_types": ["shop.refunds", "shop.orders"],
+    }
+
+
+def _partition(unconsumed: int, lag: int = None, state: str = "assigned") -> dict:
+    partition = {"partition": "0", "state": state, "unconsumed_events": unconsumed}
+    if lag is not None:
+        partition["consumer_lag_seconds"] = lag
+    return partition
+
+
+def test_summarizes_partitions():
+    stats = summarize(
+        _subscription("a"),
+        [
+            {
+                "event_type": "shop.orders",
+                "partitions": [_partition(10, 5), _partition(30, 42)],
+            },
+            {
+                "event_type": "shop.refunds",
+                "partitions": [_partition(0, state="unassigned")],
+            },
+        ],
+    )
+
+    assert stats.unconsumed == 40
+    assert stats.unconsumed_per_event_type == {"shop.orders": 40, "shop.refunds": 0}
+    assert stats.partitions == 3
+    assert stats.unassigned == 1
+    assert stats.max_lag_seconds == 42
+    assert stats.event_types == ["shop.orders", "shop.refunds"]
+
+
+def test_fetches_stats_concurrently_in_order():
+    nakadi = MagicMock()
+    nakadi.get_subscription_stats.side_effect = lambda id: [
+        {
+            "event_type": "shop.orders",
+            "partitions": [
+                _partition({"a": 5, "b": 50, "c": 1}[id], {"a": 300, "b": 2}.get(id))
+            ],
+        }
+    ]
+
+    summaries = fetch_stats(nakadi, [_subscription(id) for id in "abc"], 3)
+
+    assert [s.id for s in summaries] == ["a", "b", "c"]
+    assert [s.id for s in sorted(summaries, key=SORT_KEYS["lag"], reverse=True)] == [
+        "a",
+        "b",
+        "c",
+    ]
+    assert [
+        s.id for s in sorted(summaries, key=SORT_KEYS["unconsumed"], reverse=True)
+    ] == ["b", "a", "c"]
+
+
+def test_resolves_declared_subscriptions_by_application():
+    def task(consumer_group: str) -> Process:
+        spec = {
+            "owningApplication": "billing",
+            "consumerGroup": consumer_group,
+            "eventTypes": ["shop.orders", "shop.refunds"],
+        }
+        return Process(
+            "subscriptions",
+            Path("subscription.yaml"),
+            Envelope(Kind.SUBSCRIPTION, spec),
+            "staging",
+        )
+
+    nakadi = MagicMock()
+    nakadi.list_subscriptions.return_value = [
+        _subscription("a"),
+        _subscription("b", "other"),
+    ]
+
+    found, missing = managed_subscriptions(nakadi, [task("default"), task("invoices")])
+
+    nakadi.list_subscriptions.assert_called_once_with("billing")
+    assert [s["id"] for s in found] == ["a"]
+    assert [m.spec["consumerGroup"] for m in missing] == ["invoices"]
@@ -0,0 +1,59 @@
+import os
+from pathlib import Path
+
+from clin.clients.http_client import ResponseCache
+from clin.watch import Watcher
+from clin.yamlops import YamlLoader
+from tests.helpers import write_file
+
+MASTER = {"process": [{"id": "Staging", "target": "staging", "paths": ["./apply"]}]}
+
+
+def _touch(path: Path):
+    stat = os.stat(str(path))
+    os.utime(str(path), ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_reports_changed_files_and_their_dependents(tmp_path: Path):
+    clin_file = write_file(tmp_path, "main.clin.yaml", "process: []")
+    schema = write_file(tmp_path, "schemas/orders.yaml", "type: object")
+    orders = write_file(
+        tmp_path,
+        "apply/orders.yaml",
+        "kind: event-type\nspec:\n  schema: @@@../schemas/orders.yaml\n",
+    )
+    payments = write_file(
+        tmp_path, "apply/payments.yaml", "kind: event-type\nspec: {}\n"
+    )
+    watcher = Watcher(clin_file, YamlLoader())
+
+    first = watcher.poll(MASTER, (), ())
+    assert first == {
+        clin_file.resolve(),
+        schema.resolve(),
+        orders.resolve(),
+        payments.resolve(),
+    }
+    assert watcher.poll(MASTER, (), ()) == set()
+
+    _touch(schema)
+    changed = watcher.poll(MASTER, (), ())
+    assert changed == {schema.resolve()}
+    assert watcher.affected_by(changed) == {schema.resolve(), orders.resolve()}
+
+    refunds = write_file(tmp_path, "apply/refunds.yaml", "kind: event-type\nspec: {}\n")
+    payments.unlink()
+    assert watcher.poll(MASTER, (), ()) == {refunds.resolve(), payments.resolve()}
+
+
+def test_response_cache_returns_copies_until_expired():
+    cache = ResponseCache(ttl=60)
+    cache.put("event-types/clin.orders", b'{"annotations": {}}')
+
+    cached = cache.get("event-types/clin.orders")
+    cached["annotations"]["changed"] = "yes"
+    assert cache.get("event-types/clin.orders") == {"annotations": {}}
+
+    assert ResponseCache(ttl=0).get("event-types/clin.orders") is None
+    cache.clear()
+    assert cache.get("event-types/clin.orders") is None
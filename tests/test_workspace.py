@@ -0,0 +1,74 @@
+from pathlib import Path
+
+import pytest
+
+from clin.clinfile import Process
+from clin.models.shared import Kind
+from clin.workspace import Workspace, WorkspaceError, find_clin_files
+from tests.helpers import make_task
+
+
+def _task(path: str, audience: str, target: str = "staging") -> Process:
+    spec = {"name": "clin.orders", "audience": audience}
+    return make_task(Kind.EVENT_TYPE, spec, target, path)
+
+
+def _scope(*tasks: Process) -> dict:
+    scope = {kind: [] for kind in Kind}
+    scope[Kind.EVENT_TYPE].extend(tasks)
+    return scope
+
+
+def test_finds_clin_files(tmp_path: Path):
+    for name in [
+        "orders/orders.clin.yaml",
+        "payments/main.clin.yaml",
+        "payments/apply/et.yaml",
+        "old/old.clin.yaml",
+    ]:
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text("process: []")
+    (tmp_path / ".clinignore").write_text("old/\n")
+
+    assert find_clin_files(tmp_path) == [
+        tmp_path / "orders/orders.clin.yaml",
+        tmp_path / "payments/main.clin.yaml",
+    ]
+
+
+def test_deduplicates_identical_resources():
+    workspace = Workspace()
+    orders = _task("orders/et.yaml", "company-internal")
+    workspace.add(Path("orders.clin.yaml"), _scope(orders))
+    workspace.add(
+        Path("shared.clin.yaml"),
+        _scope(
+            _task("shared/et.yaml", "company-internal"),
+            _task("shared/et.yaml", "company-internal", "production"),
+        ),
+    )
+
+    assert [t.target for t in workspace.scope[Kind.EVENT_TYPE]] == [
+        "staging",
+        "production",
+    ]
+    assert workspace.origins(orders) == [
+        Path("orders.clin.yaml"),
+        Path("shared.clin.yaml"),
+    ]
+
+
+def test_rejects_conflicting_resources():
+    workspace = Workspace()
+    workspace.add(
+        Path("orders.clin.yaml"), _scope(_task("orders/et.yaml", "company-internal"))
+    )
+
+    with pytest.raises(WorkspaceError) as ex:
+        workspace.add(
+            Path("shared.clin.yaml"), _scope(_task("shared/et.yaml", "external-public"))
+        )
+    assert (
+        "orders/et.yaml in orders.clin.yaml and shared/et.yaml in shared.clin.yaml"
+        in str(ex.value)
+    )